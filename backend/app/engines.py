@@ -0,0 +1,170 @@
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+
+# Storage engines behind models.get_conn. Both hand out DB-API style
+# connections that models can use the same way: "?" placeholders, execute()
+# returning a cursor, row_factory None (tuples) or truthy (dicts),
+# commit/rollback and in_transaction. What the SQL dialects do not share is
+# kept to the few attributes and hooks below.
+#
+#   sqlite    one file, per-thread cached connections (the default)
+#   postgres  psycopg connection pool, for several API workers or hosts
+#
+# psycopg is only imported when a PostgreSQL engine is created.
+
+# Called as on_query(rows changed) after every statement when set (metrics.py)
+on_query: Optional[Callable[[int], None]] = None
+
+
+def _changed(cur: Any) -> int:
+    # Rows written by a statement without a result set; SELECTs count as 0
+    return max(cur.rowcount, 0) if cur.description is None else 0
+
+
+class SQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection that reports each statement to on_query."""
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:  # type: ignore[override]
+        cur = super().execute(sql, params)
+        if on_query is not None:
+            on_query(_changed(cur))
+        return cur
+
+    def executemany(self, sql: str, seq: Iterable[Sequence[Any]]) -> sqlite3.Cursor:  # type: ignore[override]
+        cur = super().executemany(sql, seq)
+        if on_query is not None:
+            on_query(_changed(cur))
+        return cur
+
+
+class SQLiteEngine:
+    name = "sqlite"
+    fts = True  # logs_fts full-text index
+    compression = True  # packed log bodies (log_codec.py)
+    begin_write = "BEGIN IMMEDIATE"  # take the database write lock up front
+
+    def __init__(self, path: str, connect: Callable[[str], sqlite3.Connection]) -> None:
+        self.key = path
+        self.path = path
+        self._connect = connect
+        self._local = threading.local()
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect(self.path)
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        pass  # kept for the thread's next call
+
+    def close_thread(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def lock(self, conn: sqlite3.Connection, name: str) -> None:
+        # Writers are already serialized by the database lock
+        if not conn.in_transaction:
+            conn.execute(self.begin_write)
+
+    def close(self) -> None:
+        pass
+
+
+_PLACEHOLDER = re.compile(r"%|\?")
+
+
+@lru_cache(maxsize=1024)
+def _pg_sql(sql: str) -> str:
+    """Rewrite qmark placeholders to psycopg's %s (and escape literal %)."""
+    return _PLACEHOLDER.sub(lambda m: "%s" if m.group() == "?" else "%%", sql)
+
+
+class PgConnection:
+    """A pooled psycopg connection that speaks the sqlite3 subset models uses."""
+
+    def __init__(self, conn: Any) -> None:
+        from psycopg.rows import dict_row, tuple_row
+
+        self.raw = conn
+        self.row_factory: Any = None
+        self._dict_row = dict_row
+        self._tuple_row = tuple_row
+
+    def cursor(self) -> Any:
+        return self.raw.cursor(row_factory=self._dict_row if self.row_factory else self._tuple_row)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> Any:
+        cur = self.cursor()
+        cur.execute(_pg_sql(sql), tuple(params))
+        if on_query is not None:
+            on_query(_changed(cur))
+        return cur
+
+    def executemany(self, sql: str, seq: Iterable[Sequence[Any]]) -> Any:
+        cur = self.cursor()
+        cur.executemany(_pg_sql(sql), [tuple(params) for params in seq])
+        if on_query is not None:
+            on_query(_changed(cur))
+        return cur
+
+    @property
+    def in_transaction(self) -> bool:
+        from psycopg.pq import TransactionStatus
+
+        return self.raw.info.transaction_status != TransactionStatus.IDLE
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+
+class PostgresEngine:
+    name = "postgres"
+    fts = False  # search_logs falls back to a substring scan
+    compression = False  # log bodies are stored as text; TOAST compresses large values
+    begin_write = "BEGIN"
+
+    def __init__(self, url: str, min_size: int, max_size: int, timeout: float) -> None:
+        from psycopg_pool import ConnectionPool
+
+        self.key = url
+        self.pool = ConnectionPool(url, min_size=min_size, max_size=max_size, timeout=timeout,
+                                   name="copilot", open=True)
+
+    def acquire(self) -> PgConnection:
+        return PgConnection(self.pool.getconn())
+
+    def release(self, conn: PgConnection) -> None:
+        self.pool.putconn(conn.raw)
+
+    def close_thread(self) -> None:
+        pass  # nothing is cached per thread; connections go back to the pool
+
+    def lock(self, conn: PgConnection, name: str) -> None:
+        """Serialize writers of `name` until commit (ids and change sequences then
+        become visible in the order they were assigned)."""
+        conn.execute("SELECT pg_advisory_xact_lock(hashtext(?))", (name,))
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def create_engine(url: Optional[str], path: str, connect: Callable[[str], sqlite3.Connection],
+                  pool_min: int = 1, pool_max: int = 10, pool_timeout: float = 30.0) -> Any:
+    """SQLite at path unless url names a PostgreSQL database."""
+    if url and url.split(":", 1)[0] in ("postgres", "postgresql"):
+        return PostgresEngine(url, pool_min, pool_max, pool_timeout)
+    if url and not url.startswith("sqlite"):
+        raise ValueError(f"unsupported DB_URL scheme: {url.split(':', 1)[0]}")
+    if url:
+        path = url.split("://", 1)[-1] or path  # sqlite:///abs/path.db or sqlite://rel.db
+    return SQLiteEngine(path, connect)
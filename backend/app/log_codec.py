@@ -0,0 +1,141 @@
+import hashlib
+import os
+import zlib
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+
+# Log bodies are stored as raw DEFLATE, optionally primed with a per-pipeline
+# preset dictionary built from that pipeline's most repeated lines. The
+# dictionary is what makes short, line-sized rows worth compressing.
+#
+# logs.codec values:
+#   NULL      plain text not yet visited by the compaction job
+#   ''        plain text (too small to be worth compressing)
+#   'z'       raw DEFLATE
+#   'zd:<id>' raw DEFLATE with log_dictionaries.id = <id> as preset dictionary
+#   'c'       varint list of log_chunks ids; the text is their concatenation
+#
+# Bodies of LOG_DEDUP_MIN_BYTES or more are deduplicated ('c'): split into
+# chunks at line boundaries chosen by the line content, so the same run of
+# lines (a checkout step, a dependency list) yields the same chunks wherever
+# it appears, and each distinct chunk is stored once, itself packed as above.
+# Smaller rows, e.g. the one-line rows of /logs/stream, are left to the
+# dictionary: a repeated line compresses to fewer bytes than a chunk
+# reference and its index entry would take.
+LOG_COMPRESSION = os.getenv("LOG_COMPRESSION", "zlib")  # zlib | none
+LOG_COMPRESS_LEVEL = int(os.getenv("LOG_COMPRESS_LEVEL", "6"))
+LOG_COMPRESS_MIN_BYTES = int(os.getenv("LOG_COMPRESS_MIN_BYTES", "256"))
+LOG_COMPRESS_MIN_BYTES_DICT = int(os.getenv("LOG_COMPRESS_MIN_BYTES_DICT", "16"))
+DICT_MAX_BYTES = 32 * 1024  # DEFLATE window; a longer preset dictionary is never referenced
+
+LOG_DEDUP = os.getenv("LOG_DEDUP", "1") not in ("0", "false", "no")
+LOG_DEDUP_MIN_BYTES = int(os.getenv("LOG_DEDUP_MIN_BYTES", "1024"))
+LOG_CHUNK_CACHE_BYTES = int(os.getenv("LOG_CHUNK_CACHE_BYTES", str(32 * 1024 * 1024)))
+CHUNK_MIN_BYTES = 256
+CHUNK_MAX_BYTES = 8192
+_BOUNDARY_MASK = 7  # a line ends a chunk (past CHUNK_MIN_BYTES) with probability 1/8
+
+_WBITS = -15  # raw DEFLATE: no zlib header or checksum per row
+
+
+def pack(text: str, dictionary: Optional[Tuple[int, bytes]] = None) -> Tuple[str, Union[str, bytes]]:
+    """Return (codec, stored value) for a log body."""
+    if LOG_COMPRESSION != "zlib":
+        return "", text
+    raw = text.encode("utf-8")
+    if len(raw) < (LOG_COMPRESS_MIN_BYTES_DICT if dictionary else LOG_COMPRESS_MIN_BYTES):
+        return "", text
+    if dictionary:
+        compressor = zlib.compressobj(LOG_COMPRESS_LEVEL, zlib.DEFLATED, _WBITS, zdict=dictionary[1])
+        codec = f"zd:{dictionary[0]}"
+    else:
+        compressor = zlib.compressobj(LOG_COMPRESS_LEVEL, zlib.DEFLATED, _WBITS)
+        codec = "z"
+    packed = compressor.compress(raw) + compressor.flush()
+    if len(packed) >= len(raw):
+        return "", text
+    return codec, packed
+
+
+def unpack(codec: Optional[str], value: Union[str, bytes, None], load_dictionary: Callable[[int], bytes],
+           load_chunks: Optional[Callable[[List[int]], List[str]]] = None) -> Optional[str]:
+    if not codec or value is None:
+        return value  # type: ignore[return-value]
+    if codec == "c" and load_chunks is not None:
+        return "".join(load_chunks(chunk_ids(value)))  # type: ignore[arg-type]
+    if codec == "z":
+        decompressor = zlib.decompressobj(_WBITS)
+    elif codec.startswith("zd:"):
+        decompressor = zlib.decompressobj(_WBITS, zdict=load_dictionary(int(codec[3:])))
+    else:
+        raise ValueError(f"unknown log codec {codec!r}")
+    return (decompressor.decompress(value) + decompressor.flush()).decode("utf-8")
+
+
+def train_dictionary(samples: Iterable[str]) -> bytes:
+    """Build a preset dictionary from the lines that repeat most across samples.
+
+    DEFLATE finds matches closest to the end of the dictionary most cheaply,
+    so the most frequent lines go last.
+    """
+    counts = Counter(line for text in samples for line in text.splitlines(keepends=True) if len(line) > 8)
+    chosen = []
+    size = 0
+    for line, count in counts.most_common():
+        if count < 2:
+            break
+        encoded = line.encode("utf-8")
+        if size + len(encoded) > DICT_MAX_BYTES:
+            continue
+        chosen.append(encoded)
+        size += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+def split_chunks(text: str) -> List[str]:
+    """Content-defined chunks of text, cut only at line ends.
+
+    A cut depends on the line just ended (its CRC) and the chunk size so
+    far, not on the offset, so identical line runs split identically once
+    the chunking falls back into step after a difference.
+    """
+    raw = text.encode("utf-8")
+    chunks = []
+    start = end = 0
+    for line in raw.splitlines(keepends=True):
+        end += len(line)
+        if end - start >= CHUNK_MAX_BYTES or (end - start >= CHUNK_MIN_BYTES
+                                              and zlib.crc32(line) & _BOUNDARY_MASK == 0):
+            chunks.append(raw[start:end].decode("utf-8"))
+            start = end
+    if end > start:
+        chunks.append(raw[start:end].decode("utf-8"))
+    return chunks
+
+
+def chunk_digest(chunk: str) -> bytes:
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+
+
+def encode_chunk_ids(ids: Iterable[int]) -> bytes:
+    out = bytearray()
+    for value in ids:
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def chunk_ids(value: bytes) -> List[int]:
+    ids = []
+    current = shift = 0
+    for byte in value:
+        current |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            ids.append(current)
+            current = shift = 0
+    return ids
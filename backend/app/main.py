@@ -1,16 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from . import models
+from . import metrics, models, paging
 from .routes import logs as logs_routes
 from .routes import analyze as analyze_routes
 from .routes import seed as seed_routes
 from .routes import agents as agents_routes
+from .routes import stats as stats_routes
+from .routes import clusters as clusters_routes
+from .routes import retention as retention_routes
+from .services import ai, maintenance, pubsub, task_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await pubsub.start()
+    await task_queue.start(agents_routes.run_task)
+    await maintenance.start()
+    yield
+    await maintenance.stop()
+    await task_queue.stop()
+    await ai.aclose()
+    await pubsub.stop()
+    models.close_engine()
 
 
 def create_app() -> FastAPI:
+    if metrics.METRICS_ENABLED:
+        metrics.instrument_models(models)
     models.init_db()
-    app = FastAPI(title="DevOps Copilot API", version="0.1.0")
+    app = FastAPI(title="DevOps Copilot API", version="0.1.0", lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -18,20 +42,59 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor", "X-Total-Count"],
     )
 
+    if metrics.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)  # outermost: also times CORS handling
+        metrics.start_profiler()
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
     @app.get("/health")
     def health():
         return {"status": "ok"}
 
     @app.get("/pipelines")
-    def get_pipelines():
-        return models.list_pipelines()
+    def get_pipelines(
+        request: Request,
+        response: Response,
+        limit: Optional[int] = Query(None, ge=1),
+        cursor: Optional[str] = None,
+        q: Optional[str] = Query(None, description="Name or id: substring from 3 characters, else name prefix"),
+        status: Optional[List[str]] = Query(None, description="Repeat for several statuses"),
+        min_success_rate: Optional[float] = Query(None, ge=0, le=1),
+        max_success_rate: Optional[float] = Query(None, ge=0, le=1),
+        sort: Literal["last_run", "name", "success_rate"] = "last_run",
+        order: Optional[Literal["asc", "desc"]] = Query(None, description="Default: desc for last_run, else asc"),
+    ):
+        cached = paging.not_modified(request, response, "pipelines")
+        if cached:
+            return cached
+        filters = {"q": q, "statuses": status, "min_success_rate": min_success_rate,
+                   "max_success_rate": max_success_rate}
+        after = tuple(paging.decode_cursor(cursor, 2)) if cursor else None
+        rows = models.list_pipelines(limit=limit, after=after, sort=sort,
+                                     descending=None if order is None else order == "desc", **filters)
+        if rows:
+            paging.set_next_cursor(response, rows, limit, paging.encode_cursor(rows[-1]["sort_key"], rows[-1]["id"]))
+        for row in rows:
+            del row["sort_key"]
+        # Counted on the first page only; later pages keep the figure
+        if cursor is None:
+            total, exact = (len(rows), True) if limit is None else models.count_pipelines(**filters)
+            response.headers["X-Total-Count"] = str(total) if exact else f"{total}+"
+        return rows
 
     app.include_router(logs_routes.router)
     app.include_router(analyze_routes.router)
     app.include_router(seed_routes.router)
     app.include_router(agents_routes.router)
+    app.include_router(stats_routes.router)
+    app.include_router(clusters_routes.router)
+    app.include_router(retention_routes.router)
 
     return app
 
@@ -0,0 +1,316 @@
+import bisect
+import functools
+import inspect
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import engines
+
+
+logger = logging.getLogger(__name__)
+
+
+# Prometheus metrics without a client library. Every thread updates its own
+# shard (plain dicts and lists, no locks); GET /metrics sums the shards.
+# A lock is only taken the first time a thread records anything.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "no")
+# Sampling profiler: off unless PROFILE_SLOW_MS is set. Requests slower than
+# this get their samples written as collapsed stacks ("frame;frame;frame count",
+# the input of flamegraph.pl and speedscope) to PROFILE_DIR.
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "copilot-profiles")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+class _Metric:
+    def __init__(self, name: str, kind: str, help: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = (), collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None):
+        self.name = name
+        self.kind = kind  # counter | histogram | gauge
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.collect = collect  # read at scrape time instead of the shards
+
+
+_metrics: Dict[str, _Metric] = {}
+_shards: List[Dict[Tuple[str, Labels], List[float]]] = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = (),
+            collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None) -> None:
+    _metrics[name] = _Metric(name, "counter", help, labelnames, collect=collect)
+
+
+def counter_from(name: str, help: str, labelname: str, stats: Dict[str, float], keys: Sequence[str] = ()) -> None:
+    """Expose a module's existing stats dict (or some of its keys) as one labelled counter."""
+    counter(name, help, (labelname,), lambda: [((key,), stats[key]) for key in keys or stats])
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+    _metrics[name] = _Metric(name, "histogram", help, labelnames, buckets)
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+    """A value computed when /metrics is scraped: collect() yields (labels, value)."""
+    _metrics[name] = _Metric(name, "gauge", help, labelnames, collect=collect)
+
+
+def _shard() -> Dict[Tuple[str, Labels], List[float]]:
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def inc(name: str, labels: Labels = (), value: float = 1.0) -> None:
+    shard = _shard()
+    cell = shard.get((name, labels))
+    if cell is None:
+        cell = shard[(name, labels)] = [0.0]
+    cell[0] += value
+
+
+def observe(name: str, labels: Labels, value: float) -> None:
+    shard = _shard()
+    cell = shard.get((name, labels))
+    buckets = _metrics[name].buckets
+    if cell is None:
+        cell = shard[(name, labels)] = [0.0] * (len(buckets) + 3)  # count, sum, per-bucket counts, +Inf
+    cell[0] += 1
+    cell[1] += value
+    cell[2 + bisect.bisect_left(buckets, value)] += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    totals: Dict[Tuple[str, Labels], List[float]] = {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        for key, cell in list(shard.items()):
+            total = totals.get(key)
+            if total is None:
+                totals[key] = list(cell)
+            else:
+                for i, v in enumerate(cell):
+                    total[i] += v
+    series: Dict[str, List[Tuple[Labels, List[float]]]] = {}
+    for (name, labels), cell in totals.items():
+        series.setdefault(name, []).append((labels, cell))
+
+    out: List[str] = []
+    for metric in _metrics.values():
+        if metric.collect is not None:
+            try:
+                values = list(metric.collect())
+            except Exception:
+                logger.exception("metrics collector %s failed", metric.name)
+                continue
+            rows = [(labels, [value]) for labels, value in values]
+        else:
+            rows = sorted(series.get(metric.name, []))
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, cell in rows:
+            if metric.kind != "histogram":
+                out.append(f"{metric.name}{_labels(metric.labelnames, labels)} {_format(cell[0])}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(metric.buckets + (float("inf"),), cell[2:]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                out.append(f"{metric.name}_bucket{_labels(metric.labelnames, labels, le)} {_format(cumulative)}")
+            out.append(f"{metric.name}_sum{_labels(metric.labelnames, labels)} {_format(cell[1])}")
+            out.append(f"{metric.name}_count{_labels(metric.labelnames, labels)} {_format(cell[0])}")
+    return "\n".join(out) + "\n"
+
+
+# ============= HTTP ============= #
+histogram("http_request_duration_seconds", "Request latency by route template (streams: until closed)",
+          ("method", "route", "status"))
+_in_flight = 0  # only touched on the event loop thread
+gauge("http_requests_in_progress", "Requests being served", (), lambda: [((), _in_flight)])
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency per route template, plus slow-request profiles."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        global _in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        _in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            _in_flight -= 1
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"  # set by the router on match
+            observe("http_request_duration_seconds", (scope["method"], route, str(status[0])), elapsed)
+            if _sampler is not None and elapsed * 1000 >= PROFILE_SLOW_MS:
+                threading.Thread(
+                    target=_sampler.dump, args=(scope["method"], route, started, started + elapsed), daemon=True
+                ).start()
+
+
+# ============= Database ============= #
+histogram("db_call_duration_seconds", "Time spent in each models function (outermost call only)", ("function",))
+counter("db_queries_total", "SQL statements executed by each models function", ("function",))
+counter("db_rows_total", "Rows returned by each models function plus rows its statements changed", ("function",))
+
+# Functions that are plumbing rather than queries, or that would time their caller's work
+_NOT_TIMED = {"get_conn", "transaction", "write", "get_engine", "close_conn", "close_engine",
+              "add_change_listener", "remove_change_listener"}
+_db = threading.local()
+
+
+def _on_query(rows: int) -> None:
+    if getattr(_db, "depth", 0):
+        _db.queries += 1
+        _db.rows += rows
+
+
+def _timed(name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    labels = (name,)
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if getattr(_db, "depth", 0):
+            return fn(*args, **kwargs)  # nested models call: part of the outer one
+        _db.depth, _db.queries, _db.rows = 1, 0, 0
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _db.depth = 0
+            observe("db_call_duration_seconds", labels, time.perf_counter() - started)
+            inc("db_queries_total", labels, _db.queries)
+        returned = len(result) if isinstance(result, list) else 1 if isinstance(result, dict) else 0
+        inc("db_rows_total", labels, _db.rows + returned)
+        return result
+
+    wrapper.__timed__ = True
+    return wrapper
+
+
+def instrument_models(module: Any) -> None:
+    """Replace the public query functions of models with timed wrappers.
+
+    Callers use models.<name> at call time, so this covers every caller,
+    including calls made inside models itself. Generators are left alone
+    (their work happens after the call returns). Idempotent.
+    """
+    engines.on_query = _on_query
+    for name, fn in list(vars(module).items()):
+        if (name.startswith("_") or name in _NOT_TIMED or not inspect.isfunction(fn)
+                or fn.__module__ != module.__name__ or inspect.isgeneratorfunction(fn)
+                or getattr(fn, "__timed__", False)):
+            continue
+        setattr(module, name, _timed(name, fn))
+
+
+# ============= Sampling profiler ============= #
+# Library frames a thread sits in while idle (waiting for work or for I/O)
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+_SAFE_NAME = re.compile(r"[^\w.-]+")
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="metrics-sampler", daemon=True)
+        self.interval = interval
+        # (time, stack) pairs; about a minute at the default rate with a few busy threads
+        self.samples: deque = deque(maxlen=max(1000, int(60 / interval) * 8))
+        self._labels: Dict[Any, str] = {}
+
+    def _label(self, code: Any) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            if not _in_flight:
+                continue
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                self.samples.append((now, ";".join(reversed(stack))))
+
+    def dump(self, method: str, route: str, start: float, end: float) -> None:
+        """Write the samples taken during one request as collapsed stacks.
+
+        Samples cover every busy thread during the request, so on a loaded
+        server they include concurrent requests' work too.
+        """
+        counts = Counter(stack for at, stack in list(self.samples) if start <= at <= end)
+        if not counts:
+            return
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{_SAFE_NAME.sub('_', route).strip('_')}-{int((end - start) * 1000)}ms.folded"
+        path = os.path.join(PROFILE_DIR, name)
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+        logger.info("slow request %s %s (%.0f ms): %s", method, route, (end - start) * 1000, path)
+
+
+_sampler: Optional[_Sampler] = None
+
+
+def start_profiler() -> None:
+    """Start the sampler thread if PROFILE_SLOW_MS is set (once per process)."""
+    global _sampler
+    if PROFILE_SLOW_MS > 0 and _sampler is None:
+        _sampler = _Sampler(PROFILE_INTERVAL_MS / 1000)
+        _sampler.start()
@@ -0,0 +1,54 @@
+import base64
+import hashlib
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from . import models
+
+
+# Helpers for the list endpoints: opaque keyset cursors, and weak ETags built
+# from the per-table change counters so an unchanged poll is answered with
+# 304 without reading any rows.
+
+def encode_cursor(*values: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return values
+
+
+def etag_for(request: Request, *tables: str) -> str:
+    versions = models.get_table_versions(*tables)
+    material = f"{sorted(versions.items())}|{request.url.path}|{request.url.query}"
+    return 'W/"' + hashlib.blake2b(material.encode(), digest_size=8).hexdigest() + '"'
+
+
+def not_modified(request: Request, response: Response, *tables: str) -> Optional[Response]:
+    """Set the ETag on response; return a 304 response if the client's copy is current."""
+    etag = etag_for(request, *tables)
+    response.headers["ETag"] = etag
+    candidates = request.headers.get("if-none-match")
+    if candidates and (candidates.strip() == "*" or etag in [c.strip() for c in candidates.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def set_next_cursor(response: Response, rows: List[Any], limit: Optional[int], cursor: Any) -> None:
+    """Advertise the next page's cursor when this page came back full."""
+    if limit and len(rows) >= limit:
+        response.headers["X-Next-Cursor"] = str(cursor)
+
+
+def last_event_id(request: Request) -> Optional[int]:
+    """Resume point an EventSource sends when it reconnects to a stream."""
+    value = request.headers.get("last-event-id", "")
+    return int(value) if value.isdigit() else None
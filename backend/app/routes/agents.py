@@ -1,10 +1,13 @@
 from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
-from .. import models
+from .. import models, paging
+from ..services import classifier, pubsub, task_queue
 from ..services.ai import analyze_logs_with_ai
+from ..services.context import pipeline_context
 
 
 router = APIRouter(prefix="/agent")
@@ -25,20 +28,40 @@ class AgentTaskOut(BaseModel):
     updated_at: str
 
 
-@router.post("/tasks", response_model=AgentTaskOut)
-def create_task(payload: AgentTaskCreate):
-    # Create queued task
-    task_id = models.create_agent_task(payload.type, payload.pipeline_id, status="queued")
-    # Auto-run for triage/rca MVP
-    run_task(task_id)
-    task = models.get_agent_task(task_id)
+@router.post("/tasks", response_model=AgentTaskOut, status_code=202)
+async def create_task(payload: AgentTaskCreate):
+    # Queue the task; a background worker picks it up (see services/task_queue.py)
+    task_id = await run_in_threadpool(models.create_agent_task, payload.type, payload.pipeline_id, status="queued")
+    task_queue.notify(payload.type)
+    task = await run_in_threadpool(models.get_agent_task, task_id)
     assert task
     return task
 
 
 @router.get("/tasks")
-def list_tasks(limit: int = 50, offset: int = 0):
-    return models.list_agent_tasks(limit=limit, offset=offset)
+def list_tasks(request: Request, response: Response, limit: int = 50, offset: int = 0, before_id: Optional[int] = None):
+    cached = paging.not_modified(request, response, "agent_tasks")
+    if cached:
+        return cached
+    tasks = models.list_agent_tasks(limit=limit, offset=offset, before_id=before_id)
+    if tasks:
+        paging.set_next_cursor(response, tasks, limit, tasks[-1]["id"])
+    return tasks
+
+
+@router.get("/tasks/stream")
+async def stream_tasks(request: Request, after: Optional[int] = None):
+    """Task changes as server-sent events ("task" events carrying the task row).
+
+    The event id is the task's change_seq; resume with after or Last-Event-ID
+    (each task changed since then is sent once, in its current state).
+    Without either, only changes from now on are sent.
+    """
+    cursor = after if after is not None else paging.last_event_id(request)
+    if cursor is None:
+        versions = await run_in_threadpool(models.get_table_versions, "agent_tasks")
+        cursor = versions.get("agent_tasks", 0)
+    return pubsub.sse_response("agent_tasks", "task", cursor, "change_seq", models.get_agent_task_changes)
 
 
 @router.get("/tasks/{task_id}", response_model=AgentTaskOut)
@@ -49,54 +72,74 @@ def get_task(task_id: int):
     return task
 
 
-@router.post("/tasks/{task_id}/run")
-def api_run_task(task_id: int):
-    run_task(task_id)
-    task = models.get_agent_task(task_id)
+@router.post("/tasks/{task_id}/run", status_code=202)
+async def api_run_task(task_id: int):
+    # Conditional update: of two concurrent calls only one requeues the task
+    task = await run_in_threadpool(models.requeue_agent_task, task_id)
+    if task:
+        task_queue.notify(task["type"])
+        return await run_in_threadpool(models.get_agent_task, task_id)
+    task = await run_in_threadpool(models.get_agent_task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="task not found")
-    return task
-
-
-def run_task(task_id: int) -> None:
-    task = models.get_agent_task(task_id)
+    if task["status"] == "running":
+        raise HTTPException(status_code=409, detail="task is already running")
+    return task  # already queued
+
+
+def _record(task_id: int, status: str, action_type: str, payload: str, result: Optional[dict] = None) -> None:
+    """Set the task's status (and result) and log the action, in one transaction."""
+    models.update_agent_task(task_id, status=status, result_json=json_dumps_safe(result) if result is not None else None)
+    models.insert_agent_action(task_id, action_type, payload)
+
+
+def _triage(pipeline_id: str) -> dict:
+    """Heuristic triage based on last run status + error keywords in latest logs. Blocking (database)."""
+    logs = models.get_logs(pipeline_id, limit=50)
+    text = "\n".join([l["content"] for l in logs])
+    severity = "low"
+    if "error" in text.lower() or "failed" in text.lower():
+        severity = "high"
+    result = {"kind": "triage", "severity": severity, "hints": ["Check failing steps", "Open pipeline detail"]}
+    # Known failure signature: name it and lead with its fix
+    match = classifier.match_rules(text)
+    if match:
+        result.update(severity="high", category=match["category"], root_cause=match["root_cause"])
+        result["hints"] = [match["suggested_fix"], *result["hints"]]
+    return result
+
+
+async def run_task(task_id: int) -> None:
+    task = await run_in_threadpool(models.get_agent_task, task_id)
     if not task:
         return
     pipeline_id = task["pipeline_id"]
     task_type = task["type"]
-    models.update_agent_task(task_id, status="running")
-    models.insert_agent_action(task_id, "start", f"Running {task_type} on pipeline {pipeline_id}")
+    await run_in_threadpool(models.write, _record, task_id, "running", "start",
+                            f"Running {task_type} on pipeline {pipeline_id}")
 
     try:
         if task_type == "triage":
-            # Heuristic triage based on last run status + error keywords in latest logs
-            logs = models.get_logs(pipeline_id, limit=50)
-            text = "\n".join([l["content"] for l in logs])
-            severity = "low"
-            if "error" in text.lower() or "failed" in text.lower():
-                severity = "high"
-            result = {"kind": "triage", "severity": severity, "hints": ["Check failing steps", "Open pipeline detail"]}
-            models.update_agent_task(task_id, status="completed", result_json=json_dumps_safe(result))
-            models.insert_agent_action(task_id, "triage", f"severity={severity}")
+            result = await run_in_threadpool(_triage, pipeline_id)
+            await run_in_threadpool(models.write, _record, task_id, "completed", "triage",
+                                    f"severity={result['severity']}", result)
         elif task_type == "rca":
-            # Concatenate recent logs and call AI analyzer
-            logs = models.get_logs(pipeline_id, limit=100)
-            if not logs:
-                models.update_agent_task(task_id, status="failed", result_json=json_dumps_safe({"error": "no logs"}))
-                models.insert_agent_action(task_id, "rca", "no logs")
+            # Failure-focused excerpt of the pipeline's logs for the AI analyzer
+            context = await run_in_threadpool(pipeline_context, pipeline_id)
+            if context is None:
+                await run_in_threadpool(models.write, _record, task_id, "failed", "rca", "no logs", {"error": "no logs"})
                 return
-            joined = "\n\n".join([item["content"] for item in logs])
-            ai = analyze_logs_with_ai(joined)
+            local = await run_in_threadpool(classifier.classify, context)
+            ai = local if local is not None else await analyze_logs_with_ai(context)
             result = {"kind": "rca", **ai}
-            models.update_agent_task(task_id, status="completed", result_json=json_dumps_safe(result))
-            models.insert_agent_action(task_id, "rca", "ai_complete")
+            await run_in_threadpool(models.write, _record, task_id, "completed", "rca",
+                                    "ai_complete" if local is None else f"classified ({local['source']})", result)
         else:
             # Fix agent placeholder
-            models.update_agent_task(task_id, status="awaiting_approval", result_json=json_dumps_safe({"info": "fix plan requires approval"}))
-            models.insert_agent_action(task_id, "plan", "generated fix plan (placeholder)")
+            await run_in_threadpool(models.write, _record, task_id, "awaiting_approval", "plan",
+                                    "generated fix plan (placeholder)", {"info": "fix plan requires approval"})
     except Exception as e:
-        models.update_agent_task(task_id, status="failed", result_json=json_dumps_safe({"error": str(e)}))
-        models.insert_agent_action(task_id, "error", str(e))
+        await run_in_threadpool(models.write, _record, task_id, "failed", "error", str(e), {"error": str(e)})
 
 
 def json_dumps_safe(obj) -> str:
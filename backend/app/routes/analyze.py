@@ -1,8 +1,16 @@
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 from .. import models
+from ..services import ai, analysis_cache, analytics, batch_analysis, classifier
 from ..services.ai import analyze_logs_with_ai
+from ..services.context import pipeline_context
 
 
 router = APIRouter()
@@ -12,19 +20,132 @@ class AnalysisOut(BaseModel):
     root_cause: str
     suggested_fix: str
     confidence: str
+    source: str = "ai"  # ai | rules | similar
 
 
-@router.post("/analyze/{pipeline_id}", response_model=AnalysisOut)
-def analyze_pipeline(pipeline_id: str):
-    logs = models.get_logs(pipeline_id, limit=100)
-    if not logs:
+@router.get("/analyze/cache/stats")
+def cache_stats():
+    return analysis_cache.get_stats()
+
+
+@router.get("/analyze/classifier/stats")
+def classifier_stats():
+    return classifier.get_stats()
+
+
+class BatchAnalysisIn(BaseModel):
+    pipeline_ids: Optional[List[str]] = Field(None, max_length=batch_analysis.MAX_BATCH_PIPELINES,
+                                              description="Pipelines to analyze; or select them with the filters")
+    status: Optional[str] = Field(None, description="Filter: pipelines with this status, e.g. failed")
+    window: Optional[str] = Field(None, description="Filter: pipelines that ran within this window, e.g. 1h or 2d")
+    limit: int = Field(100, ge=1, le=batch_analysis.MAX_BATCH_PIPELINES,
+                       description="Most recently run pipelines taken by the filters")
+    pack: bool = Field(True, description="Let small log excerpts share one upstream request")
+
+
+async def _ndjson(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield (json.dumps(row) + "\n").encode("utf-8")
+
+
+# Declared before /analyze/{pipeline_id}, which would match "batch" too
+@router.post("/analyze/batch")
+async def analyze_batch(payload: BatchAnalysisIn):
+    """Analyze many pipelines; streams NDJSON, one line per pipeline as it completes.
+
+    Takes pipeline_ids, or status and/or window to select pipelines. The
+    last line is {"done": true, ...}, written once all analyses are saved.
+    """
+    if payload.pipeline_ids is not None:
+        pipeline_ids = payload.pipeline_ids
+    elif payload.status is None and payload.window is None:
+        raise HTTPException(status_code=400, detail="Give pipeline_ids, or status and/or window")
+    else:
+        try:
+            since = datetime.utcnow() - analytics.parse_window(payload.window) if payload.window else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pipeline_ids = await run_in_threadpool(batch_analysis.select_pipelines, payload.status, since, payload.limit)
+    return StreamingResponse(_ndjson(batch_analysis.analyze_batch(pipeline_ids, payload.pack)),
+                             media_type="application/x-ndjson")
+
+
+async def _prepare(pipeline_id: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """(context, cluster, result) for a pipeline; result is set (and saved) when
+    its failure cluster or the local classifier already knows the answer."""
+    context = await run_in_threadpool(pipeline_context, pipeline_id)
+    if context is None:
         raise HTTPException(status_code=404, detail="No logs for pipeline")
 
-    # Concatenate latest N logs
-    joined = "\n\n".join([item["content"] for item in logs[:20]])
-    ai = analyze_logs_with_ai(joined)
-    models.insert_analysis(pipeline_id, ai.get("root_cause", ""), ai.get("suggested_fix", ""), ai.get("confidence", "Low"))
-    return ai
+    # Pipelines failing the same way share one analysis per failure cluster
+    cluster = await run_in_threadpool(models.get_pipeline_cluster, pipeline_id)
+    if cluster and cluster["analyzed_at"]:
+        result = {"root_cause": cluster["root_cause"], "suggested_fix": cluster["fix"],
+                  "confidence": cluster["confidence"], "source": "cluster"}
+        await run_in_threadpool(_save_known_result, pipeline_id, cluster, result)
+        return context, cluster, result
+
+    local = await run_in_threadpool(classifier.classify, context)
+    if local is not None:
+        await run_in_threadpool(_save_known_result, pipeline_id, cluster, local)
+    return context, cluster, local
+
+
+def _save_known_result(pipeline_id: str, cluster: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    models.insert_analysis(pipeline_id, result["root_cause"], result["suggested_fix"], result["confidence"],
+                           source=result["source"])
+    if result["source"] != "cluster":
+        _share_with_cluster(cluster, result)
+
+
+def _share_with_cluster(cluster: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    if cluster and result.get("confidence", "Low") != "Low":
+        models.set_cluster_analysis(cluster["id"], result["root_cause"], result["suggested_fix"], result["confidence"])
+
+
+def _save_ai_result(pipeline_id: str, context: str, cluster: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    models.insert_analysis(
+        pipeline_id, result.get("root_cause", ""), result.get("suggested_fix", ""), result.get("confidence", "Low"),
+        evidence=context[:classifier.EVIDENCE_MAX_CHARS],
+    )
+    _share_with_cluster(cluster, result)
+
+
+@router.post("/analyze/{pipeline_id}/stream")
+async def analyze_pipeline_stream(pipeline_id: str):
+    """POST /analyze/{pipeline_id}, streamed as NDJSON while the model answers.
+
+    Lines {"field": "root_cause" | "suggested_fix", "delta": text} carry the
+    fields as they are generated; the last line, {"result": {...}}, is the
+    parsed analysis and is sent once it is saved. Cluster, classifier and
+    cached answers arrive as the result line alone.
+    """
+    context, cluster, known = await _prepare(pipeline_id)
+
+    async def events() -> AsyncIterator[Dict[str, Any]]:
+        if known is not None:
+            yield {"result": known}
+            return
+        async for event in ai.analyze_logs_with_ai_stream(context):
+            if "result" not in event:
+                yield event
+                continue
+            result = {**event["result"], "source": "ai"}
+            await run_in_threadpool(_save_ai_result, pipeline_id, context, cluster, result)
+            yield {"result": result}
+
+    return StreamingResponse(_ndjson(events()), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/analyze/{pipeline_id}", response_model=AnalysisOut)
+async def analyze_pipeline(pipeline_id: str):
+    context, cluster, known = await _prepare(pipeline_id)
+    if known is not None:
+        return known
+    result = await analyze_logs_with_ai(context)
+    await run_in_threadpool(_save_ai_result, pipeline_id, context, cluster, result)
+    return result
 # meta: housekeeping note 2024-11-25T16:29:16-05:00
 # meta: housekeeping note 2024-11-26T10:33:43-05:00
 # meta: housekeeping note 2024-11-29T13:55:58-05:00
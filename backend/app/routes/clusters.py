@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from .. import models
+from ..services import classifier
+from ..services.ai import analyze_logs_with_ai
+
+
+router = APIRouter(prefix="/clusters")
+
+
+@router.get("")
+def list_clusters(limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0)):
+    """Failure clusters with the most failed runs first."""
+    return models.list_failure_clusters(limit=limit, offset=offset)
+
+
+@router.get("/{cluster_id}")
+def get_cluster(cluster_id: int):
+    """One cluster with its member pipelines (most recently failing first)."""
+    cluster = models.get_failure_cluster(cluster_id)
+    if not cluster:
+        raise HTTPException(status_code=404, detail="Cluster not found")
+    return cluster
+
+
+@router.post("/{cluster_id}/analyze")
+async def analyze_cluster(cluster_id: int, refresh: bool = False):
+    """Analyze a cluster once from its sample; every member pipeline shares the result."""
+    cluster = await run_in_threadpool(models.get_failure_cluster, cluster_id, 0)
+    if not cluster:
+        raise HTTPException(status_code=404, detail="Cluster not found")
+    if cluster["analyzed_at"] and not refresh:
+        return {"root_cause": cluster["root_cause"], "suggested_fix": cluster["fix"],
+                "confidence": cluster["confidence"], "source": "cluster"}
+
+    result = await run_in_threadpool(classifier.classify, cluster["sample"] or "")
+    if result is None:
+        result = {**await analyze_logs_with_ai(cluster["sample"] or ""), "source": "ai"}
+    if result.get("confidence", "Low") != "Low":
+        await run_in_threadpool(models.set_cluster_analysis, cluster_id, result["root_cause"], result["suggested_fix"],
+                                result["confidence"])
+    return result
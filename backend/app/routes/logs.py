@@ -1,9 +1,15 @@
-from typing import List, Optional
+import re
+from datetime import datetime, timezone
+from typing import List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
-from .. import models
+from .. import models, paging
+from ..services import archive, clusters, export, pubsub
+from ..services.ingest import ingest_stream
 
 
 router = APIRouter()
@@ -15,6 +21,7 @@ class LogIn(BaseModel):
     name: Optional[str] = Field(None, description="Pipeline name")
     status: Optional[str] = Field(None, description="Pipeline status: success|failed|running|unknown")
     success_rate: Optional[float] = Field(None, ge=0, le=1, description="Optional success rate override (0..1)")
+    duration_seconds: Optional[float] = Field(None, ge=0, description="Run duration, recorded with a terminal status")
 
 
 class LogOut(BaseModel):
@@ -22,10 +29,10 @@ class LogOut(BaseModel):
     pipeline_id: str
     timestamp: str
     content: str
+    snippet: Optional[str] = None
 
 
-@router.post("/logs")
-def post_logs(payload: LogIn):
+def _store_logs(payload: LogIn) -> Tuple[int, Optional[int]]:
     models.upsert_pipeline(
         pipeline_id=payload.pipeline_id,
         name=payload.name,
@@ -33,18 +40,138 @@ def post_logs(payload: LogIn):
         success_rate=payload.success_rate,
     )
     log_id = models.insert_log(payload.pipeline_id, payload.logs)
+    run_id = None
     # If a terminal status is provided, record a run and recompute success rate
     if payload.status in {"success", "failed"}:
-        models.insert_run(payload.pipeline_id, payload.status)
+        run_id = models.insert_run(payload.pipeline_id, payload.status, payload.duration_seconds)
+    return log_id, run_id
+
+
+@router.post("/logs")
+def post_logs(payload: LogIn):
+    # One transaction (and with group commit, possibly shared with concurrent requests)
+    log_id, run_id = models.write(_store_logs, payload)
+    if run_id is not None and payload.status == "failed":
+        clusters.assign_run(run_id, payload.pipeline_id)
     return {"message": "logs stored", "log_id": log_id}
 
 
+@router.post("/logs/stream")
+async def post_logs_stream(
+    request: Request,
+    pipeline_id: str = Query(..., description="Unique pipeline identifier, e.g., GitHub run_id"),
+    name: Optional[str] = Query(None, description="Pipeline name"),
+    status: Optional[str] = Query(None, description="Pipeline status: success|failed|running|unknown"),
+    success_rate: Optional[float] = Query(None, ge=0, le=1, description="Optional success rate override (0..1)"),
+    duration_seconds: Optional[float] = Query(None, ge=0, description="Run duration, recorded with a terminal status"),
+):
+    """Stream a large log upload as raw text or NDJSON (Content-Type: application/x-ndjson).
+
+    Each line (or NDJSON record with a "content" field and optional "step")
+    becomes one log row. Rows are committed in batches while the body is read,
+    so an invalid or oversized NDJSON record gets a 400 after the records
+    before it were stored; its detail says how many ("lines") and which line
+    failed ("failed_line"), so the upload can resume after it.
+    """
+    await run_in_threadpool(
+        models.write, models.upsert_pipeline,
+        pipeline_id=pipeline_id, name=name, status=status, success_rate=success_rate,
+    )
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    result = await ingest_stream(pipeline_id, request.stream(), ndjson=ndjson)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail={**result, "error": f"invalid NDJSON record: {result['error']}"})
+    if status in {"success", "failed"}:
+        run_id = await run_in_threadpool(models.write, models.insert_run, pipeline_id, status, duration_seconds)
+        if status == "failed":
+            await run_in_threadpool(clusters.assign_run, run_id, pipeline_id)
+    return {"message": "logs stored", **result}
+
+
+@router.get("/logs/{pipeline_id}/stream")
+async def stream_logs(request: Request, pipeline_id: str, after: Optional[int] = None):
+    """Live tail as server-sent events ("log" events, id = log id).
+
+    Starts after the log id after (or the Last-Event-ID header a reconnecting
+    EventSource sends); without either, only logs written from now on.
+    """
+    cursor = after if after is not None else paging.last_event_id(request)
+    if cursor is None:
+        cursor = await run_in_threadpool(models.last_log_id, pipeline_id)
+    return pubsub.sse_response(
+        f"logs:{pipeline_id}", "log", cursor, "id",
+        lambda after, limit: models.get_logs_after(pipeline_id, after, limit),
+    )
+
+
+def _utc_iso(value: Optional[str], name: str) -> Optional[str]:
+    """ISO 8601 time as stored (naive UTC isoformat); 400 if unparseable."""
+    if value is None:
+        return None
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name}: expected an ISO 8601 time, e.g. 2024-06-01T12:00:00")
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.isoformat()
+
+
+@router.get("/logs/{pipeline_id}/export")
+def export_logs(pipeline_id: str, format: Literal["ndjson", "text"] = "ndjson", gzip: bool = False,
+                since: Optional[str] = Query(None, description="ISO time, inclusive"),
+                until: Optional[str] = Query(None, description="ISO time, exclusive")):
+    """All of a pipeline's logs (or those in [since, until)), oldest first, streamed.
+
+    NDJSON lines are {"id", "timestamp", "content"}; text is the bare content.
+    With gzip=true the body is a .gz file compressed on the fly. Logs moved
+    out by retention are not included (see /logs/{id}/archive).
+    """
+    since, until = _utc_iso(since, "since"), _utc_iso(until, "until")
+    if not models.last_log_id(pipeline_id):
+        raise HTTPException(status_code=404, detail="No logs for pipeline")
+    media_type, extension = export.FORMATS[format]
+    filename = re.sub(r"[^\w.-]", "_", pipeline_id) + "." + extension
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        export.encode(models.export_logs(pipeline_id, since, until), format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/logs/{pipeline_id}", response_model=List[LogOut])
-def get_logs(pipeline_id: str, limit: int = 50, offset: int = 0, q: Optional[str] = None):
-    logs = models.get_logs(pipeline_id, limit=limit, offset=offset, q=q)
+def get_logs(request: Request, response: Response, pipeline_id: str, limit: int = 50, offset: int = 0,
+             q: Optional[str] = None, before_id: Optional[int] = None):
+    # With q, results come from the full-text index ranked by relevance:
+    # words are ANDed, "quoted text" is a phrase, and word* is a prefix match.
+    # Without q, page with before_id (the X-Next-Cursor header) rather than offset.
+    cached = paging.not_modified(request, response, "logs")
+    if cached:
+        return cached
+    logs = models.get_logs(pipeline_id, limit=limit, offset=offset, q=q, before_id=before_id)
     if logs is None:
         raise HTTPException(status_code=404, detail="pipeline or logs not found")
+    if logs and not q:
+        paging.set_next_cursor(response, logs, limit, logs[-1]["id"])
+    return logs
+
+
+@router.get("/logs/{pipeline_id}/archive", response_model=List[LogOut])
+def get_archived_logs(response: Response, pipeline_id: str, limit: int = Query(50, ge=1, le=1000),
+                      before_id: Optional[int] = None):
+    """Logs moved out of the database by retention, newest first; page with before_id."""
+    logs = archive.get_archived_logs(pipeline_id, limit=limit, before_id=before_id)
+    if logs:
+        paging.set_next_cursor(response, logs, limit, logs[-1]["id"])
     return logs
+
+
+@router.get("/search/logs", response_model=List[LogOut])
+def search_all_logs(q: str, limit: int = 50, offset: int = 0):
+    """Full-text search across every pipeline's logs."""
+    return models.search_logs(q, limit=limit, offset=offset)
 # meta: housekeeping note 2024-11-04T16:09:26-05:00
 # meta: housekeeping note 2024-11-12T11:30:52-05:00
 # meta: housekeeping note 2024-11-13T09:58:47-05:00
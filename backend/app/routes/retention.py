@@ -0,0 +1,56 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from .. import models
+from ..services import maintenance
+
+
+router = APIRouter(prefix="/retention")
+
+
+class PolicyIn(BaseModel):
+    log_days: Optional[int] = Field(None, ge=0, description="Days raw logs stay in the database before archival; null: default, 0: forever")
+    run_days: Optional[int] = Field(None, ge=0, description="Days runs, analyses and finished agent tasks are kept; null: default, 0: forever")
+
+
+@router.get("/policies")
+def list_policies():
+    """Per-pipeline retention overrides and the defaults that apply elsewhere."""
+    return {
+        "defaults": {"log_days": maintenance.RETENTION_LOG_DAYS, "run_days": maintenance.RETENTION_RUN_DAYS},
+        "policies": models.list_retention_policies(),
+    }
+
+
+@router.put("/policies/{pipeline_id}")
+def put_policy(pipeline_id: str, policy: PolicyIn):
+    return models.set_retention_policy(pipeline_id, policy.log_days, policy.run_days)
+
+
+@router.delete("/policies/{pipeline_id}")
+def delete_policy(pipeline_id: str):
+    if not models.delete_retention_policy(pipeline_id):
+        raise HTTPException(status_code=404, detail="Policy not found")
+    return {"deleted": pipeline_id}
+
+
+@router.post("/run")
+async def run_retention():
+    """Apply retention now instead of waiting for the next scheduled pass."""
+    return await maintenance.retention_once()
+
+
+@router.post("/vacuum")
+async def run_vacuum(full: bool = False):
+    """Reclaim free space now; full=true rewrites the SQLite file (blocks writers while it runs)."""
+    return await run_in_threadpool(models.vacuum, full)
+
+
+@router.get("/archives")
+def list_archives(pipeline_id: Optional[str] = None, before_id: Optional[int] = None,
+                  limit: int = Query(100, ge=1, le=1000)):
+    """Index of archived log segments, newest first."""
+    return models.list_log_archives(pipeline_id, before_id=before_id, limit=limit)
@@ -1,79 +1,95 @@
 from fastapi import APIRouter
 from datetime import datetime, timedelta
+from typing import List
 from .. import models
+from ..services import analysis_cache, archive, classifier, clusters
 
 
 router = APIRouter()
 
 
+# Hand-written demo pipelines; bench/generate.py uses their runs as templates.
+# Each run: (age, status, log lines).
+SCENARIOS = [
+    {
+        "id": "demo-1",
+        "name": "Demo Pipeline",
+        "runs": [
+            (timedelta(days=2), "success", [
+                "Checkout code",
+                "Install dependencies",
+                "Run tests: 124 passed",
+                "Build docker image: success",
+            ]),
+            (timedelta(days=1), "failed", [
+                "Checkout code",
+                "Install dependencies",
+                "Run tests: 2 failed, 122 passed",
+                "FAILED tests/unit/test_api.py::test_create_user - AssertionError: expected 201 got 400",
+            ]),
+        ],
+    },
+    {
+        "id": "demo-2",
+        "name": "Infra Deploy",
+        "runs": [
+            (timedelta(days=3), "failed", [
+                "Terraform init",
+                "Terraform plan",
+                "Error: Provider registry.terraform.io timeout",
+                "Hint: Check network or provider version pinning",
+            ]),
+            (timedelta(days=1), "success", [
+                "Terraform apply",
+                "Outputs saved",
+            ]),
+        ],
+    },
+    {
+        "id": "demo-3",
+        "name": "Web App CI",
+        "runs": [
+            (timedelta(hours=12), "failed", [
+                "npm ci",
+                "npm run build",
+                "ERROR in src/App.tsx: Cannot find module '@/components/Button'",
+                "Build failed with exit code 2",
+            ]),
+        ],
+    },
+]
+
+
+def run_logs(started: datetime, lines: List[str]) -> List[str]:
+    """A run's log rows as /seed stores them: one line a minute from started."""
+    return [f"[{(started + timedelta(minutes=i)).isoformat()}] {content}" for i, content in enumerate(lines)]
+
+
 @router.post("/seed")
 def seed_demo_data():
     """Populate the database with synthetic demo pipelines, logs, and runs."""
     now = datetime.utcnow()
 
-    samples = [
-        {
-            "id": "demo-1",
-            "name": "Demo Pipeline",
-            "runs": [
-                (now - timedelta(days=2), "success", [
-                    "Checkout code",
-                    "Install dependencies",
-                    "Run tests: 124 passed",
-                    "Build docker image: success",
-                ]),
-                (now - timedelta(days=1), "failed", [
-                    "Checkout code",
-                    "Install dependencies",
-                    "Run tests: 2 failed, 122 passed",
-                    "FAILED tests/unit/test_api.py::test_create_user - AssertionError: expected 201 got 400",
-                ]),
-            ],
-        },
-        {
-            "id": "demo-2",
-            "name": "Infra Deploy",
-            "runs": [
-                (now - timedelta(days=3), "failed", [
-                    "Terraform init",
-                    "Terraform plan",
-                    "Error: Provider registry.terraform.io timeout",
-                    "Hint: Check network or provider version pinning",
-                ]),
-                (now - timedelta(days=1), "success", [
-                    "Terraform apply",
-                    "Outputs saved",
-                ]),
-            ],
-        },
-        {
-            "id": "demo-3",
-            "name": "Web App CI",
-            "runs": [
-                (now - timedelta(hours=12), "failed", [
-                    "npm ci",
-                    "npm run build",
-                    "ERROR in src/App.tsx: Cannot find module '@/components/Button'",
-                    "Build failed with exit code 2",
-                ]),
-            ],
-        },
-    ]
-
-    for p in samples:
-        models.upsert_pipeline(pipeline_id=p["id"], name=p["name"], status="unknown")
-        for (ts, status, lines) in p["runs"]:
-            # Insert logs with timestamps near the run
-            for i, content in enumerate(lines):
-                models.insert_log(pipeline_id=p["id"], content=f"[{(ts + timedelta(minutes=i)).isoformat()}] {content}")
-            if status in {"success", "failed"}:
-                models.insert_run(pipeline_id=p["id"], status=status)
+    with models.transaction():
+        for p in SCENARIOS:
+            models.upsert_pipeline(pipeline_id=p["id"], name=p["name"], status="unknown")
+            for (age, status, lines) in p["runs"]:
+                ts = now - age
+                # Insert logs with timestamps near the run
+                models.insert_logs(p["id"], run_logs(ts, lines))
+                if status in {"success", "failed"}:
+                    run_id = models.insert_run(pipeline_id=p["id"], status=status)
+                    if status == "failed":
+                        clusters.assign_run(run_id, p["id"])
 
-    return {"message": "seeded", "pipelines": [p["id"] for p in samples]}
+    return {"message": "seeded", "pipelines": [p["id"] for p in SCENARIOS]}
 
 
 @router.post("/seed/reset")
 def reset_demo_data():
-    models.clear_all()
+    segments = models.clear_all()
+    archive.delete_segments(segments)
+    analysis_cache.clear_memory()
+    classifier.reset()
     return {"message": "reset complete"}
 
@@ -0,0 +1,49 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+
+from .. import models
+from ..services import analytics
+
+
+router = APIRouter()
+
+
+@router.get("/pipelines/{pipeline_id}/stats")
+def pipeline_stats(pipeline_id: str):
+    """Run totals, last-N outcomes, mean duration and 24h/7d/30d success rates."""
+    stats = models.get_pipeline_stats(pipeline_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="pipeline not found")
+    return stats
+
+
+@router.get("/pipelines/{pipeline_id}/analytics")
+def pipeline_analytics(
+    pipeline_id: str,
+    granularity: Literal["hour", "day", "week"] = "day",
+    window: str = Query("30d", description="Length ending now: a number followed by h, d or w"),
+):
+    """Success rate, failures, MTTR and run counts per hour/day/week, from the run rollups."""
+    try:
+        result = analytics.pipeline_analytics(pipeline_id, granularity, analytics.parse_window(window))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="pipeline not found")
+    return result
+
+
+@router.post("/stats/check")
+def check_stats(repair: bool = False):
+    """Verify incremental run aggregates against the runs table; optionally rebuild them."""
+    mismatches = models.check_run_stats()
+    if mismatches and repair:
+        models.rebuild_run_stats()
+    return {"consistent": not mismatches, "mismatches": mismatches, "repaired": bool(mismatches and repair)}
+
+
+@router.get("/stats/storage")
+def storage_stats():
+    """Row counts and stored bytes per log codec, the dedup chunk store, and total database size."""
+    return models.log_storage_stats()
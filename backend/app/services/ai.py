@@ -1,12 +1,191 @@
+import asyncio
 import json
 import os
+import random
 import re
-from typing import Dict
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-import requests
+import httpx
 
+from .. import metrics
+from . import analysis_cache
 
-def analyze_logs_with_ai(logs: str) -> Dict[str, str]:
+
+# One pooled keep-alive client is shared by every analysis. AI_MAX_CONCURRENCY
+# caps in-flight upstream requests, and AI_DEADLINE bounds a whole call
+# including retries.
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "32"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_BACKOFF_BASE = float(os.getenv("AI_BACKOFF_BASE", "0.5"))
+AI_DEADLINE = float(os.getenv("AI_DEADLINE", "30"))
+
+SYSTEM_PROMPT = (
+    "You are DevOps Copilot. Analyze CI/CD logs and return a concise JSON with keys"
+    " root_cause, suggested_fix, and confidence (High/Medium/Low). Respond with only JSON."
+)
+USER_PROMPT_PREFIX = "Analyze the following GitHub Actions logs and identify the likely root cause and a fix.\n\n"
+TEMPERATURE = 0.2
+MAX_LOG_CHARS = 12000
+
+# Small excerpts can share one request: each section is labelled and the
+# model answers with one object per label.
+AI_PACK_MAX_CHARS = int(os.getenv("AI_PACK_MAX_CHARS", "2000"))  # larger excerpts get a request of their own
+AI_PACK_MAX_ITEMS = int(os.getenv("AI_PACK_MAX_ITEMS", "6"))
+PACK_SYSTEM_PROMPT = (
+    "You are DevOps Copilot. Each section below holds the CI/CD logs of a different pipeline, headed by a label."
+    " Analyze every section on its own and return one JSON object mapping each label to an object with keys"
+    " root_cause, suggested_fix, and confidence (High/Medium/Low). Respond with only JSON."
+)
+PACK_PROMPT_PREFIX = "Analyze each of the following GitHub Actions logs separately.\n\n"
+
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+_AI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+metrics.histogram("ai_upstream_request_seconds", "One HTTP attempt against the completions API", ("status",), _AI_BUCKETS)
+metrics.histogram("ai_completion_duration_seconds", "Whole completion including retries and backoff", ("outcome",),
+                  _AI_BUCKETS)
+metrics.counter("ai_tokens_total", "Tokens billed by the completions API", ("kind",))
+metrics.histogram("ai_first_token_seconds", "Streamed completions: request start to first content", (), _AI_BUCKETS)
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _semaphore
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(max_connections=AI_MAX_CONNECTIONS, max_keepalive_connections=AI_MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(limits=limits, timeout=AI_DEADLINE)
+        _semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return _client
+
+
+async def aclose() -> None:
+    """Close the shared HTTP client (called on app shutdown)."""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _semaphore = None
+
+
+def model_name() -> str:
+    return os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+
+def _placeholder() -> Dict[str, str]:
+    return {
+        "root_cause": "OpenAI API key not configured. Returning placeholder analysis.",
+        "suggested_fix": "Set OPENAI_API_KEY and re-run analysis.",
+        "confidence": "Low",
+    }
+
+
+def _failure() -> Dict[str, str]:
+    return {
+        "root_cause": "Failed to reach OpenAI API or parse response.",
+        "suggested_fix": "Check network connectivity and API key permissions.",
+        "confidence": "Low",
+    }
+
+
+def _load_json(content: str) -> Any:
+    content = content.strip()
+    # Attempt to parse JSON, tolerating code fences
+    try:
+        return json.loads(content)
+    except Exception:
+        # Strip markdown code fences if present
+        fenced = re.match(r"```(?:json)?\n(.*)\n```", content, re.DOTALL)
+        if fenced:
+            return json.loads(fenced.group(1))
+        # Fallback: extract the largest JSON-looking block
+        start = content.find("{")
+        end = content.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            return json.loads(content[start:end+1])
+        raise
+
+
+def _normalize(result: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "root_cause": result.get("root_cause") or result.get("rootCause") or "Unknown",
+        "suggested_fix": result.get("suggested_fix") or result.get("fix") or "Investigate further.",
+        "confidence": result.get("confidence") or "Low",
+    }
+
+
+def _parse_content(content: str) -> Dict[str, str]:
+    return _normalize(_load_json(content))
+
+
+async def _post_with_retry(url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> httpx.Response:
+    client = _get_client()
+    assert _semaphore is not None
+    attempt = 0
+    while True:
+        status = "error"
+        started = time.perf_counter()
+        try:
+            async with _semaphore:
+                resp = await client.post(url, headers=headers, json=payload)
+            status = str(resp.status_code)
+            if resp.status_code not in _RETRY_STATUSES or attempt >= AI_MAX_RETRIES:
+                resp.raise_for_status()
+                return resp
+        except httpx.TransportError:
+            if attempt >= AI_MAX_RETRIES:
+                raise
+        finally:
+            metrics.observe("ai_upstream_request_seconds", (status,), time.perf_counter() - started)
+        # Exponential backoff with full jitter
+        await asyncio.sleep(random.uniform(0, AI_BACKOFF_BASE * (2 ** attempt)))
+        attempt += 1
+
+
+async def _chat(system: str, user: str) -> str:
+    """Run one chat completion and return its content; raises on any failure."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    url = f"{base_url.rstrip('/')}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": model_name(),
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        "temperature": TEMPERATURE,
+        "response_format": {"type": "json_object"},
+    }
+    outcome = "error"
+    started = time.perf_counter()
+    try:
+        resp = await asyncio.wait_for(_post_with_retry(url, headers, payload), AI_DEADLINE)
+        data = resp.json()
+        usage = data.get("usage") or {}
+        metrics.inc("ai_tokens_total", ("prompt",), usage.get("prompt_tokens", 0))
+        metrics.inc("ai_tokens_total", ("completion",), usage.get("completion_tokens", 0))
+        content = data["choices"][0]["message"]["content"]
+        outcome = "ok"
+        return content
+    finally:
+        metrics.observe("ai_completion_duration_seconds", (outcome,), time.perf_counter() - started)
+
+
+async def _complete(logs: str) -> Dict[str, str]:
+    """Run one chat completion and parse it; raises on any failure."""
+    # trim to avoid excessive payload
+    return _parse_content(await _chat(SYSTEM_PROMPT, USER_PROMPT_PREFIX + logs[:MAX_LOG_CHARS]))
+
+
+async def analyze_logs_with_ai(logs: str, use_cache: bool = True) -> Dict[str, str]:
     """
     Sends logs to OpenAI Chat Completions API and expects a strict JSON response:
     {
@@ -15,70 +194,258 @@ def analyze_logs_with_ai(logs: str) -> Dict[str, str]:
         "confidence": "High|Medium|Low"
     }
 
+    Identical requests (same normalized logs, model, prompt and temperature)
+    are served from the analysis cache unless use_cache is False.
     Falls back to a mocked response when API key is missing or request fails.
     """
+    if not os.getenv("OPENAI_API_KEY"):
+        return _placeholder()
+
+    logs = analysis_cache.normalize_logs(logs)[:MAX_LOG_CHARS]
+    try:
+        if not use_cache:
+            return await _complete(logs)
+        key = analysis_cache.make_key(logs, model_name(), SYSTEM_PROMPT + USER_PROMPT_PREFIX, TEMPERATURE)
+        return await analysis_cache.get_or_compute(key, lambda: _complete(logs))
+    except Exception:
+        return _failure()
+
+
+class _PartialFields:
+    """Reads the top-level string fields of a JSON object that arrives in pieces.
+
+    Text before the object (a code fence, a sentence) is skipped, escapes are
+    decoded, nested values are passed over. feed() returns the text added to
+    each wanted field; it is a preview only, the result is parsed from the
+    full answer.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, fields: Dict[str, str]) -> None:
+        self.fields = fields  # JSON key -> name reported
+        self.depth = 0
+        self.done = False
+        self.in_string = False
+        self.escape = ""
+        self.expect_key = False
+        self.reading_key = False
+        self.key: Optional[str] = None
+        self.key_chars: List[str] = []
+        self.target: Optional[str] = None
+
+    def feed(self, text: str) -> Dict[str, str]:
+        added: Dict[str, str] = {}
+        for ch in text:
+            if self.depth == 0:
+                if ch == "{" and not self.done:
+                    self.depth, self.expect_key = 1, True
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape += ch
+                    if self.escape[1] == "u":
+                        if len(self.escape) < 6:
+                            continue
+                        try:
+                            ch = chr(int(self.escape[2:], 16))
+                        except ValueError:
+                            ch = ""
+                    else:
+                        ch = self._ESCAPES.get(ch, ch)
+                    self.escape = ""
+                elif ch == "\\":
+                    self.escape = ch
+                    continue
+                elif ch == '"':
+                    self.in_string = False
+                    if self.reading_key:
+                        self.key = "".join(self.key_chars)
+                    continue
+                if self.reading_key:
+                    self.key_chars.append(ch)
+                elif self.target:
+                    added[self.target] = added.get(self.target, "") + ch
+                continue
+            if ch == '"':
+                self.in_string = True
+                self.reading_key = self.depth == 1 and self.expect_key
+                self.key_chars = []
+                self.target = self.fields.get(self.key or "") if self.depth == 1 and not self.reading_key else None
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                self.done = self.depth == 0
+            elif self.depth == 1 and ch == ":":
+                self.expect_key = False
+            elif self.depth == 1 and ch == ",":
+                self.expect_key, self.key = True, None
+        return added
+
+
+_PREVIEW_FIELDS = {"root_cause": "root_cause", "rootCause": "root_cause",
+                   "suggested_fix": "suggested_fix", "fix": "suggested_fix"}
+
+
+@asynccontextmanager
+async def _open_stream(client: httpx.AsyncClient, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                       deadline: float) -> AsyncIterator[httpx.Response]:
+    """client.stream("POST", ...) whose wait for the response ends at deadline (a perf_counter time)."""
+    request = client.build_request("POST", url, headers=headers, json=payload)
+    resp = await asyncio.wait_for(client.send(request, stream=True), deadline - time.perf_counter())
+    try:
+        yield resp
+    finally:
+        await resp.aclose()
+
+
+async def _stream_chat(system: str, user: str) -> AsyncIterator[str]:
+    """Run one chat completion with stream=true and yield content as it arrives.
+
+    Retries like _post_with_retry until the response starts; a stream that
+    breaks after that raises. AI_DEADLINE bounds the whole call: each wait
+    (the response, every read) gets only the time left, so a stalled stream
+    raises asyncio.TimeoutError and frees its semaphore slot.
+    """
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return {
-            "root_cause": "OpenAI API key not configured. Returning placeholder analysis.",
-            "suggested_fix": "Set OPENAI_API_KEY and re-run analysis.",
-            "confidence": "Low",
-        }
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    url = f"{base_url.rstrip('/')}/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    payload = {
+        "model": model_name(),
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        "temperature": TEMPERATURE,
+        "response_format": {"type": "json_object"},
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+    client = _get_client()
+    assert _semaphore is not None
+    outcome = "error"
+    started = time.perf_counter()
+    deadline = started + AI_DEADLINE
+    streamed = False
+    attempt = 0
+    try:
+        while True:
+            status = "error"
+            attempt_started = time.perf_counter()
+            try:
+                async with _semaphore, _open_stream(client, url, headers, payload, deadline) as resp:
+                    status = str(resp.status_code)
+                    if resp.status_code not in _RETRY_STATUSES or attempt >= AI_MAX_RETRIES:
+                        resp.raise_for_status()
+                        lines = resp.aiter_lines()
+                        while True:
+                            try:
+                                line = await asyncio.wait_for(lines.__anext__(), deadline - time.perf_counter())
+                            except StopAsyncIteration:
+                                break
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            chunk = json.loads(data)
+                            usage = chunk.get("usage") or {}
+                            metrics.inc("ai_tokens_total", ("prompt",), usage.get("prompt_tokens", 0))
+                            metrics.inc("ai_tokens_total", ("completion",), usage.get("completion_tokens", 0))
+                            choices = chunk.get("choices") or [{}]
+                            content = (choices[0].get("delta") or {}).get("content")
+                            if not content:
+                                continue
+                            if not streamed:
+                                streamed = True
+                                metrics.observe("ai_first_token_seconds", (), time.perf_counter() - started)
+                            yield content
+                        outcome = "ok"
+                        return
+            except httpx.TransportError:
+                if streamed or attempt >= AI_MAX_RETRIES:
+                    raise
+            finally:
+                metrics.observe("ai_upstream_request_seconds", (status,), time.perf_counter() - attempt_started)
+            # Exponential backoff with full jitter
+            await asyncio.sleep(random.uniform(0, AI_BACKOFF_BASE * (2 ** attempt)))
+            attempt += 1
+    finally:
+        metrics.observe("ai_completion_duration_seconds", (outcome,), time.perf_counter() - started)
+
+
+async def analyze_logs_with_ai_stream(logs: str) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming analyze_logs_with_ai.
 
+    Yields {"field": "root_cause" | "suggested_fix", "delta": text} while the
+    answer arrives, then {"result": {...}} parsed from the whole answer with
+    the same tolerance and fallbacks as the non-streaming call. Cached results
+    (shared with analyze_logs_with_ai) come back at once, without deltas.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        yield {"result": _placeholder()}
+        return
+
+    logs = analysis_cache.normalize_logs(logs)[:MAX_LOG_CHARS]
+    key = analysis_cache.make_key(logs, model_name(), SYSTEM_PROMPT + USER_PROMPT_PREFIX, TEMPERATURE)
+    cached = await analysis_cache.lookup(key)
+    if cached is not None:
+        yield {"result": cached}
+        return
+    fields = _PartialFields(_PREVIEW_FIELDS)
+    parts: List[str] = []
     try:
-        base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
-        model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-        url = f"{base_url.rstrip('/')}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        system_prompt = (
-            "You are DevOps Copilot. Analyze CI/CD logs and return a concise JSON with keys"
-            " root_cause, suggested_fix, and confidence (High/Medium/Low). Respond with only JSON."
-        )
-        user_prompt = (
-            "Analyze the following GitHub Actions logs and identify the likely root cause and a fix.\n\n"
-            + logs[:12000]  # trim to avoid excessive payload
-        )
-        payload = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            "temperature": 0.2,
-            "response_format": {"type": "json_object"},
-        }
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        content = data["choices"][0]["message"]["content"].strip()
-        # Attempt to parse JSON, tolerating code fences
+        async for content in _stream_chat(SYSTEM_PROMPT, USER_PROMPT_PREFIX + logs):
+            parts.append(content)
+            for field, delta in fields.feed(content).items():
+                yield {"field": field, "delta": delta}
+        result = _parse_content("".join(parts))
+    except Exception:
+        yield {"result": _failure()}
+        return
+    await analysis_cache.store(key, result)
+    yield {"result": result}
+
+
+def _pack_label(index: int) -> str:
+    return f"log-{index + 1}"
+
+
+async def _complete_packed(logs: List[str]) -> List[Optional[Dict[str, str]]]:
+    sections = "\n\n".join(f"### {_pack_label(i)}\n{text}" for i, text in enumerate(logs))
+    answer = _load_json(await _chat(PACK_SYSTEM_PROMPT, PACK_PROMPT_PREFIX + sections))
+    if not isinstance(answer, dict):
+        raise ValueError("packed answer is not a JSON object")
+    found = [answer.get(_pack_label(i)) for i in range(len(logs))]
+    return [_normalize(item) if isinstance(item, dict) else None for item in found]
+
+
+async def analyze_packed_with_ai(logs: List[str]) -> List[Dict[str, str]]:
+    """Analyze several small, unrelated log excerpts with one upstream request.
+
+    Each excerpt is cached on its own (under the packed prompt), so only the
+    uncached ones are sent. Excerpts the packed answer leaves out, or all of
+    them if it cannot be parsed, fall back to one analyze_logs_with_ai each.
+    Results are in input order.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        return [_placeholder() for _ in logs]
+
+    logs = [analysis_cache.normalize_logs(text)[:AI_PACK_MAX_CHARS] for text in logs]
+    keys = [analysis_cache.make_key(text, model_name(), PACK_SYSTEM_PROMPT + PACK_PROMPT_PREFIX, TEMPERATURE)
+            for text in logs]
+    results: List[Optional[Dict[str, str]]] = list(await asyncio.gather(*(analysis_cache.lookup(key) for key in keys)))
+    missing = [i for i, result in enumerate(results) if result is None]
+    if len(missing) > 1:
         try:
-            result = json.loads(content)
+            answers = await _complete_packed([logs[i] for i in missing])
         except Exception:
-            # Strip markdown code fences if present
-            fenced = re.match(r"```(?:json)?\n(.*)\n```", content, re.DOTALL)
-            if fenced:
-                result = json.loads(fenced.group(1))
-            else:
-                # Fallback: extract the largest JSON-looking block
-                start = content.find("{")
-                end = content.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    result = json.loads(content[start:end+1])
-                else:
-                    raise
-        # Normalize keys
-        return {
-            "root_cause": result.get("root_cause") or result.get("rootCause") or "Unknown",
-            "suggested_fix": result.get("suggested_fix") or result.get("fix") or "Investigate further.",
-            "confidence": result.get("confidence") or "Low",
-        }
-    except Exception:
-        return {
-            "root_cause": "Failed to reach OpenAI API or parse response.",
-            "suggested_fix": "Check network connectivity and API key permissions.",
-            "confidence": "Low",
-        }
+            answers = [None] * len(missing)
+        for i, answer in zip(missing, answers):
+            if answer is not None:
+                await analysis_cache.store(keys[i], answer)
+                results[i] = answer
+    # The fallbacks run side by side; _semaphore still caps the requests in flight
+    missing = [i for i, result in enumerate(results) if result is None]
+    for i, result in zip(missing, await asyncio.gather(*(analyze_logs_with_ai(logs[i]) for i in missing))):
+        results[i] = result
+    return [dict(result) for result in results if result is not None]
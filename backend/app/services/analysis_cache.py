@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from .. import metrics, models
+
+
+# In-memory LRU in front of the persistent analysis_cache table. Identical
+# concurrent requests share one upstream call (single-flight). The LRU and
+# the in-flight futures live on the event loop; table reads and writes run in
+# the threadpool.
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "512"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+AI_CACHE_MAX_ROWS = int(os.getenv("AI_CACHE_MAX_ROWS", "10000"))
+_EVICT_EVERY = 64  # persistent puts between eviction passes
+
+_memory: "OrderedDict[str, tuple]" = OrderedDict()
+_memory_lock = threading.Lock()
+_inflight: Dict[str, asyncio.Future] = {}
+_puts = 0
+
+stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "coalesced": 0}
+metrics.counter_from("analysis_cache_lookups_total", "Analysis cache lookups by outcome", "result", stats)
+
+
+def normalize_logs(text: str) -> str:
+    """Canonical form used both for the cache key and the prompt sent upstream."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def make_key(logs: str, model: str, prompt: str, temperature: float) -> str:
+    material = json.dumps([model, prompt, temperature, logs], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _not_before() -> str:
+    return (datetime.utcnow() - timedelta(seconds=AI_CACHE_TTL)).isoformat()
+
+
+def _memory_get(key: str):
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires < datetime.utcnow().timestamp():
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return dict(result)
+
+
+def _memory_put(key: str, result: Dict[str, Any]) -> None:
+    with _memory_lock:
+        _memory[key] = (datetime.utcnow().timestamp() + AI_CACHE_TTL, dict(result))
+        _memory.move_to_end(key)
+        while len(_memory) > AI_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _persist(key: str, result: Dict[str, Any]) -> None:
+    """Blocking: run it in the threadpool."""
+    global _puts
+    models.put_cached_analysis(key, result)
+    _puts += 1
+    if _puts % _EVICT_EVERY == 0:
+        models.evict_cached_analyses(_not_before(), AI_CACHE_MAX_ROWS)
+
+
+async def get_or_compute(key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Return the cached result for key, or run compute() once and cache it.
+
+    Failures raised by compute() are not cached and propagate to every caller
+    waiting on the same key.
+    """
+    hit = _memory_get(key)
+    if hit is not None:
+        stats["memory_hits"] += 1
+        return hit
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        stats["coalesced"] += 1
+        return dict(await asyncio.shield(pending))
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await run_in_threadpool(models.get_cached_analysis, key, _not_before())
+        if result is not None:
+            stats["db_hits"] += 1
+        else:
+            stats["misses"] += 1
+            result = await compute()
+            await run_in_threadpool(_persist, key, result)
+        _memory_put(key, result)
+        future.set_result(result)
+        return dict(result)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """Cached result for key (memory, then the table), or None; counted like get_or_compute."""
+    hit = _memory_get(key)
+    if hit is not None:
+        stats["memory_hits"] += 1
+        return hit
+    result = await run_in_threadpool(models.get_cached_analysis, key, _not_before())
+    if result is None:
+        stats["misses"] += 1
+        return None
+    stats["db_hits"] += 1
+    _memory_put(key, result)
+    return dict(result)
+
+
+async def store(key: str, result: Dict[str, Any]) -> None:
+    await run_in_threadpool(_persist, key, result)
+    _memory_put(key, result)
+
+
+def clear_memory() -> None:
+    """Drop the in-memory entries (the table is cleared by models.clear_all)."""
+    with _memory_lock:
+        _memory.clear()
+
+
+def get_stats() -> Dict[str, Any]:
+    lookups = sum(stats.values())
+    hits = stats["memory_hits"] + stats["db_hits"] + stats["coalesced"]
+    with _memory_lock:
+        size = len(_memory)
+    return {**stats, "hit_rate": hits / lookups if lookups else 0.0, "memory_entries": size}
+
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .. import models
+
+
+# Time series per pipeline, read from the rollups insert_run maintains (hourly
+# and daily tables; weeks are summed from days), so a query costs one row per
+# bucket however many runs it covers. Buckets are UTC; weeks start on Monday.
+MAX_BUCKETS = 2000
+
+_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}
+_UNITS = {"h": timedelta(hours=1), "d": timedelta(days=1), "w": timedelta(weeks=1)}
+_COUNTERS = ("total", "successes", "failures", "duration_sum", "duration_count", "recoveries", "recovery_seconds")
+
+
+def parse_window(window: str) -> timedelta:
+    """'24h', '30d', '12w' -> timedelta; ValueError otherwise."""
+    unit = _UNITS.get(window[-1:])
+    if unit is None or not window[:-1].isdigit() or int(window[:-1]) <= 0:
+        raise ValueError(f"invalid window {window!r}: use a number followed by h, d or w")
+    return int(window[:-1]) * unit
+
+
+def _floor(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday()) if granularity == "week" else day
+
+
+def _label(start: datetime, granularity: str) -> str:
+    return start.isoformat()[:13] if granularity == "hour" else start.date().isoformat()
+
+
+def _summary(acc: Dict[str, float]) -> Dict[str, Any]:
+    total, successes, recoveries = acc["total"], acc["successes"], acc["recoveries"]
+    return {
+        "runs": int(total),
+        "successes": int(successes),
+        "failures": int(acc["failures"]),
+        "success_rate": successes / total if total else None,
+        "mean_duration_seconds": acc["duration_sum"] / acc["duration_count"] if acc["duration_count"] else None,
+        "recoveries": int(recoveries),
+        "mttr_seconds": acc["recovery_seconds"] / recoveries if recoveries else None,
+    }
+
+
+def pipeline_analytics(pipeline_id: str, granularity: str, window: timedelta,
+                       now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Success rate, failures, MTTR and run counts per bucket over the window ending now.
+
+    The window is rounded to whole buckets, the current (partial) one last.
+    Buckets without runs are included with zero counts. MTTR counts a recovery
+    in the bucket of the success that ended the failure streak. None if the
+    pipeline does not exist; ValueError if the window holds too many buckets.
+    """
+    step = _STEPS[granularity]
+    count = -(-window // step)  # ceil
+    if count > MAX_BUCKETS:
+        raise ValueError(f"window holds {count} {granularity} buckets (max {MAX_BUCKETS})")
+    last = _floor(now or datetime.utcnow(), granularity)
+    starts = [last - step * i for i in reversed(range(count))]
+    rollup = "hour" if granularity == "hour" else "day"
+    width = models.ROLLUPS[rollup][1]
+    end = last + step - timedelta(microseconds=1)
+    found = models.get_run_rollups(pipeline_id, rollup, starts[0].isoformat()[:width], end.isoformat()[:width])
+    if found is None:
+        return None
+
+    by_bucket: Dict[str, Dict[str, float]] = {}
+    for row in found["rows"]:
+        start = datetime.fromisoformat(row["bucket"] + (":00" if rollup == "hour" else ""))
+        acc = by_bucket.setdefault(_label(_floor(start, granularity), granularity), dict.fromkeys(_COUNTERS, 0))
+        for key in _COUNTERS:
+            acc[key] += row[key] or 0
+    totals = dict.fromkeys(_COUNTERS, 0)
+    for acc in by_bucket.values():
+        for key in _COUNTERS:
+            totals[key] += acc[key]
+    empty = _summary(dict.fromkeys(_COUNTERS, 0))
+    buckets: List[Dict[str, Any]] = []
+    for start in starts:
+        label = _label(start, granularity)
+        acc = by_bucket.get(label)
+        buckets.append({"bucket": label, **(_summary(acc) if acc else empty)})
+    days = count * step / timedelta(days=1)
+    return {
+        "pipeline_id": pipeline_id,
+        "granularity": granularity,
+        "since": starts[0].isoformat(),
+        "until": (last + step).isoformat(),
+        "failing_since": found["failing_since"],
+        "totals": {**_summary(totals), "runs_per_day": totals["total"] / days},
+        "buckets": buckets,
+    }
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .. import models
+
+
+# Expired log rows leave the database as gzip-compressed NDJSON. Each pipeline
+# has one append-only file per month; every archived batch is appended as its
+# own gzip member and indexed in log_archives by byte range, so a batch can be
+# read back without scanning the file (and `zcat file` still prints it all).
+# With several backend hosts this directory must be shared storage.
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR") or os.path.join(os.path.dirname(models.DB_PATH), "archive")
+LOG_ARCHIVE_LEVEL = int(os.getenv("LOG_ARCHIVE_LEVEL", "9"))  # written once, read rarely
+
+_UNSAFE = re.compile(r"[^\w.-]")
+
+
+def _pipeline_dir(pipeline_id: str) -> str:
+    # Readable prefix plus a hash, so distinct ids never share a directory
+    digest = hashlib.sha1(pipeline_id.encode("utf-8")).hexdigest()[:10]
+    return f"{_UNSAFE.sub('_', pipeline_id)[:64]}-{digest}"
+
+
+def append_segment(pipeline_id: str, rows: List[Dict[str, Any]]) -> Tuple[str, int, int]:
+    """Append rows as one gzip member; returns (relative path, byte offset, byte length).
+
+    The data is fsynced before returning, so the caller may delete the rows.
+    """
+    body = "".join(json.dumps({"id": r["id"], "timestamp": r["timestamp"], "content": r["content"]}) + "\n"
+                   for r in rows)
+    data = gzip.compress(body.encode("utf-8"), compresslevel=LOG_ARCHIVE_LEVEL)
+    path = os.path.join(_pipeline_dir(pipeline_id), datetime.utcnow().strftime("%Y-%m") + ".ndjson.gz")
+    full_path = os.path.join(LOG_ARCHIVE_DIR, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return path, offset, len(data)
+
+
+def read_segment(segment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The rows of one log_archives entry, oldest first."""
+    with open(os.path.join(LOG_ARCHIVE_DIR, segment["path"]), "rb") as f:
+        f.seek(segment["byte_offset"])
+        data = f.read(segment["byte_length"])
+    pipeline_id = segment["pipeline_id"]
+    return [{**json.loads(line), "pipeline_id": pipeline_id}
+            for line in gzip.decompress(data).decode("utf-8").splitlines()]
+
+
+def delete_segments(paths: List[str]) -> int:
+    """Remove archive files (relative paths, as in log_archives) and the pipeline
+    directories left empty; returns the number of files removed."""
+    removed = 0
+    for path in paths:
+        full_path = os.path.join(LOG_ARCHIVE_DIR, path)
+        try:
+            os.remove(full_path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+        try:
+            os.rmdir(os.path.dirname(full_path))
+        except OSError:
+            pass  # other months still there
+    return removed
+
+
+def get_archived_logs(pipeline_id: str, limit: int = 50, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Archived logs of a pipeline, newest first, same shape as models.get_logs.
+
+    Blocking (database and file reads): use run_in_threadpool from async code.
+    """
+    out: List[Dict[str, Any]] = []
+    while len(out) < limit:
+        segments = models.list_log_archives(pipeline_id, before_id=before_id, limit=8)
+        if not segments:
+            break
+        for segment in segments:
+            for row in reversed(read_segment(segment)):
+                if before_id is None or row["id"] < before_id:
+                    out.append(row)
+                    if len(out) >= limit:
+                        return out
+            before_id = segment["first_id"]
+    return out
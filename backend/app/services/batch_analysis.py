@@ -0,0 +1,132 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from .. import models
+from . import ai, classifier
+from .context import pipeline_contexts
+
+
+# Batch RCA, e.g. after a shared dependency breaks many pipelines at once.
+# Contexts and failure clusters of all pipelines come from set-based queries;
+# pipelines in one unanalyzed cluster share a single analysis, small excerpts
+# share upstream requests (ai.analyze_packed_with_ai), and every analysis row
+# is written in one transaction once the batch is done.
+AI_BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))  # upstream requests in flight per batch
+AI_BATCH_LOG_ROWS = int(os.getenv("AI_BATCH_LOG_ROWS", "2000"))  # latest log rows read per pipeline
+MAX_BATCH_PIPELINES = 500
+_QUERY_CHUNK = 100  # pipelines per log query, bounds the rows held at once
+
+
+def select_pipelines(status: Optional[str], since: Optional[datetime], limit: int) -> List[str]:
+    """Most recently run pipelines with the status (any if None) and a run since since."""
+    rows = models.list_pipelines(limit=limit, statuses=[status] if status else None, sort="last_run")
+    cutoff = since.isoformat() if since else ""
+    # Newest first, so the ones that ran before the cutoff are a suffix
+    return [row["id"] for row in rows if (row["last_run"] or "") >= cutoff]
+
+
+def _load(pipeline_ids: List[str]) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
+    contexts: Dict[str, str] = {}
+    for start in range(0, len(pipeline_ids), _QUERY_CHUNK):
+        contexts.update(pipeline_contexts(pipeline_ids[start:start + _QUERY_CHUNK], AI_BATCH_LOG_ROWS))
+    return contexts, models.get_pipeline_clusters(list(contexts))
+
+
+def _save(rows: List[Dict[str, Any]], clusters: Dict[int, Dict[str, str]]) -> None:
+    models.insert_analyses(rows)
+    for cluster_id, result in clusters.items():
+        models.set_cluster_analysis(cluster_id, result["root_cause"], result["suggested_fix"], result["confidence"])
+
+
+def _jobs(units: List[Dict[str, Any]], pack: bool) -> List[List[Dict[str, Any]]]:
+    """Units grouped into upstream requests: packs of small contexts, then one each."""
+    if not pack:
+        return [[unit] for unit in units]
+    small = [unit for unit in units if len(unit["context"]) <= ai.AI_PACK_MAX_CHARS]
+    large = [[unit] for unit in units if len(unit["context"]) > ai.AI_PACK_MAX_CHARS]
+    step = max(1, ai.AI_PACK_MAX_ITEMS)
+    return [small[i:i + step] for i in range(0, len(small), step)] + large
+
+
+async def analyze_batch(pipeline_ids: List[str], pack: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one result per pipeline as soon as it is known, then a summary.
+
+    A result has pipeline_id plus root_cause, suggested_fix, confidence and
+    source, or error. The analyses are saved after the last result; a batch
+    abandoned before that (client gone) saves nothing.
+    """
+    pipeline_ids = list(dict.fromkeys(pipeline_ids))
+    contexts, clusters = await run_in_threadpool(_load, pipeline_ids)
+    rows: List[Dict[str, Any]] = []
+    cluster_results: Dict[int, Dict[str, str]] = {}
+
+    def finish(unit: Dict[str, Any], result: Dict[str, str], source: str) -> List[Dict[str, Any]]:
+        analysis = {key: result[key] for key in ("root_cause", "suggested_fix", "confidence")}
+        cluster = unit["cluster"]
+        if cluster and source != "cluster" and analysis["confidence"] != "Low":
+            cluster_results[cluster["id"]] = analysis
+        out = []
+        for pipeline_id in [unit["pipeline_id"], *unit["followers"]]:
+            own = pipeline_id == unit["pipeline_id"]
+            row_source = source if own else "cluster"
+            rows.append({"pipeline_id": pipeline_id, "root_cause": analysis["root_cause"],
+                         "fix": analysis["suggested_fix"], "confidence": analysis["confidence"],
+                         "source": row_source,
+                         "evidence": unit["context"][:classifier.EVIDENCE_MAX_CHARS]
+                         if own and source == "ai" else None})
+            out.append({"pipeline_id": pipeline_id, **analysis, "source": row_source})
+        return out
+
+    units: List[Dict[str, Any]] = []
+    by_cluster: Dict[int, Dict[str, Any]] = {}
+    for pipeline_id in pipeline_ids:
+        if pipeline_id not in contexts:
+            yield {"pipeline_id": pipeline_id, "error": "No logs for pipeline"}
+            continue
+        cluster = clusters.get(pipeline_id)
+        unit = {"pipeline_id": pipeline_id, "context": contexts[pipeline_id], "cluster": cluster, "followers": []}
+        if cluster and cluster["analyzed_at"]:
+            for result in finish(unit, {"root_cause": cluster["root_cause"], "suggested_fix": cluster["fix"],
+                                        "confidence": cluster["confidence"]}, "cluster"):
+                yield result
+        elif cluster and cluster["id"] in by_cluster:
+            by_cluster[cluster["id"]]["followers"].append(pipeline_id)
+        else:
+            units.append(unit)
+            if cluster:
+                by_cluster[cluster["id"]] = unit
+
+    local = await run_in_threadpool(lambda: [classifier.classify(unit["context"]) for unit in units])
+    remote = []
+    for unit, result in zip(units, local):
+        if result is None:
+            remote.append(unit)
+            continue
+        for row in finish(unit, result, result["source"]):
+            yield row
+
+    semaphore = asyncio.Semaphore(AI_BATCH_CONCURRENCY)
+
+    async def run(job: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        async with semaphore:
+            if len(job) == 1:
+                return job, [await ai.analyze_logs_with_ai(job[0]["context"])]
+            return job, await ai.analyze_packed_with_ai([unit["context"] for unit in job])
+
+    tasks = [asyncio.ensure_future(run(job)) for job in _jobs(remote, pack)]
+    try:
+        for done in asyncio.as_completed(tasks):
+            job, results = await done
+            for unit, result in zip(job, results):
+                for row in finish(unit, result, "ai"):
+                    yield row
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    await run_in_threadpool(models.write, _save, rows, cluster_results)
+    yield {"done": True, "pipelines": len(pipeline_ids), "saved": len(rows)}
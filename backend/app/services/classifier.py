@@ -0,0 +1,268 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .. import metrics, models
+
+
+# Offline first pass in front of the LLM: a rule set for well-known
+# failure signatures, then TF-IDF nearest neighbour over the evidence of past
+# AI analyses. A confident answer here skips the upstream call entirely.
+CLASSIFIER_ENABLED = os.getenv("CLASSIFIER_ENABLED", "1") not in ("0", "false", "no")
+CLASSIFIER_MIN_SIMILARITY = float(os.getenv("CLASSIFIER_MIN_SIMILARITY", "0.85"))
+CLASSIFIER_MAX_DOCS = int(os.getenv("CLASSIFIER_MAX_DOCS", "5000"))
+CLASSIFIER_REFRESH = float(os.getenv("CLASSIFIER_REFRESH", "10"))  # seconds between index refreshes
+EVIDENCE_MAX_CHARS = 8000  # stored with each AI analysis for later lookups
+
+
+class Rule(NamedTuple):
+    name: str
+    keywords: Tuple[str, ...]  # literal prefilter: the pattern only runs if one of these occurs
+    pattern: str  # groups fill {1}, {2}, ... in the texts
+    root_cause: str
+    suggested_fix: str
+    confidence: str = "High"
+
+
+# Earlier rules win when several match
+RULES: List[Rule] = [
+    Rule(
+        "node-module-not-found",
+        ("Cannot find module",),
+        r"Cannot find module '([^']+)'",
+        "The build imports '{1}', which cannot be resolved.",
+        "Check the import path and any path aliases (tsconfig paths, bundler aliases); if it is a package, add it to package.json and reinstall.",
+    ),
+    Rule(
+        "python-module-not-found",
+        ("ModuleNotFoundError",),
+        r"ModuleNotFoundError: No module named '([^']+)'",
+        "Python module '{1}' is not installed in the job environment.",
+        "Add the package that provides '{1}' to the requirements and make sure the install step runs before this one.",
+    ),
+    Rule(
+        "npm-lockfile-mismatch",
+        ("can only install packages when",),
+        r"`npm ci` can only install packages when your package\.json and package-lock\.json",
+        "package-lock.json is out of sync with package.json, so `npm ci` refused to install.",
+        "Run `npm install` locally and commit the updated package-lock.json.",
+    ),
+    Rule(
+        "npm-peer-conflict",
+        ("ERESOLVE",),
+        r"npm ERR! code ERESOLVE",
+        "npm could not resolve the dependency tree because of a peer dependency conflict.",
+        "Align the conflicting package versions, or pin the peer dependency; use --legacy-peer-deps only as a stopgap.",
+    ),
+    Rule(
+        "typescript-error",
+        ("error TS",),
+        r"error (TS\d+): ([^\n]+)",
+        "TypeScript compilation failed with {1}: {2}",
+        "Fix the reported type error, then run `tsc --noEmit` locally before pushing.",
+    ),
+    Rule(
+        "terraform-registry-timeout",
+        ("registry.terraform.io", "Failed to query available provider packages"),
+        r"registry\.terraform\.io[^\n]*(?:timeout|timed out|Client\.Timeout)|Failed to query available provider packages",
+        "Terraform could not download providers from registry.terraform.io (network timeout).",
+        "Retry the job; if it persists, pin provider versions and cache providers (plugin cache or a provider mirror) in CI.",
+    ),
+    Rule(
+        "docker-rate-limit",
+        ("toomanyrequests",),
+        r"toomanyrequests: You have reached your pull rate limit",
+        "Docker Hub pull rate limit reached.",
+        "Authenticate to Docker Hub in the job or pull from a mirror or private registry.",
+    ),
+    Rule(
+        "out-of-memory",
+        ("heap out of memory", "OOMKilled", "exit code 137", "MemoryError"),
+        r"JavaScript heap out of memory|\bOOMKilled\b|exit code 137\b|MemoryError",
+        "The job ran out of memory.",
+        "Raise the memory limit (e.g. NODE_OPTIONS=--max-old-space-size) or use a larger runner, and check for a memory regression.",
+    ),
+    Rule(
+        "disk-full",
+        ("No space left on device",),
+        r"No space left on device",
+        "The runner ran out of disk space.",
+        "Free space before the heavy step (prune docker images, clear caches) or use a runner with a larger disk.",
+    ),
+    Rule(
+        "ssh-auth",
+        ("Permission denied (publickey)",),
+        r"Permission denied \(publickey\)",
+        "SSH authentication failed: the job's key was rejected.",
+        "Check that the deploy key or SSH secret is configured and has access to the target repository or host.",
+    ),
+    Rule(
+        "command-not-found",
+        (": command not found",),
+        r"([\w.-]+): command not found",
+        "'{1}' is not installed on the runner.",
+        "Install '{1}' in an earlier step or use a runner image that provides it.",
+    ),
+    Rule(
+        "job-timeout",
+        ("exceeded the maximum execution time",),
+        r"has exceeded the maximum execution time",
+        "The job was cancelled after exceeding its time limit.",
+        "Find the slow or hanging step; raise timeout-minutes only if the duration is expected.",
+    ),
+    Rule(
+        "pytest-failure",
+        ("FAILED ",),
+        r"FAILED ([\w/.-]+::[\w\[\]-]+)[^\n]*?(?: - ([^\n]+))?$",
+        "Test {1} failed: {2}",
+        "Run `pytest {1}` locally and fix the code or the test expectation.",
+    ),
+]
+
+# A keyword scan (C substring search) rejects most rules before any regex
+# runs, which beats one combined alternation: that defeats re's literal
+# prefix search and is tried at every position of the text.
+_COMPILED = [re.compile(rule.pattern, re.MULTILINE) for rule in RULES]
+
+_TOKEN = re.compile(r"[a-z_][a-z0-9_.@/-]{2,}")
+_NOISE = re.compile(r"\d{4}-\d\d-\d\dT[\d:.]+Z?|\b[0-9a-f]{7,}\b|\d+")
+
+stats = {"rule_hits": 0, "similar_hits": 0, "misses": 0, "total_ms": 0.0}
+metrics.counter_from("classifier_lookups_total", "Offline classifier lookups by outcome", "result", stats,
+                     ("rule_hits", "similar_hits", "misses"))
+
+_index_lock = threading.Lock()
+_docs: List[Dict] = []  # {"root_cause", "fix", "confidence", "terms": Counter}; guarded by _index_lock
+# Swapped as a whole so lookups never see docs and postings from different builds
+_index: Tuple[List[Dict], Dict[str, float], Dict[str, List[Tuple[int, float]]]] = ([], {}, {})
+_last_id = 0
+_refreshed_at = 0.0
+
+
+_PLACEHOLDER = re.compile(r"\{(\d+)\}")
+
+
+def _fill(template: str, groups: List[str]) -> str:
+    return _PLACEHOLDER.sub(lambda m: groups[int(m.group(1)) - 1] if int(m.group(1)) <= len(groups) else "", template)
+
+
+def match_rules(text: str) -> Optional[Dict[str, str]]:
+    """Highest priority rule matching text, or None."""
+    for rule, pattern in zip(RULES, _COMPILED):
+        if not any(keyword in text for keyword in rule.keywords):
+            continue
+        m = pattern.search(text)
+        if m is None:
+            continue
+        groups = [(g or "").strip() for g in m.groups()]
+        return {
+            # rstrip drops a dangling ": " when an optional group did not match
+            "root_cause": _fill(rule.root_cause, groups).rstrip(": "),
+            "suggested_fix": _fill(rule.suggested_fix, groups),
+            "confidence": rule.confidence,
+            "category": rule.name,
+        }
+    return None
+
+
+def _terms(text: str) -> Counter:
+    return Counter(_TOKEN.findall(_NOISE.sub(" ", text.lower())))
+
+
+def _vector(terms: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+    vec = {t: (1 + math.log(n)) * idf[t] for t, n in terms.items() if t in idf}
+    norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+    return {t: w / norm for t, w in vec.items()}
+
+
+def _refresh() -> None:
+    """Pull AI analyses added since the last refresh and rebuild the index."""
+    global _index, _last_id, _refreshed_at
+    with _index_lock:
+        if time.monotonic() - _refreshed_at < CLASSIFIER_REFRESH:
+            return
+        _refreshed_at = time.monotonic()
+        rows = models.list_analysis_evidence(after_id=_last_id, limit=CLASSIFIER_MAX_DOCS)
+        if not rows:
+            return
+        for row in rows:
+            _docs.append({"root_cause": row["root_cause"], "fix": row["fix"],
+                          "confidence": row["confidence"], "terms": _terms(row["evidence"])})
+        _last_id = rows[-1]["id"]
+        del _docs[:-CLASSIFIER_MAX_DOCS]
+
+        df = Counter(t for doc in _docs for t in doc["terms"])
+        idf = {t: math.log((1 + len(_docs)) / (1 + n)) + 1 for t, n in df.items()}
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for i, doc in enumerate(_docs):
+            for t, w in _vector(doc["terms"], idf).items():
+                postings.setdefault(t, []).append((i, w))
+        _index = (list(_docs), idf, postings)
+
+
+def reset() -> None:
+    """Forget the indexed analyses (after they were deleted); the next lookup reloads."""
+    global _index, _last_id, _refreshed_at
+    with _index_lock:
+        _docs.clear()
+        _index = ([], {}, {})
+        _last_id = 0
+        _refreshed_at = 0.0
+
+
+def match_similar(text: str) -> Optional[Tuple[float, Dict[str, str]]]:
+    """Closest past AI analysis by TF-IDF cosine similarity, as (similarity, result)."""
+    _refresh()
+    docs, idf, postings = _index
+    if not postings:
+        return None
+    scores: Dict[int, float] = {}
+    for t, qw in _vector(_terms(text), idf).items():
+        for i, dw in postings.get(t, ()):
+            scores[i] = scores.get(i, 0.0) + qw * dw
+    if not scores:
+        return None
+    i, similarity = max(scores.items(), key=lambda item: item[1])
+    doc = docs[i]
+    return similarity, {"root_cause": doc["root_cause"], "suggested_fix": doc["fix"], "confidence": doc["confidence"]}
+
+
+def classify(text: str) -> Optional[Dict[str, str]]:
+    """Confident local answer for a failure excerpt, or None to fall back to the LLM.
+
+    Results carry "source": "rules" or "similar". Blocking (may read the
+    database): call it through run_in_threadpool from async code.
+    """
+    if not CLASSIFIER_ENABLED or not text:
+        return None
+    started = time.perf_counter()
+    try:
+        result = match_rules(text)
+        if result and result["confidence"] == "High":
+            stats["rule_hits"] += 1
+            return {**result, "source": "rules"}
+        similar = match_similar(text)
+        if similar and similar[0] >= CLASSIFIER_MIN_SIMILARITY:
+            stats["similar_hits"] += 1
+            return {**similar[1], "source": "similar"}
+        stats["misses"] += 1
+        return None
+    finally:
+        stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+def get_stats() -> Dict[str, float]:
+    lookups = stats["rule_hits"] + stats["similar_hits"] + stats["misses"]
+    hits = lookups - stats["misses"]
+    return {
+        **stats,
+        "lookups": lookups,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "avg_ms": round(stats["total_ms"] / lookups, 3) if lookups else 0.0,
+        "indexed": len(_docs),
+        "rules": len(RULES),
+    }
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import re
+from collections import deque
+from typing import Iterable, List, Optional
+
+from .. import models
+from .context import score_line
+
+
+# Failed runs are grouped by a SimHash of their normalized failing lines.
+# Signatures are split into _BANDS bands, so two signatures within
+# CLUSTER_MAX_DISTANCE < _BANDS differing bits share at least one band
+# exactly; cluster lookup is then a few indexed band probes.
+CLUSTER_MAX_DISTANCE = int(os.getenv("CLUSTER_MAX_DISTANCE", "3"))
+CLUSTER_LOG_ROWS = int(os.getenv("CLUSTER_LOG_ROWS", "200"))  # latest log rows read per failed run
+CLUSTER_MAX_LINES = 40  # failing lines that make up a signature
+CLUSTER_MIN_SCORE = 4  # context.score_line threshold for a "failing" line
+SAMPLE_MAX_CHARS = 4000
+
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+
+_NORMALIZE = [
+    (re.compile(r"\d{4}-\d\d-\d\d[T ][\d:.,]+(?:Z|[+-]\d\d:?\d\d)?"), "<ts>"),
+    (re.compile(r"\b\d\d:\d\d:\d\d(?:[.,]\d+)?\b"), "<ts>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<id>"),
+    (re.compile(r"(?:[A-Za-z]:)?[\w.@~-]*(?:[/\\][\w.@~-]+){2,}"), "<path>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b[0-9a-f]{7,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)*"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+_WORD = re.compile(r"<\w+>|\w+")
+
+
+def normalize_line(line: str) -> str:
+    """Strip what differs between occurrences of the same failure."""
+    for pattern, replacement in _NORMALIZE:
+        line = pattern.sub(replacement, line)
+    return line.strip()
+
+
+def failure_lines(lines: Iterable[str]) -> List[str]:
+    """The distinct failing lines of a run, in order; the last lines if none score."""
+    picked, seen, tail = [], set(), deque(maxlen=5)
+    for line in lines:
+        if not line.strip():
+            continue
+        tail.append(line)
+        if score_line(line) < CLUSTER_MIN_SCORE:
+            continue
+        key = normalize_line(line)
+        if key not in seen:
+            seen.add(key)
+            picked.append(line)
+            if len(picked) >= CLUSTER_MAX_LINES:
+                break
+    return picked or list(tail)
+
+
+def simhash(lines: Iterable[str]) -> int:
+    """64-bit SimHash over word unigrams and bigrams of the normalized lines."""
+    weights = [0] * 64
+    for line in lines:
+        words = _WORD.findall(normalize_line(line).lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+            for bit in range(64):
+                weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value  # SQLite integers are signed 64-bit
+
+
+def _bands(signature: int) -> List[int]:
+    mask = (1 << _BAND_BITS) - 1
+    return [signature >> (band * _BAND_BITS) & mask for band in range(_BANDS)]
+
+
+def assign_run(run_id: int, pipeline_id: str) -> Optional[int]:
+    """Cluster a failed run by the pipeline's latest logs. Returns the cluster id.
+
+    Blocking (reads and writes the database): use run_in_threadpool from async code.
+    """
+    rows = models.get_logs(pipeline_id, limit=CLUSTER_LOG_ROWS)
+    lines = failure_lines(line for row in reversed(rows) for line in (row["content"] or "").splitlines())
+    if not lines:
+        return None
+    signature = simhash(lines)
+    sample = "\n".join(lines)[:SAMPLE_MAX_CHARS]
+    return models.assign_failure_cluster(
+        run_id, pipeline_id, _signed(signature), _bands(signature), sample, CLUSTER_MAX_DISTANCE
+    )
@@ -0,0 +1,148 @@
+import heapq
+import itertools
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .. import models
+
+
+# Failure-focused context for the AI analyzer: one streaming pass over every
+# log line that scores error signals, keeps a window of surrounding lines
+# around each hit, skips repeated lines, and packs the best windows into a
+# character budget (~4 characters per token).
+AI_CONTEXT_CHARS = int(os.getenv("AI_CONTEXT_CHARS", "12000"))
+AI_CONTEXT_BEFORE = int(os.getenv("AI_CONTEXT_BEFORE", "3"))
+AI_CONTEXT_AFTER = int(os.getenv("AI_CONTEXT_AFTER", "8"))
+_MAX_SEGMENTS = 256  # best windows kept while scanning; bounds memory on huge logs
+_MAX_SEGMENT_LINES = 64  # a long run of error lines is split into several windows
+_MAX_LINE_CHARS = 1000
+_TAIL_LINES = 5  # the end of the log usually carries the exit status
+_MAX_FINGERPRINTS = 200_000  # dedupe memory; forgotten (and restarted) beyond this
+
+_SIGNALS: List[Tuple[re.Pattern, int]] = [
+    (re.compile(r"Traceback \(most recent call last\)"), 10),
+    (re.compile(r"\bFAILED\b|\bFAILURE\b|\bfailed with exit code\b"), 8),
+    (re.compile(r"\bexit code [1-9]\d*|\bexit status [1-9]\d*|Process completed with exit code [1-9]"), 8),
+    (re.compile(r"^\s*(?:\w+\.)*\w*(?:Error|Exception)\b|\bAssertionError\b|\bpanic:"), 7),
+    (re.compile(r"##\[error\]|\bError:|\bERROR\b|\bERR!"), 6),
+    (re.compile(r"Cannot find module|ModuleNotFoundError|command not found|No such file or directory"), 6),
+    (re.compile(r"\btimed? ?out\b|\btimeout\b|\bconnection refused\b|\bdenied\b", re.IGNORECASE), 4),
+    (re.compile(r'^\s+File ".*", line \d+|^\s+at [\w.$<>]+\(.*\)$'), 3),  # stack frames
+    (re.compile(r"\berror\b|\bfailed\b|\bfatal\b", re.IGNORECASE), 2),
+    (re.compile(r"\bwarn(?:ing)?\b", re.IGNORECASE), 1),
+]
+# Timestamps, hex ids and numbers make otherwise identical lines look distinct
+_NOISE = re.compile(r"\d{4}-\d\d-\d\dT[\d:.]+Z?|\b[0-9a-f]{7,}\b|\d+")
+
+
+def score_line(line: str) -> int:
+    for pattern, weight in _SIGNALS:
+        if pattern.search(line):
+            return weight
+    return 0
+
+
+def _fingerprint(line: str) -> int:
+    return hash(_NOISE.sub("#", line.strip()))
+
+
+def extract_failure_context(lines: Iterable[str], budget: int = AI_CONTEXT_CHARS) -> str:
+    """Return the highest-value log windows, in log order, within budget characters.
+
+    Runs in one pass and keeps at most _MAX_SEGMENTS windows and
+    _MAX_FINGERPRINTS line hashes in memory, so cost is linear in the log
+    size and memory is bounded regardless of it.
+    """
+    seen = set()
+    recent: deque = deque(maxlen=AI_CONTEXT_BEFORE)
+    tail: deque = deque(maxlen=_TAIL_LINES)
+    best: List[Tuple[int, int, List[Tuple[int, str]]]] = []  # min-heap of (score, start, [(pos, line)])
+    current = None  # [score, lines, lines_after_left]
+
+    def close(segment) -> None:
+        item = (segment[0], segment[1][0][0], segment[1])  # later windows win ties
+        if len(best) < _MAX_SEGMENTS:
+            heapq.heappush(best, item)
+        elif item[:2] > best[0][:2]:
+            heapq.heapreplace(best, item)
+
+    pos = 0
+    for raw in lines:
+        line = raw.rstrip()[:_MAX_LINE_CHARS]
+        if not line.strip():
+            continue
+        fp = _fingerprint(line)
+        if fp in seen:
+            continue
+        if len(seen) >= _MAX_FINGERPRINTS:
+            seen.clear()
+        seen.add(fp)
+        score = score_line(line)
+        entry = (pos, line)
+        if current is not None:
+            current[1].append(entry)
+            if score:
+                current[0] = max(current[0], score)
+                current[2] = AI_CONTEXT_AFTER
+            else:
+                current[2] -= 1
+            if current[2] <= 0 or len(current[1]) >= _MAX_SEGMENT_LINES:
+                close(current)
+                current = None
+        elif score:
+            current = [score, list(recent) + [entry], AI_CONTEXT_AFTER]
+        recent.append(entry)
+        tail.append(entry)
+        pos += 1
+    if current is not None:
+        close(current)
+    if not tail:
+        return ""
+
+    # Greedily take the best windows while they fit, then emit in log order
+    windows = sorted(best, key=lambda w: (w[0], w[1]), reverse=True) + [(0, tail[0][0], list(tail))]
+    chosen: Dict[int, str] = {}
+    used = 0
+    for _, _, entries in windows:
+        cost = sum(len(line) + 1 for p, line in entries if p not in chosen)
+        if used + cost > budget:
+            continue
+        chosen.update(entries)
+        used += cost
+
+    out: List[str] = []
+    previous = None
+    for p in sorted(chosen):
+        if previous is not None and p != previous + 1:
+            out.append("...")
+        out.append(chosen[p])
+        previous = p
+    return "\n".join(out)
+
+
+def pipeline_context(pipeline_id: str) -> Optional[str]:
+    """Failure-focused excerpt of all of a pipeline's logs; None when it has none.
+
+    Blocking (reads the database): call it through run_in_threadpool.
+    """
+    rows = models.iter_logs(pipeline_id)
+    first = next(rows, None)
+    if first is None:
+        return None
+    lines = (
+        line
+        for row in itertools.chain([first], rows)
+        for line in (row["content"] or "").splitlines()
+    )
+    return extract_failure_context(lines)
+
+
+def pipeline_contexts(pipeline_ids: List[str], rows_per_pipeline: int) -> Dict[str, str]:
+    """pipeline_context for many pipelines from one query, over each one's latest
+    rows_per_pipeline log rows. Pipelines without logs are absent. Blocking."""
+    return {
+        pipeline_id: extract_failure_context(line for content in contents for line in content.splitlines())
+        for pipeline_id, contents in models.get_recent_logs_many(pipeline_ids, rows_per_pipeline).items()
+    }
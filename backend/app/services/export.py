@@ -0,0 +1,42 @@
+import json
+import os
+import zlib
+from typing import Iterable, Iterator, List, Tuple
+
+
+# Log export: batches of (id, timestamp, content) tuples from models.export_logs
+# become one bytes chunk each, formatted without building a dict (or model) per
+# row, and optionally gzip-compressed as they go, so memory stays at one batch
+# however large the export.
+LOG_EXPORT_LEVEL = int(os.getenv("LOG_EXPORT_LEVEL", "6"))  # gzip level for ?gzip=true
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "text": ("text/plain; charset=utf-8", "log"),
+}
+
+
+def _ndjson(batch: List[Tuple[int, str, str]]) -> str:
+    # Timestamps are ISO strings and need no escaping
+    return "".join(f'{{"id": {log_id}, "timestamp": "{ts}", "content": {json.dumps(content)}}}\n'
+                   for log_id, ts, content in batch)
+
+
+def _text(batch: List[Tuple[int, str, str]]) -> str:
+    return "".join(f"{content or ''}\n" for _, _, content in batch)
+
+
+def encode(batches: Iterable[List[Tuple[int, str, str]]], fmt: str, gzip: bool) -> Iterator[bytes]:
+    """Export body chunks in fmt ("ndjson" or "text"), gzip-compressed on the fly if asked."""
+    render = _ndjson if fmt == "ndjson" else _text
+    compressor = zlib.compressobj(LOG_EXPORT_LEVEL, zlib.DEFLATED, 31) if gzip else None  # wbits 31: gzip framing
+    for batch in batches:
+        data = render(batch).encode("utf-8")
+        if compressor is None:
+            yield data
+            continue
+        data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
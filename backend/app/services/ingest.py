@@ -0,0 +1,107 @@
+import json
+import os
+from typing import AsyncIterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from .. import models
+
+
+# A batch is flushed when it reaches either limit; the request body is not
+# read any further until the flush commits, which is what bounds memory.
+INGEST_BATCH_LINES = int(os.getenv("INGEST_BATCH_LINES", "1000"))
+INGEST_BATCH_BYTES = int(os.getenv("INGEST_BATCH_BYTES", str(1024 * 1024)))
+# Longer text lines are stored as several records rather than buffered whole.
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(64 * 1024)))
+# An NDJSON record cannot be split, so a longer one is rejected instead.
+INGEST_MAX_RECORD_BYTES = int(os.getenv("INGEST_MAX_RECORD_BYTES", str(1024 * 1024)))
+
+
+def _ndjson_content(line: str) -> Optional[str]:
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        return record if isinstance(record, str) else json.dumps(record)
+    content = next((record[key] for key in ("content", "line", "message") if record.get(key) not in (None, "")), "")
+    if not isinstance(content, str):
+        content = json.dumps(content)  # a number or a structured message is stored as its JSON
+    step = record.get("step")
+    return f"[{step}] {content}" if step else content
+
+
+def _decode(line: bytes) -> str:
+    return line.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def _split(line: bytes) -> List[bytes]:
+    """line in pieces of at most INGEST_MAX_LINE_BYTES, not cutting through a UTF-8 sequence."""
+    pieces = []
+    while len(line) > INGEST_MAX_LINE_BYTES:
+        cut = INGEST_MAX_LINE_BYTES
+        while cut and line[cut] & 0xC0 == 0x80:  # a continuation byte
+            cut -= 1
+        cut = cut or INGEST_MAX_LINE_BYTES
+        pieces.append(line[:cut])
+        line = line[cut:]
+    return pieces + [line]
+
+
+async def _lines(chunks: AsyncIterator[bytes], ndjson: bool) -> AsyncIterator[str]:
+    """The body's lines. A long text line is split; a long NDJSON record raises ValueError
+    as soon as it is known to be too long, without buffering the rest of it."""
+    pending = b""
+    async for chunk in chunks:
+        *complete, pending = (pending + chunk).split(b"\n")
+        if ndjson and len(pending) > INGEST_MAX_RECORD_BYTES:
+            complete.append(pending)
+        elif not ndjson and len(pending) > INGEST_MAX_LINE_BYTES:
+            *pieces, pending = _split(pending)
+            complete += pieces
+        for line in complete:
+            if ndjson and len(line) > INGEST_MAX_RECORD_BYTES:
+                raise ValueError(f"record over INGEST_MAX_RECORD_BYTES ({INGEST_MAX_RECORD_BYTES} bytes)")
+            for piece in [line] if ndjson else _split(line):
+                yield _decode(piece)
+    if pending:
+        yield _decode(pending)
+
+
+async def ingest_stream(pipeline_id: str, chunks: AsyncIterator[bytes], ndjson: bool = False) -> dict:
+    """Split a streamed body into one log row per line (or NDJSON record), written in batches.
+
+    An NDJSON record that is invalid or over INGEST_MAX_RECORD_BYTES stops the
+    upload: the records before it are stored, it and the rest are not, and the
+    result says so ("error" and the 1-based "failed_line"; "lines" counts what
+    was stored).
+    """
+    batch: List[str] = []
+    size = 0
+    lines = batches = number = 0
+
+    async def flush() -> None:
+        nonlocal batch, size, lines, batches
+        await run_in_threadpool(models.write, models.insert_logs, pipeline_id, batch)
+        lines += len(batch)
+        batches += 1
+        batch, size = [], 0
+
+    try:
+        async for line in _lines(chunks, ndjson):
+            number += 1
+            if not line.strip():
+                continue
+            content = _ndjson_content(line) if ndjson else line
+            if not content:
+                continue
+            batch.append(content)
+            size += len(content)
+            if len(batch) >= INGEST_BATCH_LINES or size >= INGEST_BATCH_BYTES:
+                await flush()
+    except ValueError as e:
+        if batch:
+            await flush()
+        # A record that is too long never reached the loop; an invalid one did
+        failed_line = number if isinstance(e, json.JSONDecodeError) else number + 1
+        return {"lines": lines, "batches": batches, "error": str(e), "failed_line": failed_line}
+    if batch:
+        await flush()
+    return {"lines": lines, "batches": batches}
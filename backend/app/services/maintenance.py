@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, List
+
+from starlette.concurrency import run_in_threadpool
+
+from .. import models
+from . import archive
+
+
+logger = logging.getLogger(__name__)
+
+
+# Background storage upkeep. Work is done in small batches with a pause in
+# between so request handlers are never blocked on the write lock for long.
+LOG_COMPACT_INTERVAL = float(os.getenv("LOG_COMPACT_INTERVAL", "60"))  # seconds; 0 disables
+LOG_COMPACT_BATCH = int(os.getenv("LOG_COMPACT_BATCH", "500"))
+LOG_DICT_MIN_ROWS = int(os.getenv("LOG_DICT_MIN_ROWS", "200"))
+# Default retention policy (per-pipeline overrides live in retention_policies).
+# Expired logs are archived (services/archive.py); expired runs, analyses and
+# finished agent tasks are deleted. 0 keeps forever.
+RETENTION_LOG_DAYS = int(os.getenv("RETENTION_LOG_DAYS", "0"))
+RETENTION_RUN_DAYS = int(os.getenv("RETENTION_RUN_DAYS", "0"))
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # seconds; 0 disables
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "1000"))  # rows per delete transaction
+VACUUM_INTERVAL = float(os.getenv("VACUUM_INTERVAL", "600"))  # seconds; 0 disables
+VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "2000"))  # pages returned to the filesystem per step
+_BATCH_PAUSE = 0.05
+
+_loops: List[asyncio.Task] = []
+
+
+async def compact_logs_once() -> int:
+    """Train missing pipeline dictionaries, then pack every unvisited log row."""
+    await run_in_threadpool(models.train_log_dictionaries, LOG_DICT_MIN_ROWS)
+    total = 0
+    while True:
+        done = await run_in_threadpool(models.compact_logs, LOG_COMPACT_BATCH)
+        total += done
+        if done < LOG_COMPACT_BATCH:
+            return total
+        await asyncio.sleep(_BATCH_PAUSE)
+
+
+async def _batches(job: Callable[..., int], *args) -> int:
+    """Run job(*args, RETENTION_BATCH) until a batch comes back short."""
+    total = 0
+    while True:
+        done = await run_in_threadpool(job, *args, RETENTION_BATCH)
+        total += done
+        if done < RETENTION_BATCH:
+            return total
+        await asyncio.sleep(_BATCH_PAUSE)
+
+
+async def retention_once() -> Dict[str, int]:
+    """Apply every pipeline's retention policy once."""
+    now = datetime.utcnow()
+    totals = {"pipelines": 0, "archived_logs": 0, "pruned_runs": 0, "pruned_analyses": 0, "pruned_tasks": 0}
+    targets = await run_in_threadpool(models.retention_targets, RETENTION_LOG_DAYS, RETENTION_RUN_DAYS)
+    for target in targets:
+        pipeline_id = target["pipeline_id"]
+        totals["pipelines"] += 1
+        if target["log_days"] > 0:
+            cutoff = (now - timedelta(days=target["log_days"])).isoformat()
+            totals["archived_logs"] += await _batches(
+                partial(models.archive_logs_batch, archive=archive.append_segment), pipeline_id, cutoff
+            )
+        if target["run_days"] > 0:
+            # Whole hours, so pruning empties hourly rollups instead of splitting them.
+            # Lifetime run totals keep the pruned runs (pipelines.pruned_*).
+            cutoff = (now - timedelta(days=target["run_days"])).isoformat()[:13]
+            totals["pruned_runs"] += await _batches(partial(models.prune_batch, "runs"), pipeline_id, cutoff)
+            totals["pruned_analyses"] += await _batches(partial(models.prune_batch, "analysis"), pipeline_id, cutoff)
+            totals["pruned_tasks"] += await _batches(models.prune_agent_tasks_batch, pipeline_id, cutoff)
+    return totals
+
+
+async def vacuum_once() -> int:
+    """Give free database pages back to the filesystem a few at a time."""
+    total = 0
+    while True:
+        freed = await run_in_threadpool(models.vacuum_step, VACUUM_PAGES)
+        total += freed
+        if freed < VACUUM_PAGES:
+            return total
+        await asyncio.sleep(_BATCH_PAUSE)
+
+
+async def _every(interval: float, job) -> None:
+    while True:
+        try:
+            await job()
+        except Exception:
+            logger.exception("maintenance job %s failed", job.__name__)
+        await asyncio.sleep(interval)
+
+
+async def start() -> None:
+    if LOG_COMPACT_INTERVAL > 0:
+        _loops.append(asyncio.create_task(_every(LOG_COMPACT_INTERVAL, compact_logs_once)))
+    if RETENTION_INTERVAL > 0:
+        _loops.append(asyncio.create_task(_every(RETENTION_INTERVAL, retention_once)))
+    if VACUUM_INTERVAL > 0:
+        _loops.append(asyncio.create_task(_every(VACUUM_INTERVAL, vacuum_once)))
+
+
+async def stop() -> None:
+    for task in _loops:
+        task.cancel()
+    await asyncio.gather(*_loops, return_exceptions=True)
+    _loops.clear()
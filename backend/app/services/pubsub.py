@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+from .. import metrics, models
+
+
+# In-process fanout of committed changes to live subscribers (SSE). Idle
+# subscribers only wait on their own queue; the database is read when a
+# stream starts (resume) or after a subscriber fell behind and lost events.
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "1000"))  # per subscriber
+PUBSUB_HEARTBEAT = float(os.getenv("PUBSUB_HEARTBEAT", "15"))  # seconds between keep-alive comments
+_BACKFILL_BATCH = 500
+
+
+class Subscription:
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=PUBSUB_QUEUE_SIZE)
+        self.lagged = False  # events were dropped; the stream must catch up from the database
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_topics: Dict[str, Set[Subscription]] = {}
+
+stats = {"published": 0, "delivered": 0, "lagged": 0}
+metrics.counter_from("pubsub_events_total", "Change events published, delivered to subscribers, or lost to lag",
+                     "kind", stats)
+metrics.gauge("pubsub_subscribers", "Open live streams", (), lambda: [((), subscriber_count())])
+
+
+def _topic_for(table: str, row: Dict[str, Any]) -> str:
+    return f"logs:{row['pipeline_id']}" if table == "logs" else table
+
+
+def _fanout(topic: str, row: Dict[str, Any]) -> None:
+    stats["published"] += 1
+    for sub in _topics.get(topic, ()):
+        try:
+            sub.queue.put_nowait(row)
+            stats["delivered"] += 1
+        except asyncio.QueueFull:
+            if not sub.lagged:
+                sub.lagged = True
+                stats["lagged"] += 1
+
+
+def _on_change(table: str, row: Dict[str, Any]) -> None:
+    """models change listener; runs on the writing thread, right after commit."""
+    topic = _topic_for(table, row)
+    if _loop is not None and topic in _topics:
+        _loop.call_soon_threadsafe(_fanout, topic, row)
+
+
+@contextmanager
+def subscribe(topic: str) -> Iterator[Subscription]:
+    sub = Subscription()
+    _topics.setdefault(topic, set()).add(sub)
+    try:
+        yield sub
+    finally:
+        subs = _topics.get(topic)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _topics[topic]
+
+
+def _format(event: str, event_id: int, row: Dict[str, Any]) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(row, default=str)}\n\n"
+
+
+async def event_stream(topic: str, event: str, cursor: int, key: str,
+                       backfill: Callable[[int, int], List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """SSE frames for topic, starting after cursor.
+
+    backfill(after, limit) returns stored rows with row[key] > after in key
+    order; it is used to resume and to recover after falling behind. Events
+    are sent in key order with key as the SSE id, so a client reconnecting
+    with Last-Event-ID continues without gaps or duplicates.
+    """
+    with subscribe(topic) as sub:
+        yield "retry: 3000\n\n"
+        catch_up = True
+        while True:
+            if catch_up:
+                sub.lagged = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()  # everything in here is also in the database
+                while True:
+                    rows = await run_in_threadpool(backfill, cursor, _BACKFILL_BATCH)
+                    for row in rows:
+                        cursor = row[key]
+                        yield _format(event, cursor, row)
+                    if len(rows) < _BACKFILL_BATCH:
+                        break
+                catch_up = False
+            try:
+                row = await asyncio.wait_for(sub.queue.get(), PUBSUB_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                catch_up = sub.lagged
+                continue
+            if sub.lagged:
+                catch_up = True
+                continue
+            if row[key] is None or row[key] <= cursor:
+                continue
+            cursor = row[key]
+            yield _format(event, cursor, row)
+
+
+def sse_response(topic: str, event: str, cursor: int, key: str,
+                 backfill: Callable[[int, int], List[Dict[str, Any]]]) -> StreamingResponse:
+    return StreamingResponse(
+        event_stream(topic, event, cursor, key, backfill),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # no proxy buffering
+    )
+
+
+def subscriber_count() -> int:
+    return sum(len(subs) for subs in _topics.values())
+
+
+async def start() -> None:
+    global _loop
+    _loop = asyncio.get_running_loop()
+    models.add_change_listener(_on_change)
+
+
+async def stop() -> None:
+    global _loop
+    models.remove_change_listener(_on_change)
+    _loop = None
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+from .. import metrics, models
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            limits[name.strip()] = int(value)
+    return limits
+
+
+# Per task type worker slots, e.g. "triage=4,rca=4,fix=1"; 0 disables a type.
+AGENT_CONCURRENCY = _parse_limits(os.getenv("AGENT_CONCURRENCY", "triage=4,rca=4,fix=1"))
+# A claimed task whose lease expires (worker crash/restart) is queued again. Running
+# tasks renew it every third of this, so only a dead worker's tasks expire.
+AGENT_LEASE_SECONDS = float(os.getenv("AGENT_LEASE_SECONDS", "300"))
+# Idle dispatchers re-check the table this often, for tasks queued by other processes.
+AGENT_POLL_INTERVAL = float(os.getenv("AGENT_POLL_INTERVAL", "2"))
+
+Runner = Callable[[int], Awaitable[None]]
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeups: Dict[str, asyncio.Event] = {}
+_loops: List[asyncio.Task] = []
+_running: Set[asyncio.Task] = set()
+
+stats = {"claimed": 0, "completed": 0, "requeued": 0}
+_running_by_type: Dict[str, int] = {}
+
+metrics.counter_from("agent_task_events_total", "Agent tasks claimed, completed, or requeued after a lost lease",
+                     "event", stats)
+metrics.histogram("agent_task_duration_seconds", "Agent task run time in this process", ("type", "outcome"),
+                  (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+metrics.gauge("agent_tasks_running", "Agent tasks running in this process", ("type",),
+              lambda: [((task_type,), n) for task_type, n in _running_by_type.items()])
+metrics.gauge("agent_tasks", "Agent tasks by status, all processes (queued = queue depth)", ("type", "status"),
+              lambda: [((row["type"], row["status"]), row["n"]) for row in models.count_agent_tasks()])
+
+
+def notify(task_type: Optional[str] = None) -> None:
+    """Wake the dispatcher for task_type (or all) after queueing work. Thread-safe."""
+    if _loop is None:
+        return
+    for name, event in _wakeups.items():
+        if task_type is None or name == task_type:
+            _loop.call_soon_threadsafe(event.set)
+
+
+async def _heartbeat(task_id: int) -> None:
+    """Keep extending task_id's lease while it runs, so a long task is not requeued under it."""
+    while True:
+        await asyncio.sleep(AGENT_LEASE_SECONDS / 3)
+        try:
+            if not await run_in_threadpool(models.renew_agent_task_lease, task_id, AGENT_LEASE_SECONDS):
+                return
+        except Exception:
+            logger.exception("renewing the lease of agent task %s failed", task_id)
+
+
+async def _run(runner: Runner, task_type: str, task_id: int) -> None:
+    outcome = "crashed"
+    started = time.perf_counter()
+    _running_by_type[task_type] = _running_by_type.get(task_type, 0) + 1
+    heartbeat = asyncio.create_task(_heartbeat(task_id))
+    try:
+        await runner(task_id)
+        stats["completed"] += 1
+        outcome = "completed"
+    except asyncio.CancelledError:
+        # Shutting down: hand the task back instead of waiting for the lease to expire
+        outcome = "cancelled"
+        await run_in_threadpool(models.update_agent_task, task_id, status="queued")
+        raise
+    except Exception:
+        logger.exception("agent task %s crashed", task_id)
+        await run_in_threadpool(models.update_agent_task, task_id, status="failed")
+    finally:
+        heartbeat.cancel()
+        _running_by_type[task_type] -= 1
+        metrics.observe("agent_task_duration_seconds", (task_type, outcome), time.perf_counter() - started)
+
+
+async def _dispatch(task_type: str, limit: int, runner: Runner) -> None:
+    slots = asyncio.Semaphore(limit)
+    wakeup = _wakeups[task_type]
+    while True:
+        await slots.acquire()
+        job = None
+        try:
+            wakeup.clear()
+            task = await run_in_threadpool(models.claim_agent_task, task_type, AGENT_LEASE_SECONDS)
+            if task is not None:
+                stats["claimed"] += 1
+                job = asyncio.create_task(_run(runner, task_type, task["id"]))
+                _running.add(job)
+                job.add_done_callback(_running.discard)
+                job.add_done_callback(lambda _: slots.release())
+        except Exception:
+            # A busy database or an exhausted pool: keep dispatching after a pause
+            logger.exception("claiming a %s agent task failed", task_type)
+            await asyncio.sleep(AGENT_POLL_INTERVAL)
+            continue
+        finally:
+            if job is None:
+                slots.release()
+        if job is None:
+            try:
+                await asyncio.wait_for(wakeup.wait(), AGENT_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _reap() -> None:
+    while True:
+        try:
+            requeued = await run_in_threadpool(models.requeue_expired_agent_tasks)
+        except Exception:
+            logger.exception("requeueing expired agent tasks failed")
+            requeued = 0
+        if requeued:
+            stats["requeued"] += requeued
+            notify()
+        await asyncio.sleep(max(AGENT_LEASE_SECONDS / 4, AGENT_POLL_INTERVAL))
+
+
+async def start(runner: Runner) -> None:
+    """Start one dispatcher per task type plus the lease reaper on the running loop."""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    for task_type, limit in AGENT_CONCURRENCY.items():
+        if limit > 0:
+            _wakeups[task_type] = asyncio.Event()
+            _loops.append(asyncio.create_task(_dispatch(task_type, limit, runner)))
+    _loops.append(asyncio.create_task(_reap()))
+
+
+async def stop() -> None:
+    global _loop
+    _loop = None
+    tasks = _loops + list(_running)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _loops.clear()
+    _running.clear()
+    _wakeups.clear()
@@ -0,0 +1,133 @@
+"""Analytics benchmark: rollup-backed time series vs. scanning runs.
+
+Fills an empty database with synthetic runs (skewed, so a few pipelines
+are very busy), builds the rollups once, then times
+analytics.pipeline_analytics against the equivalent GROUP BY over runs,
+for a hot and a typical pipeline, plus the cost insert_run pays to keep
+the rollups current. Uses DB_PATH / DB_URL like the backend, e.g.
+
+    DB_PATH=/tmp/analytics.db python bench/analytics.py --pipelines 10000 --runs 1000000
+
+Prints one JSON object per measurement.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402
+from app.services import analytics  # noqa: E402
+
+QUERIES = [("hour", "48h"), ("day", "30d"), ("day", "365d"), ("week", "52w")]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    """Median milliseconds of fn()."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def generate(pipelines: int, runs: int, days: int, seed: int) -> None:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with models.get_conn() as conn:
+        conn.executemany("INSERT INTO pipelines (id, name, status) VALUES (?, ?, 'unknown')",
+                         [(f"bench-{i}", f"bench-{i}") for i in range(pipelines)])
+    batch = []
+    for n in range(runs):
+        pipeline = int(pipelines * rng.random() ** 3)  # pipeline 0 gets the most runs
+        ts = (now - timedelta(seconds=rng.random() * days * 86400)).isoformat()
+        batch.append((f"bench-{pipeline}", "failed" if rng.random() < 0.15 else "success", ts,
+                      round(rng.uniform(30, 900), 1)))
+        if len(batch) == 50000 or n == runs - 1:
+            batch.sort(key=lambda r: r[2])  # ids in time order, as insert_run assigns them
+            with models.get_conn() as conn:
+                conn.executemany(
+                    "INSERT INTO runs (pipeline_id, status, timestamp, duration_seconds) VALUES (?, ?, ?, ?)", batch
+                )
+            batch = []
+
+
+def scan(pipeline_id: str, granularity: str, window: timedelta) -> list:
+    width = models.ROLLUPS["hour" if granularity == "hour" else "day"][1]
+    since = (datetime.utcnow() - window).isoformat()
+    with models.get_conn() as conn:
+        return conn.execute(
+            f"""
+            SELECT substr(timestamp, 1, {width}) AS bucket, COUNT(*) AS total,
+                   SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) AS successes,
+                   SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS failures,
+                   AVG(duration_seconds) AS mean_duration
+            FROM runs WHERE pipeline_id = ? AND timestamp >= ?
+            GROUP BY substr(timestamp, 1, {width})
+            """,
+            (pipeline_id, since),
+        ).fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipelines", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365, help="history the runs are spread over")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--inserts", type=int, default=2000, help="insert_run calls timed at the end")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    models.init_db()
+    with models.get_conn() as conn:
+        if conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]:
+            sys.exit("database is not empty")
+
+    started = time.perf_counter()
+    generate(args.pipelines, args.runs, args.days, args.seed)
+    generated = time.perf_counter() - started
+    started = time.perf_counter()
+    models.rebuild_run_stats()
+    print(json.dumps({"phase": "load", "engine": models.get_engine().name, "pipelines": args.pipelines,
+                      "runs": args.runs, "generate_s": round(generated, 1),
+                      "rebuild_rollups_s": round(time.perf_counter() - started, 1)}), flush=True)
+
+    with models.get_conn() as conn:
+        counts = dict(conn.execute("SELECT id, total_runs FROM pipelines").fetchall())
+    typical = sorted(counts, key=counts.get)[len(counts) // 2]
+    for label, pipeline_id in (("hot", "bench-0"), ("typical", typical)):
+        for granularity, window in QUERIES:
+            delta = analytics.parse_window(window)
+            result = analytics.pipeline_analytics(pipeline_id, granularity, delta)
+            print(json.dumps({
+                "phase": "query", "pipeline": label, "pipeline_runs": counts[pipeline_id],
+                "granularity": granularity, "window": window, "buckets": len(result["buckets"]),
+                "rollups_ms": timed(lambda: analytics.pipeline_analytics(pipeline_id, granularity, delta), args.repeat),
+                "scan_runs_ms": timed(lambda: scan(pipeline_id, granularity, delta), args.repeat),
+            }), flush=True)
+
+    rng = random.Random(args.seed)
+    latencies = []
+    for _ in range(args.inserts):
+        pipeline_id = f"bench-{rng.randrange(args.pipelines)}"
+        status = "failed" if rng.random() < 0.15 else "success"
+        started = time.perf_counter()
+        models.insert_run(pipeline_id, status, 60.0)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(json.dumps({"phase": "insert_run", "calls": args.inserts,
+                      "p50_ms": round(statistics.median(latencies), 3),
+                      "p99_ms": round(sorted(latencies)[int(len(latencies) * 0.99)], 3)}), flush=True)
+    consistent = not models.check_run_stats()
+    print(json.dumps({"phase": "check", "consistent": consistent}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Log storage benchmark: plain vs DEFLATE vs chunk dedup on a multi-run CI corpus.
+
+Builds a synthetic corpus where most output repeats between runs, as in
+real CI: a checkout step, a per-pipeline dependency list that changes now
+and then, the same compiler warnings and test names, plus lines that
+differ every run (timings, cache keys, the odd failure). Each run is
+stored as one log row per step. The same corpus is written to a fresh
+SQLite database per mode, with dictionaries trained after the first tenth
+of the runs as the compaction job would, then read back twice through
+get_logs (cold, then warm chunk cache):
+
+    python bench/dedup.py --pipelines 50 --runs 40
+
+Prints one JSON object per mode: stored bytes and ratio against the raw
+text, write and read throughput.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import log_codec, models  # noqa: E402
+from generate import NOISE  # noqa: E402
+
+MODES = {"plain": ("none", False), "deflate": ("zlib", False), "dedup": ("zlib", True)}
+WARNINGS = [
+    "warning: unused variable 'tmp' [-Wunused-variable]",
+    "DeprecationWarning: pkg_resources is deprecated as an API",
+    "npm WARN deprecated inflight@1.0.6: This module is not supported",
+]
+
+
+def _noise(rng: random.Random) -> str:
+    return rng.choice(NOISE).format(key=f"{rng.getrandbits(24):06x}", n=rng.randrange(1, 1000))
+
+
+def corpus(pipelines: int, runs: int, seed: int) -> List[Tuple[str, List[str]]]:
+    """(pipeline_id, step bodies) per run, runs interleaved across pipelines."""
+    rng = random.Random(seed)
+    shapes = []
+    for index in range(pipelines):
+        deps = [f"pkg-{rng.randrange(400)}" for _ in range(rng.randrange(40, 160))]
+        shapes.append({
+            "versions": {dep: f"{rng.randrange(1, 5)}.{rng.randrange(20)}.{rng.randrange(10)}" for dep in deps},
+            "tests": [f"tests/test_{rng.getrandbits(20):05x}.py::test_case_{n}" for n in range(rng.randrange(50, 300))],
+            "warnings": rng.sample(WARNINGS, rng.randrange(1, len(WARNINGS) + 1)),
+        })
+    out = []
+    for _ in range(runs):
+        for index, shape in enumerate(shapes):
+            versions = shape["versions"]
+            if rng.random() < 0.1:  # a dependency bump
+                dep = rng.choice(list(versions))
+                versions[dep] = f"{rng.randrange(1, 5)}.{rng.randrange(20)}.{rng.randrange(10)}"
+            failing = rng.choice(shape["tests"]) if rng.random() < 0.15 else None
+            steps = [
+                "Run actions/checkout@v4\nSyncing repository: org/service\nGetting Git version info\n"
+                f"Fetching the repository\nHEAD is now at {rng.getrandbits(28):07x}\n",
+                "".join(f"Collecting {dep}=={version}\n  Using cached {dep}-{version}-py3-none-any.whl\n"
+                        for dep, version in versions.items())
+                + f"Successfully installed {len(versions)} packages in {rng.uniform(5, 60):.1f}s\n",
+                "".join(f"{warning}\n" for warning in shape["warnings"] for _ in range(3))
+                + "".join(f"{_noise(rng)}\n" for _ in range(rng.randrange(2, 6))),
+                "".join(f"{test} {'FAILED' if test == failing else 'PASSED'}\n" for test in shape["tests"])
+                + f"==== {len(shape['tests'])} tests in {rng.uniform(10, 300):.2f}s ====\n",
+            ]
+            out.append((f"dedup-{index}", steps))
+    return out
+
+
+def _read_all(pipeline_ids: List[str]) -> Tuple[int, int]:
+    rows = size = 0
+    for pipeline_id in pipeline_ids:
+        before_id = None
+        while True:
+            page = models.get_logs(pipeline_id, limit=200, before_id=before_id)
+            rows += len(page)
+            size += sum(len(row["content"]) for row in page)
+            if len(page) < 200:
+                break
+            before_id = page[-1]["id"]
+    return rows, size
+
+
+def run_mode(path: str, mode: str, runs: List[Tuple[str, List[str]]]) -> Dict[str, object]:
+    log_codec.LOG_COMPRESSION, log_codec.LOG_DEDUP = MODES[mode]
+    models.DB_PATH = path
+    models.init_db()
+    for pipeline_id in sorted({pipeline_id for pipeline_id, _ in runs}):
+        models.write(models.upsert_pipeline, pipeline_id=pipeline_id)  # dictionaries are trained per pipeline
+    raw = sum(len(step.encode("utf-8")) for _, steps in runs for step in steps)
+    train_at = len(runs) // 10
+    elapsed = 0.0
+    for number, (pipeline_id, steps) in enumerate(runs):
+        if number == train_at:
+            models.train_log_dictionaries(min_rows=1)
+        started = time.perf_counter()
+        models.write(models.insert_logs, pipeline_id, steps)
+        elapsed += time.perf_counter() - started
+    while models.compact_logs():  # rows written before their dictionary
+        pass
+    rows = sum(len(steps) for _, steps in runs)
+    stats = models.log_storage_stats()
+    stored = sum(codec["stored_bytes"] for codec in stats["codecs"].values()) + stats["chunks"]["stored_bytes"]
+    result: Dict[str, object] = {
+        "mode": mode, "rows": rows, "raw_bytes": raw, "stored_bytes": stored, "ratio": round(raw / stored, 2),
+        "chunks": stats["chunks"]["count"], "write_rows_per_s": round(rows / elapsed),
+        "write_mb_per_s": round(raw / elapsed / 1e6, 1),
+    }
+    pipeline_ids = sorted({pipeline_id for pipeline_id, _ in runs})
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        read_rows, read_chars = _read_all(pipeline_ids)
+        seconds = time.perf_counter() - started
+        assert read_rows == rows
+        result[f"read_{label}_rows_per_s"] = round(read_rows / seconds)
+        result[f"read_{label}_mb_per_s"] = round(read_chars / seconds / 1e6, 1)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipelines", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=40, help="runs per pipeline")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--dir", help="where the databases go (default: a temporary directory)")
+    args = parser.parse_args()
+    if models.DB_URL:
+        sys.exit("SQLite only: log bodies are stored plain on PostgreSQL")
+
+    runs = corpus(args.pipelines, args.runs, args.seed)
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for mode in args.modes:
+            print(json.dumps(run_mode(os.path.join(directory, f"{mode}.db"), mode, runs)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
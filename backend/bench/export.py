@@ -0,0 +1,113 @@
+"""Log export benchmark: streaming /logs/{id}/export vs paging /logs/{id}.
+
+Fills an empty database (DB_PATH / DB_URL) with one pipeline of --lines
+log lines via bench/generate.py, starts a backend on it and reads the
+whole pipeline once per method:
+
+    page-N       GET /logs/{id}?limit=N&before_id=... until exhausted
+    ndjson/text  GET /logs/{id}/export?format=...
+    *-gzip       the same with gzip=true
+
+    DB_PATH=/tmp/export.db python bench/export.py --lines 1000000
+
+Prints one JSON object per method with rows/s, bytes on the wire and the
+backend's peak RSS (Linux VmHWM) after it.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402
+from generate import generate  # noqa: E402
+from load import start_backend  # noqa: E402
+from scaling import wait_ready  # noqa: E402
+
+LINES_PER_RUN = 20
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def paginate(base: str, pipeline_id: str, limit: int) -> Dict[str, Any]:
+    rows = size = requests = 0
+    params: Dict[str, Any] = {"limit": limit}
+    with httpx.Client(timeout=300) as http:
+        while True:
+            resp = http.get(f"{base}/logs/{pipeline_id}", params=params)
+            resp.raise_for_status()
+            requests += 1
+            size += len(resp.content)
+            rows += len(resp.json())
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                return {"rows": rows, "bytes": size, "requests": requests}
+            params["before_id"] = cursor
+
+
+def export(base: str, pipeline_id: str, fmt: str, compress: bool) -> Dict[str, Any]:
+    rows = size = 0
+    decompressor = zlib.decompressobj(31) if compress else None
+    with httpx.Client(timeout=300) as http:
+        params = {"format": fmt, "gzip": str(compress).lower()}
+        with http.stream("GET", f"{base}/logs/{pipeline_id}/export", params=params) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_raw():
+                size += len(chunk)
+                rows += (decompressor.decompress(chunk) if decompressor else chunk).count(b"\n")
+    return {"rows": rows, "bytes": size, "requests": 1}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000, help="log lines of the exported pipeline")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[50, 1000])
+    parser.add_argument("--port", type=int, default=8791)
+    args = parser.parse_args()
+
+    models.init_db()
+    with models.get_conn() as conn:
+        if conn.execute("SELECT COUNT(*) FROM pipelines").fetchone()[0]:
+            sys.exit("database is not empty")
+    started = time.perf_counter()
+    generate(1, max(1, args.lines // LINES_PER_RUN), LINES_PER_RUN, 30, 1, prefix="export")
+    print(json.dumps({"engine": models.get_engine().name, "lines": args.lines,
+                      "generate_s": round(time.perf_counter() - started, 1)}), flush=True)
+
+    methods = [(f"page-{size}", lambda b, p, size=size: paginate(b, p, size)) for size in args.page_sizes]
+    methods += [(f"{fmt}{'-gzip' if compress else ''}", lambda b, p, f=fmt, c=compress: export(b, p, f, c))
+                for compress in (False, True) for fmt in ("ndjson", "text")]
+    base = f"http://127.0.0.1:{args.port}"
+    for name, method in methods:
+        # A fresh backend per method, so each peak RSS is its own
+        proc = start_backend(args.port, 1, "http://127.0.0.1:9/v1")
+        try:
+            wait_ready(base, proc)
+            started = time.perf_counter()
+            result = method(base, "export-0")
+            elapsed = time.perf_counter() - started
+            rss = peak_rss_mb(proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        print(json.dumps({"method": name, **result, "seconds": round(elapsed, 2),
+                          "rows_per_s": round(result["rows"] / elapsed), "peak_rss_mb": rss}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
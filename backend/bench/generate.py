@@ -0,0 +1,141 @@
+"""Synthetic data generator: N pipelines × M runs × K log lines, loaded in bulk.
+
+Runs are built from the /seed scenarios (their success and failure logs
+are the templates), padded with step noise to K lines per run and spread
+over the last --days. Pipelines get a realistic failure mix: most are
+healthy, some flaky, a few broken, and failures come in streaks. Rows go
+in with executemany in large transactions, then the run aggregates and
+rollups are rebuilt once. The same --seed gives the same data. Uses
+DB_PATH / DB_URL like the backend and expects an empty database, e.g.
+
+    DB_PATH=/tmp/load.db python bench/generate.py --pipelines 1000 --runs 100000 --lines 20
+
+Prints one JSON object with row counts and timings.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402
+from app.routes.seed import SCENARIOS  # noqa: E402
+
+# (share of pipelines, failure rate range)
+FAILURE_MIX = [(0.7, (0.01, 0.08)), (0.2, (0.15, 0.35)), (0.1, (0.5, 0.9))]
+STREAK = 0.6  # chance a failed run is followed by another failure
+CHUNK = 50000  # rows per transaction
+
+NOISE = [
+    "Restoring cache for key {key}",
+    "Downloading artifact {key}.tar.gz ({n} kB)",
+    "Running step {n}: lint",
+    "Compiling module {key} ({n} files)",
+    "Pulling image registry.local/{key}:latest",
+    "Collected {n} items",
+    "Uploading coverage report ({n}%)",
+    "Cache hit rate {n}%",
+]
+
+
+def templates() -> Dict[str, List[List[str]]]:
+    """Scenario log lines by run status."""
+    found: Dict[str, List[List[str]]] = {"success": [], "failed": []}
+    for scenario in SCENARIOS:
+        for _, status, lines in scenario["runs"]:
+            found[status].append(lines)
+    return found
+
+
+def failure_rate(rng: random.Random) -> float:
+    pick = rng.random()
+    for share, (low, high) in FAILURE_MIX:
+        if pick < share:
+            return rng.uniform(low, high)
+        pick -= share
+    return FAILURE_MIX[-1][1][1]
+
+
+def run_lines(rng: random.Random, template: List[str], count: int, ts: datetime) -> List[str]:
+    noise = [rng.choice(NOISE).format(key=f"{rng.getrandbits(24):06x}", n=rng.randrange(1, 1000))
+             for _ in range(max(0, count - len(template)))]
+    lines = (noise + template)[-count:] if count else []
+    return [f"[{(ts + timedelta(seconds=i)).isoformat()}] {line}" for i, line in enumerate(lines)]
+
+
+def generate(pipelines: int, runs: int, lines: int, days: int, seed: int, prefix: str = "gen") -> Dict[str, float]:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    logs_by_status = templates()
+    names = [scenario["name"] for scenario in SCENARIOS]
+    ids = [f"{prefix}-{i}" for i in range(pipelines)]
+    rates = [failure_rate(rng) for _ in ids]
+    with models.get_conn() as conn:
+        conn.executemany("INSERT INTO pipelines (id, name, status) VALUES (?, ?, 'unknown')",
+                         [(pid, f"{names[i % len(names)]} {i}") for i, pid in enumerate(ids)])
+
+    # Skewed: low indexes get the most runs. Sorted so ids follow time, as insert_run assigns them.
+    schedule = sorted(
+        (now - timedelta(seconds=rng.random() * days * 86400), int(pipelines * rng.random() ** 2))
+        for _ in range(runs)
+    )
+    codec = None if models.get_engine().compression else ""  # NULL: packed later by the compaction pass
+    last: Dict[int, Tuple[str, str]] = {}
+    log_rows = 0
+    for start in range(0, len(schedule), CHUNK):
+        run_batch, log_batch = [], []
+        for ts, index in schedule[start:start + CHUNK]:
+            previous = last.get(index, ("success", ""))[0]
+            failed = rng.random() < (max(rates[index], STREAK) if previous == "failed" else rates[index])
+            status = "failed" if failed else "success"
+            stamp = ts.isoformat()
+            run_batch.append((ids[index], status, stamp, round(rng.lognormvariate(5, 0.6), 1)))
+            log_batch += [(ids[index], stamp, line, codec)
+                          for line in run_lines(rng, rng.choice(logs_by_status[status]), lines, ts)]
+            last[index] = (status, stamp)
+        with models.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO runs (pipeline_id, status, timestamp, duration_seconds) VALUES (?, ?, ?, ?)", run_batch
+            )
+            conn.executemany(
+                "INSERT INTO logs (pipeline_id, timestamp, content, codec) VALUES (?, ?, ?, ?)", log_batch
+            )
+        log_rows += len(log_batch)
+    with models.transaction() as conn:
+        conn.executemany("UPDATE pipelines SET status = ?, last_run = ? WHERE id = ?",
+                         [(status, stamp, ids[index]) for index, (status, stamp) in last.items()])
+    return {"pipelines": pipelines, "runs": runs, "logs": log_rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipelines", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=20, help="log lines per run")
+    parser.add_argument("--days", type=int, default=90, help="history the runs are spread over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prefix", default="gen", help="pipeline id prefix")
+    args = parser.parse_args()
+
+    models.init_db()
+    with models.get_conn() as conn:
+        if conn.execute("SELECT COUNT(*) FROM pipelines").fetchone()[0]:
+            sys.exit("database is not empty")
+
+    started = time.perf_counter()
+    counts = generate(args.pipelines, args.runs, args.lines, args.days, args.seed, args.prefix)
+    generated = time.perf_counter() - started
+    started = time.perf_counter()
+    models.rebuild_run_stats()
+    print(json.dumps({"engine": models.get_engine().name, **counts, "seed": args.seed,
+                      "generate_s": round(generated, 1),
+                      "rebuild_stats_s": round(time.perf_counter() - started, 1)}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Ingest benchmark: POST /logs throughput and latency at several concurrency levels.
+
+Run against a live backend, e.g. compare group commit on and off:
+
+    DB_GROUP_COMMIT_MS=2 uvicorn app.main:app --port 8000
+    python bench/ingest.py --base http://localhost:8000 --concurrency 1 16 128
+
+Prints one JSON object per concurrency level.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_level(base: str, concurrency: int, requests: int, failed_every: int) -> dict:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    latencies: List[float] = []
+    counter = iter(range(requests))
+
+    async def client(worker: int, http: httpx.AsyncClient) -> None:
+        for i in counter:
+            status = "failed" if failed_every and i % failed_every == 0 else "success"
+            payload = {
+                "pipeline_id": f"{prefix}-{worker % 32}",
+                "logs": f"step {i}: compiling module {i % 97}\nstep {i}: done in {i % 13}s",
+                "status": status,
+            }
+            started = time.perf_counter()
+            resp = await http.post(f"{base}/logs", json=payload)
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(w, http) for w in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rows_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--failed-every", type=int, default=0, help="mark every Nth run failed (0: none)")
+    args = parser.parse_args()
+    for concurrency in args.concurrency:
+        print(json.dumps(asyncio.run(run_level(args.base, concurrency, args.requests, args.failed_every))))
+
+
+if __name__ == "__main__":
+    main()
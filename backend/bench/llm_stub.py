@@ -0,0 +1,106 @@
+"""Local stand-in for the completions API, so load runs never call a real model.
+
+Answers POST /v1/chat/completions with a fixed analysis after --latency-ms
+(plain or, with "stream": true, as server-sent chunks); packed requests
+get one analysis per "### label" section. --fenced wraps answers in a
+markdown code fence, --chunk-ms spaces out streamed chunks. Point the
+backend at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 and any
+OPENAI_API_KEY:
+
+    python bench/llm_stub.py --port 8765 --latency-ms 200
+
+Tests drive it through stub.state.llm: "latency" can be changed, "fail" is
+a list of HTTP statuses answered (in order) instead of the next requests,
+"answer" replaces the answer text as is, "stall_after" makes streams send
+only keep-alive comments, never ending, after that many chunks, and "requests",
+"in_flight" and "max_in_flight" count what arrived.
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = json.dumps({
+    "root_cause": "Synthetic failure from the load test",
+    "suggested_fix": "None needed: this answer comes from bench/llm_stub.py",
+    "confidence": "Medium",
+})
+
+
+def create_stub(latency: float, fenced: bool = False, chunk_delay: float = 0.0) -> FastAPI:
+    stub = FastAPI()
+    state = stub.state.llm = {"latency": latency, "fail": [], "answer": None, "stall_after": None,
+                              "requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    @stub.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        state["requests"] += 1
+        if state["fail"]:
+            status = state["fail"].pop(0)
+            return JSONResponse({"error": {"message": f"stub failure {status}"}}, status_code=status)
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(state["latency"])
+        finally:
+            state["in_flight"] -= 1
+        labels = re.findall(r"^### (\S+)$", body["messages"][-1]["content"], re.MULTILINE)
+        answer = json.dumps({label: json.loads(ANSWER) for label in labels}) if labels else ANSWER
+        if fenced:
+            answer = f"```json\n{answer}\n```"
+        if state["answer"] is not None:
+            answer = state["answer"]
+        usage = {"prompt_tokens": len(json.dumps(body["messages"])) // 4, "completion_tokens": len(answer) // 4}
+        if not body.get("stream"):
+            return {"choices": [{"message": {"content": answer}}], "usage": usage}
+
+        stall_after = state["stall_after"]
+
+        async def chunks():
+            for number, start in enumerate(range(0, len(answer), 16)):
+                while number == stall_after:  # until the client goes away
+                    yield ": keep-alive\n\n"
+                    await asyncio.sleep(0.05)
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': answer[start:start + 16]}}]})}\n\n"
+                await asyncio.sleep(chunk_delay)
+            yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return stub
+
+
+def serve(stub: FastAPI, port: int) -> uvicorn.Server:
+    """Serve stub from a daemon thread (port 0: any free one); returns once it accepts connections."""
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def start(port: int, latency: float) -> uvicorn.Server:
+    return serve(create_stub(latency), port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200, help="before the answer (streamed: its first chunk)")
+    parser.add_argument("--chunk-ms", type=float, default=0, help="between streamed chunks")
+    parser.add_argument("--fenced", action="store_true")
+    args = parser.parse_args()
+    stub = create_stub(args.latency_ms / 1000, args.fenced, args.chunk_ms / 1000)
+    uvicorn.run(stub, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
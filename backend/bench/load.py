@@ -0,0 +1,255 @@
+"""Load benchmark: a fixed request mix against the API, with a JSON report per run.
+
+Starts the LLM stub (bench/llm_stub.py) and a backend on the current
+DB_PATH / DB_URL (fill it first with bench/generate.py), or targets a
+running backend with --base (which must then use the stub or a real
+model itself). The mix is weighted per endpoint:
+
+    logs         POST /logs (a run's log lines, status on some)
+    pipelines    GET  /pipelines (first page, some with q or status)
+    search       GET  /logs/{id}?q=
+    analyze      POST /analyze/{id}
+    tasks        GET  /agent/tasks
+    task_create  POST /agent/tasks (executed in the background against the stub)
+
+The request sequence depends only on --seed and the pipelines present,
+so two commits can be compared on the same data:
+
+    DB_PATH=/tmp/load.db python bench/generate.py
+    DB_PATH=/tmp/load.db python bench/load.py --out before.json
+    ... (check out the other commit, regenerate) ...
+    DB_PATH=/tmp/load.db python bench/load.py --out after.json --baseline before.json
+
+The report has throughput and p50/p95/p99 per endpoint. With --baseline,
+endpoints whose p95 grew by more than --max-regression (and --min-delta-ms)
+are listed and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+import llm_stub
+from generate import NOISE
+from ingest import percentile
+from scaling import BACKEND_DIR, wait_ready
+
+DEFAULT_MIX = "logs=30,pipelines=20,search=20,analyze=5,tasks=20,task_create=5"
+SEARCH_TERMS = ["timeout", "AssertionError", "exit code", "Terraform", "module", "cache", "registry"]
+
+Request = Tuple[str, str, str, Optional[Dict[str, Any]]]  # (endpoint, method, path, json body)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {name!r} in --mix (choose from {', '.join(ENDPOINTS)})")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def _logs(rng: random.Random, pipeline_id: str) -> Request:
+    lines = [rng.choice(NOISE).format(key=f"{rng.getrandbits(24):06x}", n=rng.randrange(1, 1000))
+             for _ in range(rng.randrange(1, 40))]
+    body: Dict[str, Any] = {"pipeline_id": pipeline_id, "logs": "\n".join(lines)}
+    if rng.random() < 0.3:
+        body["status"] = "failed" if rng.random() < 0.2 else "success"
+        body["duration_seconds"] = round(rng.uniform(30, 900), 1)
+    return ("logs", "POST", "/logs", body)
+
+
+def _pipelines(rng: random.Random, pipeline_id: str) -> Request:
+    pick = rng.random()
+    if pick < 0.2:
+        return ("pipelines", "GET", f"/pipelines?limit=50&q={rng.choice(['demo', 'deploy', 'web', 'ci'])}", None)
+    if pick < 0.4:
+        return ("pipelines", "GET", "/pipelines?limit=50&status=failed&sort=success_rate", None)
+    return ("pipelines", "GET", "/pipelines?limit=50", None)
+
+
+def _search(rng: random.Random, pipeline_id: str) -> Request:
+    return ("search", "GET", f"/logs/{pipeline_id}?limit=50&q={rng.choice(SEARCH_TERMS)}", None)
+
+
+def _analyze(rng: random.Random, pipeline_id: str) -> Request:
+    return ("analyze", "POST", f"/analyze/{pipeline_id}", None)
+
+
+def _tasks(rng: random.Random, pipeline_id: str) -> Request:
+    return ("tasks", "GET", "/agent/tasks?limit=50", None)
+
+
+def _task_create(rng: random.Random, pipeline_id: str) -> Request:
+    return ("task_create", "POST", "/agent/tasks", {"type": rng.choice(["triage", "rca"]), "pipeline_id": pipeline_id})
+
+
+ENDPOINTS = {"logs": _logs, "pipelines": _pipelines, "search": _search, "analyze": _analyze,
+             "tasks": _tasks, "task_create": _task_create}
+
+
+def plan(weights: Dict[str, float], pipeline_ids: List[str], count: int, seed: int) -> List[Request]:
+    """The request sequence: endpoints drawn by weight, pipelines skewed towards the first ones."""
+    rng = random.Random(seed)
+    names = list(weights)
+    requests = []
+    for name in rng.choices(names, weights=[weights[n] for n in names], k=count):
+        pipeline_id = pipeline_ids[int(len(pipeline_ids) * rng.random() ** 2)]
+        requests.append(ENDPOINTS[name](rng, pipeline_id))
+    return requests
+
+
+async def drive(base: str, requests: List[Request], concurrency: int) -> Tuple[Dict[str, Any], float]:
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    queue = iter(requests)
+
+    async def client(http: httpx.AsyncClient) -> None:
+        for endpoint, method, path, body in queue:
+            started = time.perf_counter()
+            try:
+                resp = await http.request(method, base + path, json=body)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples.setdefault(endpoint, []).append(time.perf_counter() - started)
+            else:
+                errors[endpoint] = errors.get(endpoint, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"samples": samples, "errors": errors}, elapsed
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"requests": len(latencies) + errors, "errors": errors,
+                               "rps": round((len(latencies) + errors) / elapsed, 1)}
+    if latencies:
+        summary.update({
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            **{f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) for pct in (50, 95, 99)},
+        })
+    return summary
+
+
+def report(result: Dict[str, Any], elapsed: float, meta: Dict[str, Any]) -> Dict[str, Any]:
+    samples, errors = result["samples"], result["errors"]
+    endpoints = {name: summarize(samples.get(name, []), errors.get(name, 0), elapsed)
+                 for name in sorted(set(samples) | set(errors))}
+    every = [latency for latencies in samples.values() for latency in latencies]
+    return {"meta": {**meta, "elapsed_s": round(elapsed, 2)},
+            "total": summarize(every, sum(errors.values()), elapsed), "endpoints": endpoints}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+            min_delta_ms: float) -> List[Dict[str, Any]]:
+    """One row per endpoint in both reports; regressed rows are flagged."""
+    rows = []
+    for name, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in now:
+            continue
+        delta = now["p95_ms"] - before["p95_ms"]
+        rows.append({
+            "endpoint": name, "p95_ms": now["p95_ms"], "baseline_p95_ms": before["p95_ms"],
+            "rps": now["rps"], "baseline_rps": before["rps"],
+            "regressed": delta > min_delta_ms and now["p95_ms"] > before["p95_ms"] * (1 + max_regression),
+        })
+    return rows
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_backend(port: int, workers: int, llm_base: str) -> subprocess.Popen:
+    # Background jobs would compete with the measured requests
+    env = {**os.environ, "OPENAI_API_KEY": "bench", "OPENAI_BASE_URL": llm_base,
+           "LOG_COMPACT_INTERVAL": "0", "RETENTION_INTERVAL": "0"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", help="running backend to target (default: start one)")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight,...")
+    parser.add_argument("--requests", type=int, default=5000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=200, help="requests sent first and not measured")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--out", default="load-report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p95 growth (fraction)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore smaller p95 changes")
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+
+    proc = None
+    base = args.base
+    if base is None:
+        llm_stub.start(args.llm_port, args.llm_latency_ms / 1000)
+        base = f"http://127.0.0.1:{args.port}"
+        proc = start_backend(args.port, args.workers, f"http://127.0.0.1:{args.llm_port}/v1")
+    try:
+        if proc:
+            wait_ready(base, proc)
+        pipeline_ids = [p["id"] for p in httpx.get(f"{base}/pipelines", params={"limit": 1000, "sort": "name"},
+                                                   timeout=60).json()]
+        if not pipeline_ids:
+            sys.exit("no pipelines: fill the database with bench/generate.py first")
+        requests = plan(weights, pipeline_ids, args.warmup + args.requests, args.seed)
+        asyncio.run(drive(base, requests[:args.warmup], args.concurrency))
+        result, elapsed = asyncio.run(drive(base, requests[args.warmup:], args.concurrency))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    meta = {"commit": git_commit(), "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "engine": "postgres" if os.getenv("DB_URL", "").startswith("postgres") else "sqlite",
+            "pipelines": len(pipeline_ids), "mix": weights, "requests": args.requests,
+            "concurrency": args.concurrency, "workers": args.workers, "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms if args.base is None else None}
+    summary = report(result, elapsed, meta)
+    with open(args.out, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps({"total": summary["total"], "out": args.out}), flush=True)
+    for name, endpoint in summary["endpoints"].items():
+        print(json.dumps({"endpoint": name, **endpoint}), flush=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(summary, json.load(f), args.max_regression, args.min_delta_ms)
+        for row in rows:
+            print(json.dumps({"compare": row}), flush=True)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
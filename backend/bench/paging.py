@@ -0,0 +1,99 @@
+"""Deep paging benchmark: keyset cursor (before_id) vs OFFSET, page by page depth.
+
+Fills an empty database (DB_PATH / DB_URL) with one pipeline of --rows log
+rows via bench/generate.py and --rows agent tasks, then reads single pages
+at increasing depths both ways, through the models the list endpoints use:
+
+    cursor  get_logs / list_agent_tasks with before_id = last id of the page before
+    offset  the same with offset = depth * limit
+
+    DB_PATH=/tmp/paging.db python bench/paging.py --rows 1000000
+
+An offset page costs O(offset) (every skipped row is read), a cursor page
+O(limit) at any depth. Prints one JSON object per (list, depth) with the
+median milliseconds of each; --reuse pages an already filled database.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402
+from generate import generate  # noqa: E402
+
+LINES_PER_RUN = 20
+PIPELINE_ID = "paging-0"
+
+
+def timed(fn: Callable[[], List[dict]], repeat: int, limit: int) -> float:
+    """Median milliseconds of fn(), which must return a full page."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        assert len(fn()) == limit
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def fill_tasks(rows: int) -> None:
+    now = datetime.utcnow().isoformat()
+    with models.get_conn() as conn:
+        for start in range(0, rows, 10_000):
+            conn.executemany(
+                "INSERT INTO agent_tasks (type, pipeline_id, status, created_at, updated_at, change_seq) "
+                "VALUES ('triage', ?, 'completed', ?, ?, 0)",
+                [(PIPELINE_ID, now, now)] * min(10_000, rows - start),
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="log rows, and agent tasks, to generate")
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="page the database as it is (filled earlier)")
+    args = parser.parse_args()
+
+    models.init_db()
+    with models.get_conn() as conn:
+        filled = conn.execute("SELECT COUNT(*) FROM pipelines").fetchone()[0]
+    if filled and not args.reuse:
+        sys.exit("database is not empty (pass --reuse to page it as it is)")
+    if not filled:
+        started = time.perf_counter()
+        counts = generate(1, max(1, args.rows // LINES_PER_RUN), LINES_PER_RUN, 90, 1, prefix="paging")
+        fill_tasks(args.rows)
+        print(json.dumps({"engine": models.get_engine().name, "logs": counts["logs"], "tasks": args.rows,
+                          "generate_s": round(time.perf_counter() - started, 1)}), flush=True)
+
+    with models.get_conn() as conn:
+        (logs,) = conn.execute("SELECT COUNT(*) FROM logs WHERE pipeline_id = ?", (PIPELINE_ID,)).fetchone()
+        (tasks,) = conn.execute("SELECT COUNT(*) FROM agent_tasks").fetchone()
+    lists = {
+        "logs": (logs, "SELECT id FROM logs WHERE pipeline_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?", (PIPELINE_ID,),
+                 lambda **page: models.get_logs(PIPELINE_ID, limit=args.limit, **page)),
+        "agent_tasks": (tasks, "SELECT id FROM agent_tasks ORDER BY id DESC LIMIT 1 OFFSET ?", (),
+                        lambda **page: models.list_agent_tasks(limit=args.limit, **page)),
+    }
+    for name, (total, last_id_sql, params, page) in lists.items():
+        pages = total // args.limit
+        depths = sorted({d for d in (1, 10, 100, 1000, 10_000, pages // 2, pages - 1) if 0 < d < pages})
+        for depth in depths:
+            offset = depth * args.limit
+            with models.get_conn() as conn:
+                (before_id,) = conn.execute(last_id_sql, (*params, offset - 1)).fetchone()
+            cursor_ms = timed(lambda: page(before_id=before_id), args.repeat, args.limit)
+            offset_ms = timed(lambda: page(offset=offset), args.repeat, args.limit)
+            print(json.dumps({"list": name, "rows": total, "page": depth, "offset": offset, "cursor_ms": cursor_ms,
+                              "offset_ms": offset_ms, "speedup": round(offset_ms / cursor_ms, 1) if cursor_ms else None}),
+                  flush=True)
+
+
+if __name__ == "__main__":
+    main()
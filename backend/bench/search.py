@@ -0,0 +1,87 @@
+"""Log search benchmark: the FTS5 index vs the LIKE scan it replaced.
+
+Fills an empty database with --rows log rows via bench/generate.py (the
+/seed scenarios padded with step noise), then times models.search_logs
+(FTS, bm25 ranked) against models._search_logs_like (the substring scan
+still used without an index) for rare and common terms, a phrase, within
+the busiest pipeline, a typical one and across all pipelines. The rare
+query is a cache key that occurs once, the case where LIKE reads every row:
+
+    DB_PATH=/tmp/search.db python bench/search.py --rows 1000000
+
+LIKE returns the newest matches and stops after a page, FTS ranks all of
+them, so LIKE can win on very common terms. Prints one JSON object per
+(query, scope) with median milliseconds of each.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402
+from generate import generate  # noqa: E402
+
+LINES_PER_RUN = 20
+QUERIES = ["AssertionError", "Terraform", "exit code", "timeout", "cache"]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    """Median milliseconds of fn()."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="log rows to generate")
+    parser.add_argument("--pipelines", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=50, help="results per search (one page)")
+    parser.add_argument("--reuse", action="store_true", help="search the database as it is (generated earlier)")
+    args = parser.parse_args()
+
+    models.init_db()
+    if not models.get_engine().fts:
+        sys.exit("SQLite only: PostgreSQL has no FTS index to compare against")
+    with models.get_conn() as conn:
+        filled = conn.execute("SELECT COUNT(*) FROM pipelines").fetchone()[0]
+    if filled and not args.reuse:
+        sys.exit("database is not empty (pass --reuse to search it as it is)")
+    if not filled:
+        started = time.perf_counter()
+        counts = generate(args.pipelines, max(1, args.rows // LINES_PER_RUN), LINES_PER_RUN, 90, 1, prefix="search")
+        print(json.dumps({"logs": counts["logs"], "generate_s": round(time.perf_counter() - started, 1)}), flush=True)
+
+    with models.get_conn() as conn:
+        by_size = conn.execute(
+            "SELECT pipeline_id, COUNT(*) AS n FROM logs GROUP BY pipeline_id ORDER BY n DESC"
+        ).fetchall()
+        keys = [re.search(r"Restoring cache for key ([0-9a-f]{6})", text) for (text,) in conn.execute(
+            "SELECT log_text(codec, content) FROM logs WHERE pipeline_id = ? "
+            "AND log_text(codec, content) LIKE '%Restoring cache for key%' ORDER BY id LIMIT 10", (by_size[0][0],)
+        ).fetchall()]
+    rare = [match.group(1) for match in keys if match][:1]
+    scopes: list = [("busiest", by_size[0][0]), ("typical", by_size[len(by_size) // 2][0]), ("all", None)]
+    for q in rare + QUERIES:
+        for scope, pipeline_id in scopes:
+            pid: Optional[str] = pipeline_id
+            fts = timed(lambda: models.search_logs(q, pipeline_id=pid, limit=args.limit), args.repeat)
+            like = timed(lambda: models._search_logs_like(q, pid, args.limit, 0), args.repeat)
+            hits = len(models.search_logs(q, pipeline_id=pid, limit=args.limit))
+            print(json.dumps({"q": q, "scope": scope, "pipeline_rows": dict(by_size).get(pid) if pid else None,
+                              "hits": hits, "fts_ms": fts, "like_ms": like,
+                              "speedup": round(like / fts, 1) if fts else None}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
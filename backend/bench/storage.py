@@ -0,0 +1,136 @@
+"""Log storage benchmark: plain vs DEFLATE bodies, one row per run and one row per line.
+
+Builds a synthetic corpus of GitHub-Actions-style runs (grouped steps with
+timestamps, a dependency install, a test listing, the odd failure) spread
+over --pipelines pipelines, and writes it to a fresh SQLite database per
+(layout, codec):
+
+    run   the whole run as one log row (POST /logs)
+    line  one log row per line (POST /logs/stream)
+
+Compressed databases get per-pipeline dictionaries trained after the first
+tenth of the runs, and the rows written before them packed afterwards, as
+the maintenance job would; chunk dedup is off (see bench/dedup.py for it),
+so this measures the codec alone:
+
+    python bench/storage.py --pipelines 10 --runs 300
+
+Prints one JSON object per (layout, codec): raw and stored body bytes, the
+database file size (FTS index included) and the median milliseconds of a
+50-row get_logs page at the newest rows and half way back.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import log_codec, models  # noqa: E402
+
+STEPS = ["Set up job", "Checkout code", "Set up Python 3.11", "Install dependencies", "Run tests",
+         "Build docker image", "Post Checkout code", "Complete job"]
+PACKAGES = ["fastapi", "uvicorn", "pydantic", "httpx", "starlette", "anyio", "sniffio", "idna", "certifi", "h11",
+            "click", "typing-extensions", "pytest", "pluggy", "iniconfig", "packaging"]
+LAYOUTS = ("run", "line")
+CODECS = ("none", "zlib")
+PAGE = 50
+
+
+def run_lines(rng: random.Random, failed: bool) -> List[str]:
+    out = []
+    for step in STEPS:
+        out.append(f"2026-10-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:"
+                   f"{rng.randint(0, 59):02d}.{rng.randint(0, 9999999):07d}Z ##[group]{step}")
+        if step == "Install dependencies":
+            for package in PACKAGES:
+                out.append(f"Collecting {package}>={rng.randint(0, 3)}.{rng.randint(0, 20)}")
+                out.append(f"  Downloading {package}-{rng.randint(0, 3)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}"
+                           f"-py3-none-any.whl ({rng.randint(10, 900)} kB)")
+            out.append("Successfully installed " + " ".join(f"{p}-1.{rng.randint(0, 9)}" for p in PACKAGES))
+        if step == "Run tests":
+            for i in range(40):
+                out.append(f"tests/test_mod{i % 7}.py::test_case_{i} PASSED [{int(i / 40 * 100):3d}%]")
+            if failed:
+                out.append("FAILED tests/test_mod3.py::test_case_17 - AssertionError: expected 201 got 400")
+                out.append("Error: Process completed with exit code 1.")
+        out.append("##[endgroup]")
+    return out
+
+
+def corpus(pipelines: int, runs: int, seed: int) -> List[Tuple[str, List[str]]]:
+    """(pipeline_id, lines) per run, round robin over the pipelines."""
+    rng = random.Random(seed)
+    return [(f"storage-{n % pipelines}", run_lines(rng, rng.random() < 0.2)) for n in range(runs)]
+
+
+def _page_ms(pipeline_id: str, before_id: int, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        models.get_logs(pipeline_id, limit=PAGE, before_id=before_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run_mode(path: str, layout: str, codec: str, runs: List[Tuple[str, List[str]]], repeat: int) -> Dict[str, object]:
+    log_codec.LOG_COMPRESSION, log_codec.LOG_DEDUP = codec, False
+    models.DB_PATH = path
+    models.init_db()
+    for pipeline_id in sorted({pipeline_id for pipeline_id, _ in runs}):
+        models.write(models.upsert_pipeline, pipeline_id=pipeline_id)
+    train_at = len(runs) // 10
+    rows = raw = 0
+    for number, (pipeline_id, lines) in enumerate(runs):
+        if number == train_at and codec != "none":
+            models.train_log_dictionaries(min_rows=1)
+        bodies = ["\n".join(lines)] if layout == "run" else lines
+        models.write(models.insert_logs, pipeline_id, bodies)
+        rows += len(bodies)
+        raw += sum(len(body.encode("utf-8")) for body in bodies)
+    while models.compact_logs():  # rows written before their dictionary
+        pass
+    stats = models.log_storage_stats()
+    with models.get_conn() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        pipeline_id = runs[0][0]
+        ids = [row[0] for row in conn.execute("SELECT id FROM logs WHERE pipeline_id = ? ORDER BY id DESC",
+                                              (pipeline_id,)).fetchall()]
+    result: Dict[str, object] = {
+        "layout": layout, "codec": codec, "rows": rows, "raw_bytes": raw,
+        "stored_bytes": sum(c["stored_bytes"] for c in stats["codecs"].values()),
+        "db_file_bytes": os.path.getsize(path),
+    }
+    result["ratio"] = round(raw / result["stored_bytes"], 2)
+    result["page_newest_ms"] = _page_ms(pipeline_id, ids[0] + 1, repeat)
+    result["page_middle_ms"] = _page_ms(pipeline_id, ids[len(ids) // 2], repeat)
+    models.close_conn()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipelines", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=300, help="runs in total")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=50, help="reads per page timing")
+    parser.add_argument("--dir", help="where the databases go (default: a temporary directory)")
+    args = parser.parse_args()
+    if models.DB_URL:
+        sys.exit("SQLite only: log bodies are stored plain on PostgreSQL")
+
+    runs = corpus(args.pipelines, args.runs, args.seed)
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for layout in LAYOUTS:
+            for codec in CODECS:
+                path = os.path.join(directory, f"{layout}-{codec}.db")
+                print(json.dumps(run_mode(path, layout, codec, runs, args.repeat)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
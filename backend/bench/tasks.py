@@ -0,0 +1,145 @@
+"""Agent task throughput: tasks/s through the background queue, idle and under request load.
+
+Starts the LLM stub (bench/llm_stub.py) and a backend on the current
+DB_PATH / DB_URL (fill it first with bench/generate.py). Per --load level
+it queues --tasks agent tasks (POST /agent/tasks from --submitters clients,
+types from --types) while that many clients send the load.py request mix
+without task_create, and waits until every task has finished:
+
+    DB_PATH=/tmp/load.db python bench/generate.py
+    DB_PATH=/tmp/load.db python bench/tasks.py --tasks 500 --load 0 8 32
+
+Worker slots come from --agent-concurrency (AGENT_CONCURRENCY of the
+backend). Prints one JSON object per load level: tasks/s, queue-to-finish
+p50/p95 (from the rows' created_at/updated_at) and the request load's rps
+and p95 meanwhile.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+import llm_stub
+from ingest import percentile
+from load import parse_mix, plan, start_backend, summarize
+from scaling import wait_ready
+
+DONE = {"completed", "failed", "awaiting_approval"}
+LOAD_MIX = "logs=30,pipelines=20,search=20,analyze=5,tasks=20"
+
+
+async def _load(base: str, weights: Dict[str, float], pipeline_ids: List[str], clients: int, seed: int,
+                stop: asyncio.Event) -> Dict[str, Any]:
+    """The request mix from clients until stop is set."""
+    latencies: List[float] = []
+    errors = 0
+    requests = iter(plan(weights, pipeline_ids, 1_000_000, seed))
+
+    async def client(http: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for _, method, path, body in requests:
+            if stop.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                resp = await http.request(method, base + path, json=body)
+                if resp.status_code < 400:
+                    latencies.append(time.perf_counter() - started)
+                    continue
+            except httpx.HTTPError:
+                pass
+            errors += 1
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=max(clients, 1)), timeout=120) as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_level(base: str, pipeline_ids: List[str], args: argparse.Namespace, clients: int) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    stop = asyncio.Event()
+    load = asyncio.create_task(_load(base, parse_mix(LOAD_MIX), pipeline_ids, clients, args.seed, stop))
+    bodies = iter([{"type": rng.choice(args.types), "pipeline_id": rng.choice(pipeline_ids)}
+                   for _ in range(args.tasks)])
+    ids = set()
+
+    async def submit(http: httpx.AsyncClient) -> None:
+        for body in bodies:
+            resp = await http.post(f"{base}/agent/tasks", json=body)
+            resp.raise_for_status()
+            ids.add(resp.json()["id"])
+
+    async with httpx.AsyncClient(timeout=120) as http:
+        started = time.perf_counter()
+        # Several submitters, so queueing keeps ahead of the workers
+        await asyncio.gather(*(submit(http) for _ in range(args.submitters)))
+        queued_s = time.perf_counter() - started
+        finished: Dict[int, Dict[str, Any]] = {}
+        while len(finished) < len(ids):
+            if time.perf_counter() - started > args.timeout:
+                break
+            await asyncio.sleep(0.1)
+            resp = await http.get(f"{base}/agent/tasks", params={"limit": args.tasks})
+            finished.update({row["id"]: row for row in resp.json() if row["id"] in ids and row["status"] in DONE})
+        elapsed = time.perf_counter() - started
+    stop.set()
+    requests = await load
+
+    waits = [(datetime.fromisoformat(row["updated_at"]) - datetime.fromisoformat(row["created_at"])).total_seconds()
+             for row in finished.values()]
+    result: Dict[str, Any] = {
+        "load_clients": clients, "tasks": len(ids), "finished": len(finished),
+        "failed": sum(row["status"] == "failed" for row in finished.values()),
+        "queue_s": round(queued_s, 2), "elapsed_s": round(elapsed, 2),
+        "tasks_per_s": round(len(finished) / elapsed, 1),
+    }
+    if waits:
+        result.update({f"wait_p{pct}_ms": round(percentile(waits, pct) * 1000, 1) for pct in (50, 95)})
+    if clients:
+        result["load"] = {key: requests.get(key) for key in ("requests", "errors", "rps", "p95_ms")}
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500, help="tasks queued per load level")
+    parser.add_argument("--types", nargs="+", default=["triage", "rca"], choices=["triage", "rca", "fix"])
+    parser.add_argument("--load", type=int, nargs="+", default=[0, 8, 32], help="concurrent request clients")
+    parser.add_argument("--submitters", type=int, default=16, help="clients queueing the tasks")
+    parser.add_argument("--agent-concurrency", default="triage=4,rca=4,fix=1")
+    parser.add_argument("--port", type=int, default=8792)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for a level's tasks")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    llm_stub.start(args.llm_port, args.llm_latency_ms / 1000)
+    os.environ["AGENT_CONCURRENCY"] = args.agent_concurrency
+    base = f"http://127.0.0.1:{args.port}"
+    proc = start_backend(args.port, 1, f"http://127.0.0.1:{args.llm_port}/v1")
+    try:
+        wait_ready(base, proc)
+        pipeline_ids = [p["id"] for p in httpx.get(f"{base}/pipelines", params={"limit": 1000, "sort": "name"},
+                                                   timeout=60).json()]
+        if not pipeline_ids:
+            sys.exit("no pipelines: fill the database with bench/generate.py first")
+        for clients in args.load:
+            result = asyncio.run(run_level(base, pipeline_ids, args, clients))
+            print(json.dumps({"agent_concurrency": args.agent_concurrency,
+                              "llm_latency_ms": args.llm_latency_ms, **result}), flush=True)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+import pytest
+
+from app import models
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """A freshly migrated SQLite database, used through app.models."""
+    monkeypatch.setattr(models, "DB_URL", "")
+    monkeypatch.setattr(models, "DB_PATH", str(tmp_path / "test.db"))
+    models.init_db()
+    yield models
+    models.close_conn()
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    """A PostgreSQL server to create test databases on: TEST_DB_URL (any database
+    on it; the role must be allowed to create databases) or, without it, an
+    embedded server from the pgserver package when installed."""
+    url = os.getenv("TEST_DB_URL")
+    if url:
+        return url
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip("PostgreSQL: set TEST_DB_URL (or pip install pgserver)")
+    return pgserver.get_server(str(tmp_path_factory.mktemp("pgdata"))).get_uri()
+
+
+def _fresh_postgres(url: str, name: str) -> str:
+    import psycopg
+
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        conn.execute(f"CREATE DATABASE {name}")
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=f"/{name}"))
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def engine_db(request, tmp_path, monkeypatch):
+    """A freshly migrated database on each storage engine, used through app.models."""
+    if request.param == "postgres":
+        url = _fresh_postgres(request.getfixturevalue("postgres_url"), "copilot_test")
+        monkeypatch.setattr(models, "DB_URL", url)
+    else:
+        monkeypatch.setattr(models, "DB_URL", "")
+        monkeypatch.setattr(models, "DB_PATH", str(tmp_path / "test.db"))
+    models.init_db()
+    yield models
+    models.close_conn()
+    models.close_engine()
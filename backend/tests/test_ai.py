@@ -0,0 +1,179 @@
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+import pytest
+
+import llm_stub
+from app.services import ai
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    stub = llm_stub.create_stub(0.0)
+    server = llm_stub.serve(stub, 0)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield stub, f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+
+
+@pytest.fixture
+def llm(stub_server, monkeypatch):
+    """The stub's counters and knobs, reset; the AI client pointed at it."""
+    stub, base_url = stub_server
+    stub.state.llm.update({"latency": 0.0, "fail": [], "answer": None, "stall_after": None,
+                           "requests": 0, "in_flight": 0, "max_in_flight": 0})
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setattr(ai, "AI_BACKOFF_BASE", 0.01)
+    return stub.state.llm
+
+
+def run(*coros):
+    """Run coros concurrently on a fresh loop; the client and semaphore belong to it, so drop them after."""
+    async def main():
+        try:
+            results = await asyncio.gather(*coros)
+            return results if len(coros) > 1 else results[0]
+        finally:
+            await ai.aclose()
+    return asyncio.run(main())
+
+
+async def collect(logs: str) -> List[dict]:
+    return [event async for event in ai.analyze_logs_with_ai_stream(logs)]
+
+
+def previews(events: List[dict]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for event in events:
+        if "field" in event:
+            out[event["field"]] = out.get(event["field"], "") + event["delta"]
+    return out
+
+
+def test_answer_is_parsed(llm):
+    result = run(ai.analyze_logs_with_ai("ERROR boom", use_cache=False))
+    assert result["root_cause"] == "Synthetic failure from the load test"
+    assert result["confidence"] == "Medium"
+    assert llm["requests"] == 1
+
+
+def test_semaphore_caps_requests_in_flight(llm, monkeypatch):
+    monkeypatch.setattr(ai, "AI_MAX_CONCURRENCY", 3)
+    llm["latency"] = 0.1
+    results = run(*(ai.analyze_logs_with_ai(f"ERROR {n}", use_cache=False) for n in range(10)))
+    assert [r["confidence"] for r in results] == ["Medium"] * 10
+    assert llm["requests"] == 10
+    assert llm["max_in_flight"] == 3
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retryable_status_is_retried(llm, status):
+    llm["fail"] = [status, status]
+    result = run(ai.analyze_logs_with_ai("ERROR boom", use_cache=False))
+    assert result["confidence"] == "Medium"
+    assert llm["requests"] == 3
+
+
+def test_other_status_is_not_retried(llm):
+    llm["fail"] = [400]
+    result = run(ai.analyze_logs_with_ai("ERROR boom", use_cache=False))
+    assert result == ai._failure()
+    assert llm["requests"] == 1
+
+
+def test_gives_up_after_max_retries(llm, monkeypatch):
+    monkeypatch.setattr(ai, "AI_MAX_RETRIES", 2)
+    llm["fail"] = [503] * 5
+    with pytest.raises(httpx.HTTPStatusError):
+        run(ai._complete("ERROR boom"))
+    assert llm["requests"] == 3
+
+
+def test_backoff_is_exponential_with_full_jitter(llm, monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(ai.random, "uniform", uniform)
+    llm["fail"] = [429, 503, 500]
+    run(ai._complete("ERROR boom"))
+    assert bounds == [(0, 0.01), (0, 0.02), (0, 0.04)]
+
+
+def test_deadline_gives_failure(llm, monkeypatch):
+    monkeypatch.setattr(ai, "AI_DEADLINE", 0.2)
+    llm["latency"] = 2.0
+    started = time.perf_counter()
+    result = run(ai.analyze_logs_with_ai("ERROR boom", use_cache=False))
+    assert result == ai._failure()
+    assert time.perf_counter() - started < 1.5
+
+
+def test_deadline_covers_retries(llm, monkeypatch):
+    monkeypatch.setattr(ai, "AI_DEADLINE", 0.3)
+    monkeypatch.setattr(ai, "AI_BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(ai.random, "uniform", lambda low, high: high)
+    llm["fail"] = [503] * 3
+    with pytest.raises(asyncio.TimeoutError):
+        run(ai._complete("ERROR boom"))
+    assert llm["requests"] == 1
+
+
+def test_stream_previews_fields_as_they_arrive(llm, sqlite_db):
+    llm["answer"] = json.dumps({
+        "confidence": "High",
+        "details": {"root_cause": "nested, not previewed"},
+        "root_cause": "Missing \"requests\" module\nin the \u00e9tape venv",
+        "fix": "pip install requests",
+    })
+    events = run(collect("ERROR stream preview"))
+    assert len([e for e in events if "field" in e]) > 2  # one delta per streamed piece of a field
+    assert previews(events) == {"root_cause": "Missing \"requests\" module\nin the \u00e9tape venv",
+                                "suggested_fix": "pip install requests"}
+    assert events[-1] == {"result": {"root_cause": "Missing \"requests\" module\nin the \u00e9tape venv",
+                                     "suggested_fix": "pip install requests", "confidence": "High"}}
+
+
+@pytest.mark.parametrize("answer", [
+    "```json\n{answer}\n```",
+    "Here is the analysis you asked for: {answer} Hope this helps.",
+], ids=["code-fence", "embedded"])
+def test_stream_tolerates_text_around_the_json(llm, sqlite_db, answer):
+    llm["answer"] = answer.format(answer=llm_stub.ANSWER)
+    events = run(collect(f"ERROR stream {answer[:3]}"))
+    expected = ai._normalize(json.loads(llm_stub.ANSWER))
+    assert previews(events) == {"root_cause": expected["root_cause"], "suggested_fix": expected["suggested_fix"]}
+    assert events[-1] == {"result": expected}
+
+
+def test_stalled_stream_times_out_and_frees_its_slot(llm, sqlite_db, monkeypatch):
+    monkeypatch.setattr(ai, "AI_DEADLINE", 0.3)
+    monkeypatch.setattr(ai, "AI_MAX_CONCURRENCY", 1)
+    llm["stall_after"] = 2
+
+    async def stalled_then_healthy():
+        stalled = await collect("ERROR stalled stream")
+        llm["stall_after"] = None
+        return stalled, await collect("ERROR after the stall")
+
+    started = time.perf_counter()
+    stalled, healthy = run(stalled_then_healthy())
+    assert stalled[-1] == {"result": ai._failure()}
+    assert healthy[-1]["result"]["confidence"] == "Medium"
+    assert time.perf_counter() - started < 1.5
+
+
+def test_packed_fallbacks_run_concurrently(llm, sqlite_db, monkeypatch):
+    monkeypatch.setattr(ai, "AI_MAX_CONCURRENCY", 2)
+    llm["fail"] = [400]  # the packed request
+    llm["latency"] = 0.1
+    results = run(ai.analyze_packed_with_ai([f"ERROR {n}" for n in range(4)]))
+    assert [r["confidence"] for r in results] == ["Medium"] * 4
+    assert llm["requests"] == 5
+    assert llm["max_in_flight"] == 2
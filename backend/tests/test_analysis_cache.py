@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+from app.services import analysis_cache
+
+
+def test_table_is_used_off_the_event_loop(sqlite_db, monkeypatch):
+    models = sqlite_db
+    threads = []
+    for name in ("get_cached_analysis", "put_cached_analysis"):
+        def traced(*args, _fn=getattr(models, name)):
+            threads.append(threading.get_ident())
+            return _fn(*args)
+        monkeypatch.setattr(models, name, traced)
+
+    async def compute():
+        return {"root_cause": "x"}
+
+    async def main():
+        key = analysis_cache.make_key("off the loop", "m", "p", 0.0)
+        assert await analysis_cache.get_or_compute(key, compute) == {"root_cause": "x"}
+        analysis_cache.clear_memory()
+        assert await analysis_cache.lookup(key) == {"root_cause": "x"}
+        await analysis_cache.store(key + "2", {"root_cause": "y"})
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert len(threads) == 4  # get + put, get, put
+    assert loop_thread not in threads
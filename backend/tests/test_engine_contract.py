@@ -0,0 +1,120 @@
+"""What app.models promises on every storage engine, run against SQLite and
+PostgreSQL alike (PostgreSQL from TEST_DB_URL, or an embedded pgserver; the
+postgres cases skip without either)."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def test_migrations_are_idempotent(engine_db):
+    versions = engine_db.get_table_versions("pipelines", "logs", "agent_tasks")
+    assert set(versions) == {"pipelines", "logs", "agent_tasks"}
+    engine_db.init_db()
+    assert engine_db.get_table_versions("pipelines", "logs", "agent_tasks") == versions
+
+
+def test_pipelines_upsert_keeps_omitted_fields(engine_db):
+    engine_db.upsert_pipeline("p1", name="One", status="success", success_rate=0.5)
+    engine_db.upsert_pipeline("p1", status="failed")
+    engine_db.upsert_pipeline("p2")
+    pipelines = {p["id"]: p for p in engine_db.list_pipelines()}
+    assert pipelines["p1"]["name"] == "One"
+    assert pipelines["p1"]["status"] == "failed"
+    assert pipelines["p1"]["success_rate"] == 0.5
+    assert pipelines["p2"]["name"] == "Pipeline p2"
+
+
+def test_logs_page_by_key(engine_db):
+    engine_db.upsert_pipeline("p1")
+    engine_db.insert_logs("p1", [f"line {n}" for n in range(5)])
+    first = engine_db.get_logs("p1", limit=2)
+    assert [log["content"] for log in first] == ["line 4", "line 3"]
+    second = engine_db.get_logs("p1", limit=2, before_id=first[-1]["id"])
+    assert [log["content"] for log in second] == ["line 2", "line 1"]
+    assert [log["content"] for log in engine_db.get_logs_after("p1", second[0]["id"])] == ["line 3", "line 4"]
+
+
+def test_search_finds_logs_of_the_pipeline(engine_db):
+    engine_db.insert_logs("p1", ["ModuleNotFoundError: No module named 'yaml'", "all good"])
+    engine_db.insert_logs("p2", ["ModuleNotFoundError: No module named 'toml'"])
+    assert [log["content"] for log in engine_db.search_logs("ModuleNotFoundError", pipeline_id="p1")] == [
+        "ModuleNotFoundError: No module named 'yaml'",
+    ]
+    assert len(engine_db.search_logs("ModuleNotFoundError")) == 2
+
+
+def test_rolled_back_transaction_leaves_nothing(engine_db):
+    versions = engine_db.get_table_versions("logs", "agent_tasks")
+    with pytest.raises(RuntimeError):
+        with engine_db.transaction():
+            engine_db.insert_logs("p1", ["gone"])
+            engine_db.create_agent_task("rca", "p1")
+            raise RuntimeError("abort")
+    assert engine_db.get_logs("p1") == []
+    assert engine_db.list_agent_tasks() == []
+    assert engine_db.get_table_versions("logs", "agent_tasks") == versions
+
+
+def test_table_versions_change_only_at_commit(engine_db):
+    """A poller must never see a new version before the rows it covers
+    (it would cache the old rows under it)."""
+    inserted, release = threading.Event(), threading.Event()
+
+    def writer() -> None:
+        with engine_db.transaction():
+            engine_db.insert_logs("p1", ["a"])
+            engine_db.create_agent_task("rca", "p1")
+            inserted.set()
+            release.wait(5)
+
+    before = engine_db.get_table_versions("logs", "agent_tasks")
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert inserted.wait(5)
+        assert engine_db.get_table_versions("logs", "agent_tasks") == before
+        assert engine_db.get_logs("p1") == []
+    finally:
+        release.set()
+        thread.join()
+    after = engine_db.get_table_versions("logs", "agent_tasks")
+    assert after["logs"] > before["logs"]
+    assert after["agent_tasks"] > before["agent_tasks"]
+    assert [log["content"] for log in engine_db.get_logs("p1")] == ["a"]
+
+
+def test_task_change_seq_follows_the_table_version(engine_db):
+    first = engine_db.create_agent_task("rca", "p1")
+    second = engine_db.create_agent_task("rca", "p2")
+    version = engine_db.get_table_versions("agent_tasks")["agent_tasks"]
+    engine_db.update_agent_task(first, status="completed")
+    changes = engine_db.get_agent_task_changes(0)
+    assert [task["id"] for task in changes] == [second, first]
+    assert changes[-1]["change_seq"] == engine_db.get_table_versions("agent_tasks")["agent_tasks"]
+    assert [task["id"] for task in engine_db.get_agent_task_changes(version)] == [first]
+
+
+def test_concurrent_claims_never_share_a_task(engine_db):
+    ids = {engine_db.create_agent_task("rca", "p1") for _ in range(20)}
+
+    def claim_all() -> list:
+        claimed = []
+        while (task := engine_db.claim_agent_task("rca", 60)) is not None:
+            claimed.append(task["id"])
+        return claimed
+
+    with ThreadPoolExecutor(4) as pool:
+        claimed = [task_id for batch in pool.map(lambda _: claim_all(), range(4)) for task_id in batch]
+    assert sorted(claimed) == sorted(ids)
+    assert {row["status"] for row in engine_db.count_agent_tasks()} == {"running"}
+
+
+def test_requeue_is_conditional(engine_db):
+    task_id = engine_db.create_agent_task("rca", "p1")
+    assert engine_db.requeue_agent_task(task_id) is None
+    engine_db.claim_agent_task("rca", 60)
+    assert engine_db.requeue_agent_task(task_id) is None
+    engine_db.update_agent_task(task_id, status="failed")
+    assert engine_db.requeue_agent_task(task_id)["status"] == "queued"
+    assert engine_db.requeue_agent_task(task_id) is None
@@ -0,0 +1,52 @@
+"""Golden files for the /seed scenarios: the failure context extracted from
+each one's logs and what the local classifier makes of it.
+
+tests/golden/<scenario>.log is the input (the scenario's logs as /seed
+stores them, at a fixed time), <scenario>.context.txt the expected
+extract_failure_context output and <scenario>.json the expected rule match
+and classify result. After an intended change, regenerate and review the
+diff:
+
+    UPDATE_GOLDEN=1 python -m pytest tests/test_golden.py
+"""
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from app.routes.seed import SCENARIOS, run_logs
+from app.services import classifier
+from app.services.context import extract_failure_context
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+SEEDED_AT = datetime(2024, 6, 1, 12, 0, 0)
+UPDATE = os.getenv("UPDATE_GOLDEN") == "1"
+
+
+def _log(scenario: dict) -> str:
+    return "".join(line + "\n" for age, _, lines in scenario["runs"] for line in run_logs(SEEDED_AT - age, lines))
+
+
+def _check(name: str, actual: str) -> None:
+    path = os.path.join(GOLDEN_DIR, name)
+    if UPDATE:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(actual)
+    with open(path) as f:
+        assert actual == f.read(), f"{name} changed (UPDATE_GOLDEN=1 regenerates it)"
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[s["id"] for s in SCENARIOS])
+def test_scenario(scenario, monkeypatch):
+    # Rules only: similarity matches depend on the analyses stored so far
+    monkeypatch.setattr(classifier, "match_similar", lambda text: None)
+    log = _log(scenario)
+    _check(f"{scenario['id']}.log", log)
+
+    context = extract_failure_context(log.splitlines())
+    _check(f"{scenario['id']}.context.txt", context + "\n")
+
+    result = {"rule": classifier.match_rules(context), "classify": classifier.classify(context)}
+    _check(f"{scenario['id']}.json", json.dumps(result, indent=2, sort_keys=True) + "\n")
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from typing import AsyncIterator, List
+
+import pytest
+
+from app.services import ingest
+
+
+async def _chunks(body: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _lines(body: bytes, ndjson: bool = False, size: int = 7) -> List[str]:
+    async def collect():
+        return [line async for line in ingest._lines(_chunks(body, size), ndjson)]
+    return asyncio.run(collect())
+
+
+def _ingest(body: bytes, ndjson: bool = True, size: int = 1000) -> dict:
+    return asyncio.run(ingest.ingest_stream("p1", _chunks(body, size), ndjson=ndjson))
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_MAX_LINE_BYTES", 10)
+    monkeypatch.setattr(ingest, "INGEST_MAX_RECORD_BYTES", 40)
+    monkeypatch.setattr(ingest, "INGEST_BATCH_LINES", 2)
+
+
+def test_lines_across_chunks():
+    assert _lines(b"one\r\ntwo\n\nthree", size=2) == ["one", "two", "", "three"]
+
+
+def test_long_text_line_is_split_in_bytes(limits):
+    assert _lines(b"x" * 25 + b"\nok\n") == ["x" * 10, "x" * 10, "x" * 5, "ok"]
+    # 4 bytes per character: pieces hold whole characters, at most 10 bytes
+    assert _lines(("\U0001F600" * 5).encode()) == ["\U0001F600" * 2, "\U0001F600" * 2, "\U0001F600"]
+
+
+def test_ndjson_record_is_not_split(limits):
+    record = json.dumps({"content": "y" * 20}).encode()
+    assert len(record) > 10
+    assert _lines(record + b"\n", ndjson=True) == [record.decode()]
+
+
+def test_oversized_record_is_rejected_without_reading_it_whole(limits):
+    body = b'{"content": "a"}\n' + b'{"content": "' + b"z" * 1000
+    with pytest.raises(ValueError, match="INGEST_MAX_RECORD_BYTES"):
+        _lines(body, ndjson=True)
+
+
+def test_oversized_record_stores_the_records_before_it(sqlite_db, limits):
+    body = b"".join(json.dumps({"content": f"line {n}"}).encode() + b"\n" for n in range(3))
+    body += json.dumps({"content": "z" * 100}).encode() + b"\n" + b'{"content": "after"}\n'
+    result = _ingest(body, size=16)
+    assert result["lines"] == 3
+    assert result["failed_line"] == 4
+    assert "INGEST_MAX_RECORD_BYTES" in result["error"]
+    assert [log["content"] for log in sqlite_db.get_logs("p1")] == ["line 2", "line 1", "line 0"]
+
+
+def test_invalid_record_stores_the_records_before_it(sqlite_db, limits):
+    result = _ingest(b'{"content": "a"}\n\n{"content": "b"}\n{oops\n{"content": "c"}\n')
+    assert result["lines"] == 2
+    assert result["failed_line"] == 4
+    assert [log["content"] for log in sqlite_db.get_logs("p1")] == ["b", "a"]
+
+
+def test_text_upload_in_batches(sqlite_db, limits):
+    result = _ingest(b"a\nb\nc\n" + b"d" * 15, ndjson=False, size=3)
+    assert result == {"lines": 5, "batches": 3}
+
+
+def test_non_string_content_is_stored_as_json(sqlite_db):
+    body = b'{"content": 123}\n{"content": {"a": 1}}\n{"message": ["x", null], "step": "build"}\n{"line": false}\n'
+    result = _ingest(body)
+    assert result == {"lines": 4, "batches": 1}
+    assert [log["content"] for log in reversed(sqlite_db.get_logs("p1"))] == [
+        "123", '{"a": 1}', '[build] ["x", null]', "false",
+    ]
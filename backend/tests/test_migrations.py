@@ -0,0 +1,40 @@
+from app import models
+
+
+def _migrate_to(version: int) -> None:
+    migrations = models._MIGRATIONS
+    models._MIGRATIONS = migrations[:version]
+    try:
+        models.init_db()
+    finally:
+        models._MIGRATIONS = migrations
+
+
+def test_run_stats_are_filled_on_upgrade(tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "DB_URL", "")
+    monkeypatch.setattr(models, "DB_PATH", str(tmp_path / "old.db"))
+    try:
+        _migrate_to(4)
+        with models.get_conn() as conn:
+            conn.execute("INSERT INTO pipelines (id, name) VALUES ('p1', 'One')")
+            conn.executemany(
+                "INSERT INTO runs (pipeline_id, status, timestamp) VALUES ('p1', ?, ?)",
+                [("failed", "2024-06-01T10:00:00"), ("success", "2024-06-01T11:30:00"), ("failed", "2024-06-02T09:00:00")],
+            )
+
+        # Migration 5 fills the aggregates it adds, as it always did
+        _migrate_to(5)
+        with models.get_conn() as conn:
+            assert conn.execute("SELECT total_runs, success_runs, recent_outcomes FROM pipelines").fetchone() == (
+                3, 1, "fsf")
+            assert conn.execute("SELECT SUM(total) FROM run_rollups").fetchone() == (3,)
+
+        # ...and the later ones rebuild over it without counting anything twice
+        models.init_db()
+        assert models.check_run_stats() == []
+        stats = models.get_pipeline_stats("p1")
+        assert (stats["total_runs"], stats["failed_runs"], stats["recent_outcomes"]) == (3, 2, "fsf")
+        with models.get_conn() as conn:
+            assert conn.execute("SELECT SUM(total), SUM(recoveries) FROM run_rollups_daily").fetchone() == (3, 1)
+    finally:
+        models.close_conn()
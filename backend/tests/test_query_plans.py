@@ -0,0 +1,93 @@
+"""Each hot query in app.models is answered from an index, not a table scan.
+
+The queries are captured from the models functions themselves (SQLite trace
+callback), so a changed query is checked as it is actually sent.
+"""
+import re
+from typing import Callable, List
+
+import pytest
+
+from app import models
+
+# Tables scanned by design: a handful of counter rows
+SMALL_TABLES = {"table_versions", "pipeline_counts"}
+_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+@pytest.fixture
+def db(sqlite_db):
+    for i in range(3):
+        pipeline_id = f"p{i}"
+        models.upsert_pipeline(pipeline_id, name=f"Deploy {i}", status="failed")
+        models.insert_logs(pipeline_id, [f"step {n}: Error: exit code {n}" for n in range(20)])
+        models.insert_run(pipeline_id, "failed", 12.5)
+        models.insert_run(pipeline_id, "success", 10.0)
+        models.insert_analysis(pipeline_id, "cause", "fix", "High")
+        task_id = models.create_agent_task("triage", pipeline_id)
+        models.insert_agent_action(task_id, "note", "{}")
+    # No ANALYZE: on a few rows it would rightly prefer scans
+    return models
+
+
+def _statements(fn: Callable[[], object]) -> List[str]:
+    sent: List[str] = []
+    with models.get_conn() as conn:
+        conn.set_trace_callback(sent.append)
+        try:
+            fn()
+        finally:
+            conn.set_trace_callback(None)
+    # Trigger bodies are traced as comments; BEGIN/COMMIT/PRAGMA have no plan
+    return [sql for sql in sent if re.match(r"\s*(SELECT|WITH|UPDATE|DELETE|INSERT)", sql, re.I)]
+
+
+def _table_scans(sql: str) -> List[str]:
+    with models.get_conn() as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    scans = []
+    for row in plan:
+        match = _SCAN.match(row[3])
+        if match and match.group(1) in tables and match.group(1) not in SMALL_TABLES:
+            scans.append(row[3])
+    return scans
+
+
+HOT_QUERIES = {
+    "get_logs": lambda: models.get_logs("p1", limit=5),
+    "get_logs_before_id": lambda: models.get_logs("p1", limit=5, before_id=10),
+    "get_logs_search": lambda: models.get_logs("p1", q="exit code"),
+    "search_logs_all": lambda: models.search_logs("Error"),
+    "get_logs_after": lambda: models.get_logs_after("p1", after_id=3),
+    "iter_logs": lambda: list(models.iter_logs("p1", batch_size=7)),
+    "last_log_id": lambda: models.last_log_id("p1"),
+    "export_logs_since": lambda: list(models.export_logs("p1", since="2000-01-01")),
+    "get_recent_logs_many": lambda: models.get_recent_logs_many(["p0", "p1"], 5),
+    "get_latest_analysis": lambda: models.get_latest_analysis("p1"),
+    "insert_run": lambda: models.insert_run("p1", "failed", 3.0),
+    "get_pipeline_stats": lambda: models.get_pipeline_stats("p1"),
+    "list_pipelines": lambda: models.list_pipelines(limit=2),
+    "list_pipelines_by_name": lambda: models.list_pipelines(limit=2, sort="name"),
+    "list_pipelines_by_success_rate": lambda: models.list_pipelines(limit=2, sort="success_rate"),
+    "list_pipelines_status": lambda: models.list_pipelines(limit=2, statuses=["failed"]),
+    "count_pipelines": lambda: models.count_pipelines(statuses=["failed"]),
+    "list_agent_tasks": lambda: models.list_agent_tasks(limit=2, before_id=3),
+    "get_agent_task": lambda: models.get_agent_task(1),
+    "list_agent_actions": lambda: models.list_agent_actions(1),
+    "claim_agent_task": lambda: models.claim_agent_task("triage", 60),
+    "requeue_expired_agent_tasks": lambda: models.requeue_expired_agent_tasks(),
+    "get_agent_task_changes": lambda: models.get_agent_task_changes(2),
+    "get_cached_analysis": lambda: models.get_cached_analysis("k", "2000-01-01"),
+    "get_pipeline_cluster": lambda: models.get_pipeline_cluster("p1"),
+    "get_table_versions": lambda: models.get_table_versions("logs", "pipelines"),
+    "list_log_archives": lambda: models.list_log_archives("p1"),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(db, name):
+    statements = _statements(HOT_QUERIES[name])
+    assert statements, f"{name} sent no query"
+    for sql in statements:
+        assert _table_scans(sql) == [], f"{name}: {sql}"
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.services import maintenance
+
+
+class _Clock(datetime):
+    at = datetime.utcnow()
+
+    @classmethod
+    def utcnow(cls):
+        return cls.at
+
+
+def test_pruning_runs_keeps_lifetime_totals(engine_db, monkeypatch):
+    models = engine_db
+    monkeypatch.setattr(models, "datetime", _Clock)
+    now = datetime.utcnow()
+    models.upsert_pipeline("p1")
+    for age, status, duration in ((timedelta(days=10, hours=2), "failed", 30.0),
+                                  (timedelta(days=10, hours=1), "success", 10.0),  # a recovery
+                                  (timedelta(days=9), "failed", None),
+                                  (timedelta(hours=2), "success", 20.0),
+                                  (timedelta(hours=1), "failed", 40.0)):
+        _Clock.at = now - age
+        models.insert_run("p1", status, duration)
+    before = models.get_pipeline_stats("p1")
+    models.set_retention_policy("p1", None, 5)
+
+    totals = asyncio.run(maintenance.retention_once())
+
+    assert totals["pruned_runs"] == 3
+    stats = models.get_pipeline_stats("p1")
+    for key in ("total_runs", "success_runs", "failed_runs", "success_rate", "mean_duration_seconds",
+                "recent_outcomes"):
+        assert stats[key] == before[key], key
+    assert stats["total_runs"] == 5
+    assert stats["windows"]["30d"]["runs"] == 2  # windows are summed from the rollups
+    with models.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone() == (2,)
+        for table in ("run_rollups", "run_rollups_daily"):
+            # Only the retained runs' buckets are left, and they still add up
+            assert conn.execute(f"SELECT SUM(total), MIN(bucket) >= ? FROM {table}",
+                                ((now - timedelta(days=5)).isoformat()[:10],)).fetchone() == (2, 1), table
+    assert models.check_run_stats() == []
+
+    models.rebuild_run_stats("p1")
+    assert models.get_pipeline_stats("p1")["total_runs"] == 5
+    assert models.get_pipeline_stats("p1")["success_rate"] == before["success_rate"]
@@ -0,0 +1,37 @@
+import os
+from datetime import datetime, timedelta
+
+from app.routes import seed
+from app.services import archive
+
+
+def test_reset_removes_everything_it_indexed(sqlite_db, tmp_path, monkeypatch):
+    models = sqlite_db
+    monkeypatch.setattr(archive, "LOG_ARCHIVE_DIR", str(tmp_path / "archive"))
+    seed.seed_demo_data()
+    models.insert_logs("demo-1", [f"Collecting package-{n % 5} from the index" for n in range(50)])
+    assert models.train_log_dictionaries(min_rows=1) >= 1
+    models.insert_logs("demo-1", ["Collecting package-1 from the index"])  # caches the dictionary
+    cutoff = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    assert models.archive_logs_batch("demo-1", cutoff, 5, archive.append_segment) == 5
+    task_id = models.create_agent_task("rca", "demo-1")
+    models.insert_agent_action(task_id, "note", "{}")
+    models.put_cached_analysis("key", {"root_cause": "x"})
+    models.set_retention_policy("demo-1", 30, None)
+
+    seed.reset_demo_data()
+
+    assert os.listdir(tmp_path / "archive") == []
+    with models.get_conn() as conn:
+        for table in ("pipelines", "logs", "log_chunks", "log_archives", "log_dictionaries", "runs", "analysis",
+                      "analysis_cache", "agent_tasks", "agent_actions", "failure_clusters"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone() == (0,), table
+    assert [p["pipeline_id"] for p in models.list_retention_policies()] == ["demo-1"]
+
+    # Logs written right after the reset do not reference a deleted dictionary
+    content = "Collecting package-2 from the index " * 40
+    models.insert_logs("demo-1", [content])
+    assert [log["content"] for log in models.get_logs("demo-1")] == [content]
+    with models.get_conn() as conn:
+        codecs = conn.execute("SELECT codec FROM logs UNION SELECT codec FROM log_chunks").fetchall()
+    assert not [codec for (codec,) in codecs if codec and codec.startswith("zd:")]
@@ -0,0 +1,90 @@
+import asyncio
+import sqlite3
+
+from app.services import task_queue
+
+
+def test_requeue_is_conditional(sqlite_db):
+    models = sqlite_db
+    task_id = models.create_agent_task("rca", "p1")
+    assert models.requeue_agent_task(task_id) is None  # queued already
+
+    assert models.claim_agent_task("rca", 60)["id"] == task_id
+    assert models.requeue_agent_task(task_id) is None  # running
+
+    models.update_agent_task(task_id, status="completed")
+    assert models.requeue_agent_task(task_id)["status"] == "queued"
+    assert models.requeue_agent_task(task_id) is None  # the second of two concurrent calls
+
+
+def test_lease_renewal_stops_after_the_task(sqlite_db):
+    models = sqlite_db
+    task_id = models.create_agent_task("rca", "p1")
+    assert not models.renew_agent_task_lease(task_id, 60)
+    models.claim_agent_task("rca", 60)
+    assert models.renew_agent_task_lease(task_id, 60)
+    models.update_agent_task(task_id, status="completed")
+    assert not models.renew_agent_task_lease(task_id, 60)
+
+
+def test_heartbeat_keeps_long_tasks_from_running_twice(sqlite_db, monkeypatch):
+    models = sqlite_db
+    monkeypatch.setattr(task_queue, "AGENT_CONCURRENCY", {"rca": 2})
+    monkeypatch.setattr(task_queue, "AGENT_LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(task_queue, "AGENT_POLL_INTERVAL", 0.05)
+    runs = []
+
+    async def runner(task_id: int) -> None:
+        runs.append(task_id)
+        await asyncio.sleep(1.0)  # several leases long
+        models.update_agent_task(task_id, status="completed")
+
+    async def main() -> None:
+        await task_queue.start(runner)
+        try:
+            await asyncio.sleep(1.5)
+        finally:
+            await task_queue.stop()
+
+    requeued = task_queue.stats["requeued"]
+    task_id = models.create_agent_task("rca", "p1")
+    asyncio.run(main())
+    assert runs == [task_id]
+    assert task_queue.stats["requeued"] == requeued
+    assert models.get_agent_task(task_id)["status"] == "completed"
+
+
+def test_dispatcher_survives_a_failing_claim(sqlite_db, monkeypatch):
+    models = sqlite_db
+    monkeypatch.setattr(task_queue, "AGENT_CONCURRENCY", {"rca": 1})
+    monkeypatch.setattr(task_queue, "AGENT_POLL_INTERVAL", 0.05)
+    claim = models.claim_agent_task
+    failures = []
+
+    def flaky_claim(*args):
+        if not failures:
+            failures.append(args)
+            raise sqlite3.OperationalError("database is locked")
+        return claim(*args)
+
+    monkeypatch.setattr(models, "claim_agent_task", flaky_claim)
+    runs = []
+
+    async def runner(task_id: int) -> None:
+        runs.append(task_id)
+        models.update_agent_task(task_id, status="completed")
+
+    async def main() -> None:
+        await task_queue.start(runner)
+        try:
+            for _ in range(40):
+                await asyncio.sleep(0.05)
+                if len(runs) == 2:
+                    break
+        finally:
+            await task_queue.stop()
+
+    ids = [models.create_agent_task("rca", "p1"), models.create_agent_task("rca", "p1")]
+    asyncio.run(main())
+    assert len(failures) == 1
+    assert runs == ids  # one slot: still free after the failed claim
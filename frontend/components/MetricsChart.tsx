@@ -3,33 +3,49 @@ import { Line } from 'react-chartjs-2';
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, Title, Tooltip, Legend);
 
+export type Series = {
+  label: string;
+  values: (number | null)[];
+  color?: string; // "r,g,b"
+  axis?: 'y' | 'y1'; // y1: right-hand axis, e.g. for a percentage next to counts
+};
+
 type Props = {
   labels: string[];
-  values: number[];
+  values?: number[];
+  series?: Series[];
   title?: string;
 };
 
-export default function MetricsChart({ labels, values, title }: Props) {
+const COLORS = ['59,130,246', '239,68,68', '16,185,129', '245,158,11'];
+
+export default function MetricsChart({ labels, values, series, title }: Props) {
+  const lines: Series[] = series || [{ label: title || 'Runs', values: values || [] }];
   const data = {
     labels,
-    datasets: [
-      {
-        label: title || 'Runs',
-        data: values,
-        borderColor: 'rgb(59,130,246)',
-        backgroundColor: 'rgba(59,130,246,0.3)'
-      }
-    ]
+    datasets: lines.map((s, i) => ({
+      label: s.label,
+      data: s.values,
+      yAxisID: s.axis || 'y',
+      spanGaps: true,
+      borderColor: `rgb(${s.color || COLORS[i % COLORS.length]})`,
+      backgroundColor: `rgba(${s.color || COLORS[i % COLORS.length]},0.3)`
+    }))
   };
 
+  const rightAxis = lines.some(s => s.axis === 'y1');
   const options = {
     responsive: true,
+    interaction: { mode: 'index' as const, intersect: false },
     plugins: {
       legend: { position: 'top' as const },
       title: { display: !!title, text: title }
+    },
+    scales: {
+      y: { beginAtZero: true },
+      ...(rightAxis ? { y1: { beginAtZero: true, position: 'right' as const, grid: { drawOnChartArea: false } } } : {})
     }
   };
 
   return <Line options={options} data={data} />;
 }
-
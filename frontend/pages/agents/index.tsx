@@ -22,14 +22,30 @@ export default function Agents() {
   const load = async () => {
     try {
       const res = await fetch(`${API_BASE}/agent/tasks?limit=100`);
-      const data = await res.json();
-      setTasks(data || []);
+      const data: AgentTask[] = (await res.json()) || [];
+      // Rows pushed by the stream while this request was in flight are newer
+      setTasks(prev => {
+        const live = new Map(prev.map(t => [t.id, t]));
+        const rows = data.map(t => live.get(t.id) || t);
+        return [...prev.filter(t => !rows.some(r => r.id === t.id)), ...rows];
+      });
     } catch (e) {
       console.error(e);
     }
   };
 
-  useEffect(() => { load(); }, []);
+  useEffect(() => {
+    // Subscribe before loading so no change falls between the two
+    const source = new EventSource(`${API_BASE}/agent/tasks/stream`);
+    source.addEventListener('task', (e) => {
+      const task: AgentTask = JSON.parse((e as MessageEvent).data);
+      setTasks(prev => prev.some(t => t.id === task.id)
+        ? prev.map(t => (t.id === task.id ? task : t))
+        : [task, ...prev]);
+    });
+    load();
+    return () => source.close();
+  }, []);
 
   const createTask = async () => {
     if (!pipelineId) return;
@@ -41,7 +57,6 @@ export default function Agents() {
         body: JSON.stringify({ pipeline_id: pipelineId, type })
       });
       setPipelineId('');
-      await load();
     } catch (e) { console.error(e); }
     setBusy(false);
   };
@@ -49,7 +64,6 @@ export default function Agents() {
   const rerun = async (id: number) => {
     try {
       await fetch(`${API_BASE}/agent/tasks/${id}/run`, { method: 'POST' });
-      await load();
     } catch (e) { console.error(e); }
   };
 
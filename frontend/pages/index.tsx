@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useEffect, useState } from 'react';
 import Link from 'next/link';
 import Layout from '../components/Layout';
 
@@ -11,36 +11,59 @@ type Pipeline = {
 };
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || 'http://localhost:8000';
+const PAGE_SIZE = 50;
+
+const SORTS = [
+  { label: 'Recent runs', sort: 'last_run' },
+  { label: 'Name', sort: 'name' },
+  { label: 'Lowest success rate', sort: 'success_rate' },
+];
 
 export default function Home() {
   const [pipelines, setPipelines] = useState<Pipeline[]>([]);
   const [loading, setLoading] = useState(true);
   const [query, setQuery] = useState('');
+  const [debounced, setDebounced] = useState('');
+  const [status, setStatus] = useState('');
+  const [sort, setSort] = useState('last_run');
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState<string | null>(null);
+
+  // Filtering, sorting and paging happen on the server (GET /pipelines)
+  useEffect(() => {
+    const timer = setTimeout(() => setDebounced(query.trim()), 250);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const load = async (after: string | null) => {
+    setLoading(true);
+    try {
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE), sort });
+      if (debounced) params.set('q', debounced);
+      if (status) params.set('status', status);
+      if (after) params.set('cursor', after);
+      const res = await fetch(`${API_BASE}/pipelines?${params.toString()}`);
+      const data: Pipeline[] = await res.json();
+      setPipelines(prev => (after ? [...prev, ...(data || [])] : (data || [])));
+      setCursor(res.headers.get('X-Next-Cursor'));
+      if (!after) setTotal(res.headers.get('X-Total-Count'));
+    } catch (e) {
+      console.error(e);
+    } finally {
+      setLoading(false);
+    }
+  };
 
   useEffect(() => {
-    const load = async () => {
-      try {
-        const res = await fetch(`${API_BASE}/pipelines`);
-        const data = await res.json();
-        setPipelines(data || []);
-      } catch (e) {
-        console.error(e);
-      } finally {
-        setLoading(false);
-      }
-    };
-    load();
-  }, []);
+    load(null);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [debounced, status, sort]);
 
-  const filtered = useMemo(() => {
-    if (!query) return pipelines;
-    const q = query.toLowerCase();
-    return pipelines.filter(p => (p.name || p.id).toLowerCase().includes(q) || (p.status || '').toLowerCase().includes(q));
-  }, [pipelines, query]);
+  const unfiltered = !debounced && !status;
 
   return (
     <Layout title="Pipelines" subtitle="Overview of GitHub Actions pipelines">
-      {(!loading && pipelines.length === 0) && (
+      {(!loading && unfiltered && pipelines.length === 0) && (
         <div className="mb-4 panel">
           <h3 className="font-semibold mb-1 heading-gradient">Welcome to DevOps Copilot</h3>
           <p className="text-sm text-gray-300">No pipelines yet. Seed demo data from Settings or POST logs to the API.</p>
@@ -49,18 +72,27 @@ export default function Home() {
           </div>
         </div>
       )}
-      <div className="mb-4 flex items-center justify-between">
+      <div className="mb-4 flex items-center justify-between gap-2">
         <input
           value={query}
           onChange={(e) => setQuery(e.target.value)}
-          placeholder="Search by name or status..."
+          placeholder="Search by name or id..."
           className="w-full max-w-md px-3 py-2 rounded-md bg-white/5 border border-white/10 text-gray-100 placeholder:text-gray-400 focus:outline-none focus:ring-2 focus:ring-blue-500/50"
         />
-        <div className="text-sm text-gray-400 ml-4">{filtered.length} result{filtered.length === 1 ? '' : 's'}</div>
+        <select value={status} onChange={(e) => setStatus(e.target.value)} className="px-3 py-2 rounded-md bg-white/5 border border-white/10 text-gray-100">
+          <option value="">All statuses</option>
+          <option value="success">Success</option>
+          <option value="failed">Failed</option>
+          <option value="unknown">Unknown</option>
+        </select>
+        <select value={sort} onChange={(e) => setSort(e.target.value)} className="px-3 py-2 rounded-md bg-white/5 border border-white/10 text-gray-100">
+          {SORTS.map(s => <option key={s.sort} value={s.sort}>{s.label}</option>)}
+        </select>
+        <div className="text-sm text-gray-400 ml-2 whitespace-nowrap">{total ?? pipelines.length} result{total === '1' ? '' : 's'}</div>
       </div>
       {/* Cards on small screens */}
       <div className="grid grid-cols-1 sm:grid-cols-2 xl:grid-cols-3 gap-4 lg:hidden">
-        {filtered.map((p) => (
+        {pipelines.map((p) => (
           <div key={p.id} className="panel">
             <div className="flex items-center justify-between">
               <Link className="text-blue-300 hover:underline" href={`/pipeline/${p.id}`}>{p.name || p.id}</Link>
@@ -84,13 +116,13 @@ export default function Home() {
               </tr>
             </thead>
             <tbody>
-              {loading && (
+              {loading && pipelines.length === 0 && (
                 <tr><td className="px-4 py-3 text-gray-400" colSpan={4}>Loading...</td></tr>
               )}
-              {!loading && filtered.length === 0 && (
-                <tr><td className="px-4 py-3 text-gray-400" colSpan={4}>No pipelines yet. Post logs to the API to populate.</td></tr>
+              {!loading && pipelines.length === 0 && (
+                <tr><td className="px-4 py-3 text-gray-400" colSpan={4}>{unfiltered ? 'No pipelines yet. Post logs to the API to populate.' : 'No pipelines match.'}</td></tr>
               )}
-              {filtered.map((p, i) => (
+              {pipelines.map((p, i) => (
                 <tr key={p.id} className={`border-t border-white/10 ${i % 2 ? 'bg-white/5' : ''} hover:bg-white/10`}>
                   <td className="px-4 py-3">
                     <Link className="text-blue-300 hover:underline" href={`/pipeline/${p.id}`}>{p.name || p.id}</Link>
@@ -105,6 +137,11 @@ export default function Home() {
             </tbody>
         </table>
       </div>
+      {cursor && (
+        <div className="mt-4 flex justify-center">
+          <button className="btn-secondary" disabled={loading} onClick={() => load(cursor)}>{loading ? 'Loading…' : 'Load more'}</button>
+        </div>
+      )}
     </Layout>
   );
 }
@@ -7,6 +7,27 @@ import MetricsChart from '../../components/MetricsChart';
 
 type LogItem = { id: number; pipeline_id: string; timestamp: string; content: string };
 type Analysis = { root_cause: string; suggested_fix: string; confidence: string };
+type Bucket = { bucket: string; runs: number; failures: number; success_rate: number | null; mttr_seconds: number | null };
+type Analytics = {
+  failing_since: string | null;
+  totals: { runs: number; failures: number; success_rate: number | null; mttr_seconds: number | null; runs_per_day: number };
+  buckets: Bucket[];
+};
+
+// Chart ranges: window and bucket size passed to /pipelines/{id}/analytics
+const RANGES = [
+  { label: '48 hours', window: '48h', granularity: 'hour' },
+  { label: '30 days', window: '30d', granularity: 'day' },
+  { label: '6 months', window: '26w', granularity: 'week' },
+];
+
+function formatDuration(seconds: number | null): string {
+  if (seconds == null) return '—';
+  if (seconds < 60) return `${Math.round(seconds)}s`;
+  if (seconds < 3600) return `${Math.round(seconds / 60)}m`;
+  if (seconds < 86400) return `${(seconds / 3600).toFixed(1)}h`;
+  return `${(seconds / 86400).toFixed(1)}d`;
+}
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || 'http://localhost:8000';
 
@@ -17,16 +38,22 @@ export default function PipelineDetail() {
   const [loading, setLoading] = useState(true);
   const [analysis, setAnalysis] = useState<Analysis | null>(null);
   const [q, setQ] = useState('');
-  const [offset, setOffset] = useState(0);
   const limit = 50;
   const [analyzing, setAnalyzing] = useState(false);
+  const [range, setRange] = useState(1);
+  const [metrics, setMetrics] = useState<Analytics | null>(null);
   const joinedLogs = useMemo(() => logs.map(l => `[${new Date(l.timestamp).toLocaleString()}]` + '\n' + l.content).join('\n\n'), [logs]);
 
   const fetchLogs = async (reset = false) => {
     if (!id) return;
     setLoading(true);
     try {
-      const params = new URLSearchParams({ limit: String(limit), offset: String(reset ? 0 : offset), q });
+      const params = new URLSearchParams({ limit: String(limit), q });
+      if (!reset && logs.length) {
+        // Plain listing pages by key; ranked search results still page by offset
+        if (q) params.set('offset', String(logs.length));
+        else params.set('before_id', String(logs[logs.length - 1].id));
+      }
       const res = await fetch(`${API_BASE}/logs/${id}?${params.toString()}`);
       const data = await res.json();
       setLogs(reset ? (data || []) : [...logs, ...(data || [])]);
@@ -43,13 +70,47 @@ export default function PipelineDetail() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [id]);
 
+  // Live tail: new rows are pushed by the server instead of re-fetching the list
+  useEffect(() => {
+    if (!id) return;
+    const source = new EventSource(`${API_BASE}/logs/${id}/stream`);
+    source.addEventListener('log', (e) => {
+      const item: LogItem = JSON.parse((e as MessageEvent).data);
+      setLogs(prev => (q || prev.some(l => l.id === item.id)) ? prev : [item, ...prev]);
+    });
+    return () => source.close();
+  }, [id, q]);
+
+  // Streamed: partial root cause / fix text is shown while the model writes it
   const handleAnalyze = async () => {
     if (!id) return;
     try {
       setAnalyzing(true);
-      const res = await fetch(`${API_BASE}/analyze/${id}`, { method: 'POST' });
-      const data = await res.json();
-      setAnalysis(data);
+      setAnalysis(null);
+      const res = await fetch(`${API_BASE}/analyze/${id}/stream`, { method: 'POST' });
+      if (!res.ok || !res.body) throw new Error(`analyze failed: ${res.status}`);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let partial: Analysis = { root_cause: '', suggested_fix: '', confidence: '' };
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event = JSON.parse(line);
+          if (event.result) {
+            partial = event.result;
+          } else {
+            const field = event.field as 'root_cause' | 'suggested_fix';
+            partial = { ...partial, [field]: partial[field] + event.delta };
+          }
+          setAnalysis(partial);
+        }
+      }
     } catch (e) {
       console.error(e);
       setAnalysis({ root_cause: 'Request failed', suggested_fix: 'Retry later', confidence: 'Low' });
@@ -58,17 +119,26 @@ export default function PipelineDetail() {
     }
   };
 
-  // Very rough aggregation by date for chart
+  useEffect(() => {
+    if (!id) return;
+    const { window: span, granularity } = RANGES[range];
+    fetch(`${API_BASE}/pipelines/${id}/analytics?window=${span}&granularity=${granularity}`)
+      .then(res => (res.ok ? res.json() : null))
+      .then(setMetrics)
+      .catch(e => console.error(e));
+  }, [id, range]);
+
   const chart = useMemo(() => {
-    const counts: Record<string, number> = {};
-    logs.forEach(l => {
-      const d = new Date(l.timestamp).toISOString().slice(0, 10);
-      counts[d] = (counts[d] || 0) + 1;
-    });
-    const labels = Object.keys(counts).sort();
-    const values = labels.map(l => counts[l]);
-    return { labels, values };
-  }, [logs]);
+    const buckets = metrics?.buckets || [];
+    return {
+      labels: buckets.map(b => (RANGES[range].granularity === 'hour' ? b.bucket.slice(5).replace('T', ' ') + 'h' : b.bucket)),
+      series: [
+        { label: 'Runs', values: buckets.map(b => b.runs) },
+        { label: 'Failures', values: buckets.map(b => b.failures) },
+        { label: 'Success rate (%)', values: buckets.map(b => (b.success_rate == null ? null : Math.round(b.success_rate * 100))), axis: 'y1' as const },
+      ],
+    };
+  }, [metrics, range]);
 
   return (
     <Layout title={`Pipeline ${id}`} subtitle="Logs, analysis, and run metrics">
@@ -96,7 +166,7 @@ export default function PipelineDetail() {
             />
             <button
               className="btn-secondary"
-              onClick={() => { setOffset(0); fetchLogs(true); }}
+              onClick={() => fetchLogs(true)}
             >Search</button>
             <button
               className="btn-ghost"
@@ -111,11 +181,11 @@ export default function PipelineDetail() {
           <div className="mt-2 flex gap-2">
             <button
               className="btn-secondary"
-              onClick={() => { const next = offset + limit; setOffset(next); fetchLogs(false); }}
+              onClick={() => fetchLogs(false)}
             >Load more</button>
             <button
               className="btn-ghost"
-              onClick={() => { setOffset(0); fetchLogs(true); }}
+              onClick={() => fetchLogs(true)}
             >Refresh</button>
           </div>
         </div>
@@ -125,11 +195,27 @@ export default function PipelineDetail() {
       </div>
 
       <div className="panel mt-6">
-        <h3 className="font-semibold mb-2 heading-gradient">Past Runs</h3>
-        {chart.labels.length > 0 ? (
-          <MetricsChart labels={chart.labels} values={chart.values} title="Log Entries per Day" />
+        <div className="flex items-center justify-between mb-2">
+          <h3 className="font-semibold heading-gradient">Past Runs</h3>
+          <div className="flex gap-1">
+            {RANGES.map((r, i) => (
+              <button key={r.window} className={i === range ? 'btn-secondary' : 'btn-ghost'} onClick={() => setRange(i)}>{r.label}</button>
+            ))}
+          </div>
+        </div>
+        {metrics && metrics.totals.runs > 0 ? (
+          <>
+            <div className="flex flex-wrap gap-6 mb-4 text-sm text-gray-300">
+              <span>Success rate: <b>{metrics.totals.success_rate == null ? '—' : `${Math.round(metrics.totals.success_rate * 100)}%`}</b></span>
+              <span>Failures: <b>{metrics.totals.failures}</b></span>
+              <span>MTTR: <b>{formatDuration(metrics.totals.mttr_seconds)}</b></span>
+              <span>Runs/day: <b>{metrics.totals.runs_per_day.toFixed(1)}</b></span>
+              {metrics.failing_since && <span className="text-red-400">Failing since {new Date(metrics.failing_since + 'Z').toLocaleString()}</span>}
+            </div>
+            <MetricsChart labels={chart.labels} series={chart.series} />
+          </>
         ) : (
-          <div className="text-gray-400">No data to chart yet.</div>
+          <div className="text-gray-400">No runs in this period.</div>
         )}
       </div>
     </Layout>